@@ -9,3 +9,15 @@ CREATE INDEX ix_recognition_history_user_id ON recognition_history(user_id);
 CREATE INDEX ix_food_temp_name ON food_temp(name);
 
 -- 执行完毕后，请重启后端服务确保 SQLAlchemy 元数据同步。
+
+-- =====================================================
+-- 食谱列表游标分页 / 按来源、用户筛选
+-- 日期: 2026-10-18
+-- =====================================================
+-- 列表默认按 (created_at, id) 倒序翻页（InnoDB 二级索引自带主键 id）
+CREATE INDEX idx_plan_created ON diet_plan(created_at);
+-- 按来源筛选后按时间翻页，可覆盖原 idx_plan_source
+CREATE INDEX idx_plan_source_created ON diet_plan(source, created_at);
+DROP INDEX idx_plan_source ON diet_plan;
+-- /plans/recommended、今日食谱：author_id + source + created_at
+CREATE INDEX idx_plan_author_source_created ON diet_plan(author_id, source, created_at);
@@ -9,6 +9,7 @@ from sqlalchemy.orm import Session
 
 from app.database.connection import get_db
 from app.services.food_service import FoodService
+from app.services.food_suggest import MAX_LIMIT as SUGGEST_MAX_LIMIT, food_suggest_index
 from app.services.openfoodfacts_service import off_service
 from app.services.fatsecret_service import fatsecret_service
 from app.schemas.response import APIResponse
@@ -21,6 +22,25 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+@router.get("/food/suggest")
+async def suggest_foods(
+    keyword: str = Query(..., min_length=1, max_length=50, description="输入中的关键词（汉字、拼音或拼音首字母）"),
+    limit: int = Query(default=10, ge=1, le=SUGGEST_MAX_LIMIT, description="返回数量"),
+    db: Session = Depends(get_db),
+):
+    """
+    搜索框输入联想
+
+    只查进程内前缀索引，不访问第三方接口，适合每次按键调用；
+    支持名称、别名、全拼（xihongshi）、拼音首字母（xhs）前缀匹配。
+    需要营养数据时再调用 /food?keyword= 或 /food/{name}。
+
+    - **keyword**: 关键词
+    - **limit**: 返回数量（默认10，最大20）
+    """
+    return APIResponse.success(data=food_suggest_index.suggest(db, keyword, limit))
+
+
 @router.get("/food/{name}", response_model=APIResponse[FoodResponse])
 async def get_food_detail(
     name: str,
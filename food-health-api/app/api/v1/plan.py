@@ -2,23 +2,59 @@
 """
 食谱计划 API 路由
 """
-from typing import List, Optional
+import asyncio
+import base64
+import hashlib
+import json
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from datetime import date, datetime, time
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import desc, or_
 
-from app.database.connection import get_db
+from app.config import get_settings
+from app.database.connection import SessionLocal, get_db
 from app.api.v1.user import require_login, optional_login
-from app.models.diet_plan import DietPlan, DietPlanDay, DietPlanMeal
+from app.models.diet_plan import DietPlan, DietPlanDay
+from app.models.tag import DietPlanTag
 from app.models.user import User
 from app.schemas.response import APIResponse
+from app.services.cache import TTLCache
 from app.services.deepseek_service import deepseek_service
+from app.services.metrics import metrics
+from app.services.plan_persistence import parse_calories, persist_generated_plan
+from app.services.single_flight import single_flights
+from app.services.tag_index import find_tag_id
 from app.services.plan_recommendation import select_recommended_plan
-from app.services.plan_profile import build_plan_profile_text, normalize_goal, normalize_preferences
+from app.services.plan_profile import (
+    build_plan_profile_text,
+    build_plan_template_key,
+    normalize_goal,
+    normalize_preferences,
+)
 
 router = APIRouter()
+settings = get_settings()
+
+# 食谱详情缓存：plan_id -> (updated_at, 序列化后的详情)
+plan_detail_cache = TTLCache(
+    max_entries=settings.plan_detail_cache_max_entries,
+    ttl_seconds=settings.plan_detail_cache_ttl_seconds,
+)
+
+# 食谱模板缓存：(目标, 偏好, 不喜欢的标签, 健康档案分档) -> AI 生成的食谱数据
+# 命中时直接为当前用户克隆一份，不再调用 DeepSeek（游客同样适用）
+plan_template_cache = TTLCache(
+    max_entries=settings.plan_template_cache_max_entries,
+    ttl_seconds=settings.plan_template_cache_ttl_seconds,
+)
+
+# /plans 列表默认返回的字段；fields 参数还可额外选择 created_at
+PLAN_LIST_FIELDS = ("id", "name", "description", "cover_image", "duration_days", "tags", "source", "difficulty")
+PLAN_LIST_EXTRA_FIELDS = ("created_at",)
 
 
 # --- Schemas ---
@@ -75,37 +111,51 @@ class PlanGenerateRequest(BaseModel):
 
 # --- API ---
 
-@router.get("/plans", response_model=APIResponse[List[DietPlanListResponse]])
+@router.get("/plans")
 async def list_plans(
     tag: Optional[str] = Query(None, description="按标签筛选"),
     source: Optional[str] = Query(None, description="按来源筛选"),
+    cursor: Optional[str] = Query(None, description="翻页游标（上一页返回的 next_cursor）"),
+    limit: int = Query(20, ge=1, le=100, description="每页数量"),
+    fields: Optional[str] = Query(None, description="返回字段（逗号分隔），默认全部列表字段"),
+    compact: bool = Query(False, description="紧凑模式：字段名只返回一次，每条食谱为一行数组"),
     db: Session = Depends(get_db)
 ):
-    """获取食谱列表"""
-    query = db.query(DietPlan)
+    """
+    获取食谱列表（按创建时间倒序，游标分页）
+
+    返回 {items, next_cursor}；紧凑模式返回 {fields, rows, next_cursor}。
+    next_cursor 为 null 表示没有更多数据。
+    """
+    selected = _parse_plan_fields(fields)
+    # 游标需要 created_at 与 id，只查询这些列，不加载未请求的大字段
+    query_fields = selected if "created_at" in selected else selected + ["created_at"]
+    query = db.query(*[getattr(DietPlan, name) for name in query_fields])
     
+    order_created_at, order_id = DietPlan.created_at, DietPlan.id
     if tag:
-        query = query.filter(DietPlan.tags.like(f"%{tag}%"))
+        # 走标签关联表精确匹配，并按关联表冗余的创建时间排序（tag_id, plan_created_at, plan_id 索引）
+        tag_id = find_tag_id(db, tag)
+        if tag_id is None:
+            return APIResponse.success(data=_plan_list_page(selected, [], None, compact))
+        query = query.join(DietPlanTag, DietPlanTag.plan_id == DietPlan.id).filter(DietPlanTag.tag_id == tag_id)
+        order_created_at, order_id = DietPlanTag.plan_created_at, DietPlanTag.plan_id
     if source:
         query = query.filter(DietPlan.source == source)
+    if cursor:
+        cursor_created_at, cursor_id = _decode_plan_cursor(cursor)
+        # 等价于 (created_at, id) < 游标；单独的 created_at <= 条件让索引可以直接定位起点
+        query = query.filter(
+            order_created_at <= cursor_created_at,
+            or_(order_created_at < cursor_created_at, order_id < cursor_id),
+        )
         
-    plans = query.order_by(desc(DietPlan.created_at)).all()
-    
-    # 转换为 Response
-    data = []
-    for p in plans:
-        data.append(DietPlanListResponse(
-            id=p.id,
-            name=p.name,
-            description=p.description,
-            cover_image=p.cover_image,
-            duration_days=p.duration_days,
-            tags=p.tags,
-            source=p.source,
-            difficulty=p.difficulty
-        ))
-        
-    return APIResponse.success(data=data)
+    rows = query.order_by(desc(order_created_at), desc(order_id)).limit(limit + 1).all()
+    next_cursor = _encode_plan_cursor(rows[limit - 1]) if len(rows) > limit else None
+    rows = rows[:limit]
+
+    values = [[_plan_field_value(row, name) for name in selected] for row in rows]
+    return APIResponse.success(data=_plan_list_page(selected, values, next_cursor, compact))
 
 
 @router.get("/plans/recommended", response_model=APIResponse[Optional[DietPlanDetailResponse]])
@@ -115,7 +165,8 @@ async def get_recommended_plan(
 ):
     """获取最新推荐食谱（不生成）"""
     author_id = user_id if user_id else 0
-    plans = db.query(DietPlan).filter(
+    # 只取选择所需的列，详情走缓存
+    plans = db.query(DietPlan.id, DietPlan.created_at, DietPlan.updated_at).filter(
         DietPlan.author_id == author_id,
         DietPlan.source.in_(["ai_generated", "mock_data"])
     ).order_by(desc(DietPlan.created_at)).limit(10).all()
@@ -124,7 +175,7 @@ async def get_recommended_plan(
     if not selected:
         return APIResponse.success(data=None)
 
-    data = _get_plan_detail_data(selected.id, db)
+    data = _get_plan_detail_payload(selected.id, db, updated_at=selected.updated_at)
     return APIResponse.success(data=data)
 
 
@@ -134,7 +185,7 @@ async def get_plan_detail(
     db: Session = Depends(get_db)
 ):
     """获取食谱详情"""
-    return APIResponse.success(data=_get_plan_detail_data(plan_id, db))
+    return APIResponse.success(data=_get_plan_detail_payload(plan_id, db))
 
     
 class ApplyPlanRequest(BaseModel):
@@ -219,256 +270,433 @@ async def generate_plan(
 ):
     """
     [AI] 生成个性化食谱
-    :param force_new: 是否强制重新生成（忽略今日缓存）
+    :param force_new: 是否强制重新生成（忽略今日缓存与食谱模板缓存）
     """
     # 1. 检查今日已生成食谱 (除非强制生成)
-    existing_plan = None
-    if not force_new and user_id:  # 只在用户已登录时检查缓存
-        today_start = datetime.combine(date.today(), time.min)
-        existing_plan = db.query(DietPlan).filter(
-            DietPlan.author_id == user_id,
-            DietPlan.source == "ai_generated",
-            DietPlan.created_at >= today_start
-        ).order_by(desc(DietPlan.created_at)).first()
-    
+    existing_plan = None if force_new else _find_today_plan(user_id, db)
     if existing_plan:
-        data = _get_plan_detail_data(existing_plan.id, db)
+        data = _get_plan_detail_payload(existing_plan.id, db)
         return APIResponse.success(data=data)
 
-    # 2. 准备用户信息
+    # 2. 该用户的低峰预生成恰好在进行中时先等它结束（失败也不影响本次请求），再看今日食谱
+    if not force_new and user_id and await single_flights.get("plan_generate").wait(_pregeneration_flight_key(user_id)):
+        existing_plan = _find_today_plan(user_id, db)
+        if existing_plan:
+            data = _get_plan_detail_payload(existing_plan.id, db)
+            return APIResponse.success(data=data)
+
+    # 3. 准备用户信息
+    context = _resolve_generation_context(payload, user_id, db)
+
+    # 4. 同一用户（游客按请求内容）重复点击或客户端重试时，等待进行中的生成并返回同一份食谱
+    plan_id = await single_flights.get("plan_generate").do(
+        _generation_flight_key(user_id, payload),
+        _generate_and_save_plan,
+        context,
+        user_id,
+        force_new,
+    )
+    
+    # 5. 返回结果
+    data = _get_plan_detail_payload(plan_id, db)
+    return APIResponse.success(data=data)
+
+
+@router.post("/plans/generate/stream")
+async def generate_plan_stream(
+    force_new: bool = False,
+    payload: Optional[PlanGenerateRequest] = None,
+    user_id: int = Depends(optional_login),
+    db: Session = Depends(get_db)
+):
+    """
+    [AI] 流式生成个性化食谱（Server-Sent Events）
+
+    事件类型：day（某一天生成完毕，DietPlanDayResponse，不含 ID）、
+    plan（入库后的完整食谱，DietPlanDetailResponse），推送 plan 后关闭连接。
+    AI 不可用时回退到 Mock 食谱，与 /plans/generate 一致。
+    """
+    existing_plan = None if force_new else _find_today_plan(user_id, db)
+    cached = _get_plan_detail_payload(existing_plan.id, db) if existing_plan else None
+    context = None if cached else _resolve_generation_context(payload, user_id, db)
+
+    async def events():
+        if cached:
+            for day in cached["days"]:
+                yield _sse_event("day", day)
+            yield _sse_event("plan", cached)
+            return
+
+        # 与 /plans/generate 共用合并 key：重复点击、客户端重连不会再发起一次生成，
+        # 合并进来的请求等进行中的生成入库后推送完整食谱
+        days: asyncio.Queue = asyncio.Queue()
+        flight = asyncio.ensure_future(single_flights.get("plan_generate").do(
+            _generation_flight_key(user_id, payload),
+            _stream_and_save_plan,
+            context,
+            user_id,
+            force_new,
+            days,
+        ))
+        streamed = 0
+        while not (flight.done() and days.empty()):
+            getter = asyncio.ensure_future(days.get())
+            await asyncio.wait({getter, flight}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                streamed += 1
+                yield _sse_event("day", getter.result())
+            else:
+                getter.cancel()
+        plan_id = await flight
+
+        # 请求作用域的 Session 在流式响应开始前已关闭，读取使用独立 Session
+        with SessionLocal() as session:
+            detail = _get_plan_detail_payload(plan_id, session)
+
+        if not streamed:
+            # 命中模板、回退到 Mock 食谱或合并到其他请求的生成时补发每日数据
+            for day in detail["days"]:
+                yield _sse_event("day", day)
+        yield _sse_event("plan", detail)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _stream_and_save_plan(
+    context: Dict[str, Any],
+    user_id: Optional[int],
+    force_new: bool,
+    days: asyncio.Queue
+) -> int:
+    """
+    流式生成并保存食谱，返回食谱 ID
+
+    校验通过的每一天放入 days 队列，由发起生成的流式请求推送；
+    与 _generate_and_save_plan 一样由多个请求共享执行，入库使用独立 Session
+    """
+    started = perf_counter()
+    streamed_days = []
+    plan_data = None if force_new else plan_template_cache.get(context["template_key"])
+    template_hit = plan_data is not None
+    try:
+        async for kind, data in _stream_unless_cached(plan_data, context):
+            if kind == "day":
+                if not deepseek_service.is_valid_plan_day(data):
+                    # 不推送、不保存结构不完整的单日数据
+                    metrics.incr("plan.stream.invalid_days")
+                    print(f"⚠️ 流式食谱单日数据校验失败，已跳过: {str(data)[:100]}")
+                    continue
+                if not streamed_days:
+                    metrics.observe("plan.stream.first_day_ms", (perf_counter() - started) * 1000)
+                streamed_days.append(data)
+                days.put_nowait(_day_response_from_data(data, len(streamed_days)).model_dump())
+            elif data:
+                plan_data = data
+                plan_template_cache.set(context["template_key"], data)
+    except Exception as e:
+        print(f"⚠️ 流式生成食谱异常: {type(e).__name__}: {e}")
+    if not template_hit:
+        metrics.observe("plan.stream.total_ms", (perf_counter() - started) * 1000)
+
+    if plan_data is None and streamed_days:
+        # 整体 JSON 不完整（如输出被截断），保存已推送的天数，与客户端看到的保持一致
+        plan_data = {"days": streamed_days}
+
+    with SessionLocal() as session:
+        new_plan = persist_generated_plan(
+            session,
+            plan_data,
+            context["goal_key"],
+            context["goal_label"],
+            context["prefs"],
+            context["user_profile"],
+            user_id,
+        )
+        return new_plan.id
+
+
+async def _generate_and_save_plan(
+    context: Dict[str, Any],
+    user_id: Optional[int],
+    force_new: bool,
+    fallback_to_mock: bool = True
+) -> int:
+    """
+    生成并保存食谱，返回食谱 ID
+
+    由多个请求共享执行，不能使用某个请求的 Session（该请求断开后 Session 即关闭）
+    :param fallback_to_mock: AI 失败时是否保存 Mock 食谱（预生成时不保存，抛出异常）
+    """
+    # 目标、偏好与档案分档相同的模板直接复用（强制生成时跳过）
+    plan_data = None if force_new else plan_template_cache.get(context["template_key"])
+    if plan_data is None:
+        # 尝试调用 AI 生成（传递不喜欢的标签）
+        started = perf_counter()
+        try:
+            plan_data = await deepseek_service.generate_diet_plan(
+                context["prompt_profile"],
+                context["goal_label"],
+                context["prefs_label"],
+                disliked_tags=context["disliked_tags"]  # 传递用户不喜欢的标签
+            )
+        except Exception as e:
+            print(f"⚠️ 调用 AI 服务异常: {e}")
+            plan_data = None
+        # 非流式生成要等全部 7 天返回，首日可见时间即总耗时
+        metrics.observe("plan.generate.first_day_ms", (perf_counter() - started) * 1000)
+        if plan_data:
+            plan_template_cache.set(context["template_key"], plan_data)
+        elif not fallback_to_mock:
+            raise RuntimeError("AI 生成食谱失败")
+
+    # AI 失败或入库失败时回退到 Mock 食谱
+    with SessionLocal() as session:
+        new_plan = persist_generated_plan(
+            session,
+            plan_data,
+            context["goal_key"],
+            context["goal_label"],
+            context["prefs"],
+            context["user_profile"],
+            user_id,
+        )
+        return new_plan.id
+
+
+async def pregenerate_plan(user_id: int) -> int:
+    """
+    低峰时段预生成食谱（由 plan_pregenerator 调度），返回食谱 ID
+
+    使用用户资料中的目标、偏好与身体数据；AI 失败时不保存 Mock 食谱，留给白天的请求兜底。
+    使用独立的合并 key：用户的请求不会加入预生成（拿到预生成的异常或丢掉请求参数），
+    而是等预生成结束后复用今日食谱；反过来用户的生成在进行中时，预生成等它结束后直接复用
+    """
+    if await single_flights.get("plan_generate").wait(_generation_flight_key(user_id, None)):
+        with SessionLocal() as session:
+            existing_plan = _find_today_plan(user_id, session)
+            if existing_plan:
+                return existing_plan.id
+
+    with SessionLocal() as session:
+        user = session.get(User, user_id)
+        if not user:
+            raise ValueError(f"用户不存在: {user_id}")
+        payload = PlanGenerateRequest(health_profile=PlanGenerateProfile(
+            weight=user.weight,
+            height=user.height,
+            age=user.age,
+            gender=user.gender,
+            activity=user.activity,
+        ))
+        context = _resolve_generation_context(payload, user_id, session)
+
+    return await single_flights.get("plan_generate").do(
+        _pregeneration_flight_key(user_id),
+        _generate_and_save_plan,
+        context,
+        user_id,
+        False,
+        False,
+    )
+
+
+def _pregeneration_flight_key(user_id: int) -> Tuple:
+    return ("pregen", user_id)
+
+
+def _generation_flight_key(user_id: Optional[int], payload: Optional[PlanGenerateRequest]) -> Tuple:
+    """进行中的生成按用户合并；游客没有身份，按请求内容合并"""
+    if user_id:
+        return ("user", user_id)
+    body = json.dumps(payload.model_dump() if payload else None, sort_keys=True, ensure_ascii=False)
+    return ("guest", hashlib.sha1(body.encode("utf-8")).hexdigest())
+
+
+async def _stream_unless_cached(plan_data: Optional[Dict[str, Any]], context: Dict[str, Any]):
+    """命中模板缓存时不调用 AI，否则转发 DeepSeek 的流式输出"""
+    if plan_data is not None:
+        return
+    async for item in deepseek_service.stream_diet_plan(
+        context["prompt_profile"],
+        context["goal_label"],
+        context["prefs_label"],
+        disliked_tags=context["disliked_tags"]
+    ):
+        yield item
+
+
+def _find_today_plan(user_id: Optional[int], db: Session) -> Optional[DietPlan]:
+    """用户今日已生成的 AI 食谱（未登录不复用）"""
+    if not user_id:
+        return None
+    today_start = datetime.combine(date.today(), time.min)
+    return db.query(DietPlan).filter(
+        DietPlan.author_id == user_id,
+        DietPlan.source == "ai_generated",
+        DietPlan.created_at >= today_start
+    ).order_by(desc(DietPlan.created_at)).first()
+
+
+def _resolve_generation_context(
+    payload: Optional[PlanGenerateRequest],
+    user_id: Optional[int],
+    db: Session
+) -> Dict[str, Any]:
+    """合并请求参数与用户资料，得到食谱生成所需的目标、偏好与用户画像"""
     payload_goal = payload.health_goal if payload else None
     payload_prefs = payload.dietary_preferences if payload else None
     payload_profile = payload.health_profile.model_dump() if payload and payload.health_profile else {}
     payload_disliked = payload.disliked_tags if payload and payload.disliked_tags else []
 
-    if user_id:
-        user = db.query(User).filter(User.id == user_id).first()
-        if user:
-            goal = payload_goal or user.health_goal or "keep_fit"
-            prefs = payload_prefs or user.dietary_preferences or "无特殊偏好"
-        else:
-            # Token valid but user not found
-            goal = payload_goal or "keep_fit"
-            prefs = payload_prefs or "无特殊偏好"
+    user = db.query(User).filter(User.id == user_id).first() if user_id else None
+    if user:
+        goal = payload_goal or user.health_goal or "keep_fit"
+        prefs = payload_prefs or user.dietary_preferences or "无特殊偏好"
+        nickname = user.nickname or user.username
     else:
-        # 使用默认用户配置（未登录时）
+        # 未登录或用户不存在时使用默认配置
         goal = payload_goal or "keep_fit"  # 默认维持健康
         prefs = payload_prefs or "无特殊偏好"
-
-    goal_key, goal_label = normalize_goal(goal)
-    prefs_label = normalize_preferences(prefs)
-
-    if user_id and user:
-        nickname = user.nickname or user.username
-    else:
         nickname = None
 
-    user_profile = build_plan_profile_text(
-        nickname=nickname,
+    goal_key, goal_label = normalize_goal(goal)
+    # AI 生成结果会进入食谱模板缓存并克隆给同档的其他用户，prompt 中不带昵称；
+    # 昵称只保留在本人食谱的 target_user 里
+    prompt_profile = build_plan_profile_text(
+        nickname=None,
         health_goal=goal_key,
         dietary_preferences=prefs,
         health_profile=payload_profile
     )
 
-    # 3. 尝试调用 AI 生成（传递不喜欢的标签）
-    try:
-        plan_data = await deepseek_service.generate_diet_plan(
-            user_profile,
-            goal_label,
-            prefs_label,
-            disliked_tags=payload_disliked  # 传递用户不喜欢的标签
-        )
-    except Exception as e:
-        print(f"⚠️ 调用 AI 服务异常: {e}")
-        plan_data = None
-    
-    new_plan = None
-    
-    if plan_data:
-        # === AI 路径 ===
-        try:
-            # 提取并组合标签
-            ai_tags = plan_data.get("tags", [])
-            # 确保 ai_tags 里面的每一项都是 string
-            ai_tags = [str(t) for t in ai_tags]
-            
-            # 3.1 基础标签映射 (Goal -> Tag)
-            goal_map = {
-                "lose_weight": "减脂",
-                "loss_weight": "减脂",
-                "keep_fit": "维持",
-                "maintain": "维持",
-                "gain_muscle": "增肌",
-                "减脂": "减脂",
-                "增肌": "增肌",
-                "保持健康": "维持",
-                "维持": "维持"
-            }
-            mapped_goal_tag = goal_map.get(goal_key, goal_label)
-            
-            base_tags = ["DeepSeek", "AI定制", mapped_goal_tag]
-            
-            # 3.2 强制素食标签检测 (Prefs/Name -> Tag)
-            # 如果偏好含素，或标题含素，强制打上"素食"标签
-            if "素" in prefs or "素" in plan_data.get("name", ""):
-                 base_tags.append("素食")
-
-            # 去重合并
-            final_tags = list(set(base_tags + ai_tags))
-            tags_str = ",".join(final_tags)
-
-            new_plan = DietPlan(
-                name=plan_data.get("name", f"AI定制：{goal_label}食谱"),
-                description=plan_data.get("description", "为您量身定制的7天健康饮食计划"),
-                cover_image="/static/ai_plan.png",
-                duration_days=7,
-                tags=tags_str,
-                source="ai_generated",
-                difficulty="medium",
-                target_user=f"{user_profile} | {goal_label}",
-                author_id=user_id if user_id else 0  # 未登录时使用 0
-            )
-            db.add(new_plan)
-            db.commit()
-            db.refresh(new_plan)
-            
-            # 处理每一天
-            for day_info in plan_data.get("days", []):
-                day = DietPlanDay(
-                    plan_id=new_plan.id,
-                    day_index=day_info.get("day_index"),
-                    title=day_info.get("title", f"Day {day_info.get('day_index')}"),
-                    total_calories=0 # AI 可能未直接返回总热量，需累加
-                )
-                db.add(day)
-                db.commit()
-                db.refresh(day)
-                
-                day_total_cal = 0
-                
-                # 处理每一餐
-                meals_list = day_info.get("meals", [])
-                for idx, meal_info in enumerate(meals_list):
-                    # 安全转换热量
-                    raw_cal = meal_info.get("calories", 0)
-                    safe_cal = 0
-                    try:
-                        # 尝试去除非数字字符
-                        if isinstance(raw_cal, str):
-                            import re
-                            # 提取第一个数字序列
-                            match = re.search(r'\d+', raw_cal)
-                            if match:
-                                safe_cal = int(match.group())
-                        else:
-                            safe_cal = int(raw_cal)
-                    except (ValueError, TypeError):
-                        safe_cal = 0
-                        
-                    day_total_cal += safe_cal
-                    
-                    meal_obj = DietPlanMeal(
-                        day_id=day.id,
-                        meal_type=meal_info.get("meal_type", "snack"),
-                        sort_order=idx + 1,
-                        # Truncate to match DB constraints
-                        food_name=str(meal_info.get("food_name", "未命名食物"))[:100],
-                        amount_desc=str(meal_info.get("amount_desc", ""))[:50],
-                        calories=safe_cal
-                    )
-                    db.add(meal_obj)
-                
-                # 更新每日总热量
-                day.total_calories = day_total_cal
-                db.add(day)
-            
-            db.commit()
-            print(f"✅ AI 食谱已保存: Plan ID {new_plan.id}")
+    return {
+        "goal_key": goal_key,
+        "goal_label": goal_label,
+        "prefs": prefs,
+        "prefs_label": normalize_preferences(prefs),
+        "disliked_tags": payload_disliked,
+        "template_key": build_plan_template_key(goal, prefs, payload_disliked, payload_profile),
+        "user_profile": build_plan_profile_text(
+            nickname=nickname,
+            health_goal=goal_key,
+            dietary_preferences=prefs,
+            health_profile=payload_profile
+        ),
+        "prompt_profile": prompt_profile,
+    }
+
+
+def _day_response_from_data(day_info: Dict[str, Any], fallback_index: int) -> DietPlanDayResponse:
+    """流式生成的单日数据 -> 响应结构（入库前，字段处理与 save_ai_plan 一致）"""
+    meals = []
+    for meal_info in day_info.get("meals", []):
+        meals.append(DietPlanMealResponse(
+            meal_type=meal_info.get("meal_type", "snack"),
+            food_name=str(meal_info.get("food_name", "未命名食物"))[:100],
+            amount_desc=str(meal_info.get("amount_desc", ""))[:50],
+            calories=parse_calories(meal_info.get("calories", 0)),
+            alternatives=None
+        ))
+    day_index = day_info.get("day_index") or fallback_index
+    return DietPlanDayResponse(
+        day_index=day_index,
+        title=day_info.get("title", f"Day {day_index}"),
+        total_calories=sum(meal.calories for meal in meals),
+        meals=meals
+    )
 
-        except Exception as e:
-            print(f"❌ 保存 AI 食谱失败，回退到 Mock: {e}")
-            import traceback
-            traceback.print_exc()
-            db.rollback()
-            new_plan = None  # 触发下面的 fallback
-            
-    if not new_plan:
-        # === Fallback Mock 路径 ===
-        print("⚠️ 启用 Mock 数据生成")
-        new_plan = DietPlan(
-            name=f"推荐食谱：{goal_label}计划 (Mock)",
-            description=f"AI 服务暂时繁忙，为您生成的推荐计划。目标：{goal_label}",
-            cover_image="/static/mock_plan.png",
-            duration_days=7,
-            tags="Mock,示例,推荐",
-            source="mock_data",
-            difficulty="easy",
-            target_user=user_profile,
-            author_id=user_id if user_id else 0  # 未登录时使用 0
-        )
-        db.add(new_plan)
-        db.commit()
-        db.refresh(new_plan)
-
-        # 只生成第一天作为示例
-        day1 = DietPlanDay(
-            plan_id=new_plan.id, 
-            day_index=1, 
-            title="启动日 (示例)", 
-            total_calories=1500
-        )
-        db.add(day1)
-        db.commit()
-        db.refresh(day1)
 
-        meals_data = [
-            {"type": "breakfast", "name": "全麦面包+牛奶", "amount": "2片+1杯", "cal": 350},
-            {"type": "lunch", "name": "鸡胸肉蔬菜沙拉", "amount": "1份", "cal": 450},
-            {"type": "dinner", "name": "清蒸鲈鱼+杂粮饭", "amount": "100g+1碗", "cal": 400},
-            {"type": "snack", "name": "苹果", "amount": "1个", "cal": 80}
-        ]
-        
-        for idx, m in enumerate(meals_data):
-            meal = DietPlanMeal(
-                day_id=day1.id,
-                meal_type=m["type"],
-                sort_order=idx,
-                food_name=m["name"],
-                amount_desc=m["amount"],
-                calories=m["cal"]
-            )
-            db.add(meal)
-        db.commit()
-    
-    # 4. 返回结果
-    data = _get_plan_detail_data(new_plan.id, db)
-    return APIResponse.success(data=data)
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _parse_plan_fields(fields: Optional[str]) -> List[str]:
+    """解析 fields 参数，id 始终返回"""
+    if not fields:
+        return list(PLAN_LIST_FIELDS)
+    selected = ["id"]
+    for name in fields.split(","):
+        name = name.strip()
+        if not name or name in selected:
+            continue
+        if name not in PLAN_LIST_FIELDS and name not in PLAN_LIST_EXTRA_FIELDS:
+            raise HTTPException(status_code=400, detail=f"不支持的字段: {name}")
+        selected.append(name)
+    return selected
+
+
+def _plan_list_page(selected: List[str], values: List[list], next_cursor: Optional[str], compact: bool) -> dict:
+    if compact:
+        return {"fields": selected, "rows": values, "next_cursor": next_cursor}
+    return {"items": [dict(zip(selected, row)) for row in values], "next_cursor": next_cursor}
+
 
+def _plan_field_value(row, name: str):
+    value = getattr(row, name)
+    return value.isoformat() if isinstance(value, datetime) else value
 
-def _get_plan_detail_data(plan_id: int, db: Session) -> DietPlanDetailResponse:
-    """Helper to build plan detail response"""
-    plan = db.query(DietPlan).filter(DietPlan.id == plan_id).first()
+
+def _encode_plan_cursor(row) -> str:
+    """游标为最后一条的 (created_at, id)，编码后对客户端不透明"""
+    raw = f"{row.created_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_plan_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, plan_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), int(plan_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="无效的翻页游标")
+
+
+def _get_plan_detail_payload(plan_id: int, db: Session, updated_at: Optional[datetime] = None) -> dict:
+    """
+    食谱详情（已序列化为 dict，调用方不要修改）
+
+    生成后的食谱不再修改，详情按 (id, updated_at) 缓存在内存中：
+    命中时只需一次主键查询取 updated_at（调用方已知时可直接传入），
+    未命中时用 selectinload 一次取回全部天和餐（共 3 次查询，与天数无关）。
+    """
+    if updated_at is None:
+        row = db.query(DietPlan.updated_at).filter(DietPlan.id == plan_id).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="食谱不存在")
+        updated_at = row.updated_at
+
+    cached = plan_detail_cache.get(plan_id)
+    if cached is not None and cached[0] == updated_at:
+        return cached[1]
+
+    plan = db.query(DietPlan).options(
+        selectinload(DietPlan.days).selectinload(DietPlanDay.meals)
+    ).filter(DietPlan.id == plan_id).first()
     if not plan:
         raise HTTPException(status_code=404, detail="食谱不存在")
-        
+
+    payload = _build_plan_detail(plan).model_dump(mode="json")
+    plan_detail_cache.set(plan_id, (plan.updated_at, payload))
+    return payload
+
+
+def _build_plan_detail(plan: DietPlan) -> DietPlanDetailResponse:
+    """DietPlan（天、餐已加载，relationship 已按 day_index / sort_order 排序） -> 响应结构"""
     days_data = []
-    # Ensure days are sorted
-    sorted_days = sorted(plan.days, key=lambda x: x.day_index)
-    
-    for day in sorted_days:
-        meals_data = []
-        # Ensure meals are sorted
-        sorted_meals = sorted(day.meals, key=lambda x: x.sort_order)
-        
-        for meal in sorted_meals:
-            meals_data.append(DietPlanMealResponse(
+    for day in plan.days:
+        meals_data = [
+            DietPlanMealResponse(
                 meal_type=meal.meal_type,
                 food_name=meal.food_name,
                 amount_desc=meal.amount_desc,
                 calories=meal.calories,
                 alternatives=meal.alternatives
-            ))
-        
+            )
+            for meal in day.meals
+        ]
         days_data.append(DietPlanDayResponse(
             day_index=day.day_index,
             title=day.title,
@@ -487,4 +715,3 @@ def _get_plan_detail_data(plan_id: int, db: Session) -> DietPlanDetailResponse:
         difficulty=plan.difficulty,
         days=days_data
     )
-
@@ -5,11 +5,13 @@
 import logging
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 
 from app.database.connection import get_db
 from app.services.premium_recipe_service import PremiumRecipeService
+from app.services.recipe_catalog import CatalogView, recipe_catalog
+from app.services.recipe_counters import recipe_counters
 from app.schemas.response import APIResponse
 from app.schemas.premium_recipe import (
     PremiumRecipeCreate,
@@ -77,19 +79,39 @@ async def get_featured_recipes(
 
 
 @router.get("/recipes/categories")
-async def get_categories(db: Session = Depends(get_db)):
-    """获取所有分类"""
-    service = PremiumRecipeService(db)
-    categories = service.get_categories()
-    return APIResponse.success(data=categories)
+async def get_categories(
+    request: Request,
+    response: Response,
+    with_counts: bool = Query(False, description="是否返回每个分类的食谱数"),
+    db: Session = Depends(get_db),
+):
+    """获取所有分类（支持 If-None-Match 协商缓存）"""
+    return _catalog_response(request, response, recipe_catalog.view(db, "categories"), with_counts)
 
 
 @router.get("/recipes/tags")
-async def get_tags(db: Session = Depends(get_db)):
-    """获取所有标签"""
-    service = PremiumRecipeService(db)
-    tags = service.get_tags()
-    return APIResponse.success(data=tags)
+async def get_tags(
+    request: Request,
+    response: Response,
+    with_counts: bool = Query(False, description="是否返回每个标签的食谱数"),
+    db: Session = Depends(get_db),
+):
+    """获取所有标签（支持 If-None-Match 协商缓存）"""
+    return _catalog_response(request, response, recipe_catalog.view(db, "tags"), with_counts)
+
+
+def _catalog_response(request: Request, response: Response, view: CatalogView, with_counts: bool):
+    """目录未变化时返回 304，否则返回名称列表（或名称 + 食谱数）"""
+    # 两种返回格式内容不同，ETag 需要区分
+    etag = view.etag[:-1] + '-c"' if with_counts else view.etag
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    if with_counts:
+        return APIResponse.success(data=[{"name": name, "count": view.counts[name]} for name in view.names])
+    return APIResponse.success(data=view.names)
 
 
 @router.get("/recipes/{recipe_id}")
@@ -104,12 +126,15 @@ async def get_recipe_detail(
     if not recipe:
         raise HTTPException(status_code=404, detail="食谱不存在")
     
-    # 增加浏览数
+    # 增加浏览数（写缓冲，定期批量写回）
     service.increment_view_count(recipe_id)
     
-    return APIResponse.success(
-        data=PremiumRecipeResponse.model_validate(recipe)
-    )
+    data = PremiumRecipeResponse.model_validate(recipe)
+    # 叠加尚未写回的计数增量
+    pending = recipe_counters.pending(recipe_id)
+    data.view_count += pending["view_count"]
+    data.favorite_count = max(data.favorite_count + pending["favorite_count"], 0)
+    return APIResponse.success(data=data)
 
 
 @router.post("/recipes")
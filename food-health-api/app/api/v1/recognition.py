@@ -3,23 +3,41 @@
 食物识别 API 路由
 优先使用豆包 AI，未配置时降级到百度 AI
 """
+import asyncio
+import hashlib
+import json
 import logging
 import os
+import time
 import uuid
 from pathlib import Path
 from datetime import datetime
+from typing import List, Optional
 
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.database.connection import get_db
+from app.database.connection import SessionLocal, get_db
 from app.services.doubao_ai import doubao_ai_service, encode_image_to_base64
 from app.services.baidu_ai import baidu_ai_service
 from app.services.deepseek_service import deepseek_service
 from app.services.food_service import FoodService
 from app.schemas.response import APIResponse
-from app.schemas.recognition import RecognizeResponse, RecognitionTopResult
+from app.schemas.recognition import (
+    BatchRecognizeItem,
+    BatchRecognizeResponse,
+    RecognizeResponse,
+    RecognitionTopResult,
+    RecognitionJobResponse,
+)
 from app.schemas.food import NutritionInfo, ContraindicationInfo
+from app.services.cache import TTLCache
+from app.services.image_hash import PerceptualHashIndex, compute_dhash
+from app.services.image_preprocess import preprocess_image
+from app.services.metrics import metrics
+from app.services.job_queue import Job, JobError, JobQueue, QueueFullError
+from app.services.single_flight import normalize_key, single_flights
 from app.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -31,11 +49,55 @@ settings = get_settings()
 UPLOAD_DIR = Path("static/uploads/recognition")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# 识别结果缓存：图片 SHA-256 -> RecognizeResponse
+recognition_cache = TTLCache(
+    max_entries=settings.recognition_cache_max_entries,
+    ttl_seconds=settings.recognition_cache_ttl_seconds,
+)
 
-def save_recognition_image(image_bytes: bytes, content_type: str) -> str:
+# 近似图片索引：dHash -> (识别结果列表, AI 来源)
+image_hash_index = PerceptualHashIndex(
+    max_distance=settings.image_hash_max_distance,
+    max_entries=settings.image_hash_max_entries,
+    ttl_seconds=settings.image_hash_ttl_seconds,
+)
+
+
+# 异步识别任务队列（worker 在 app/main.py 的 lifespan 中启动）
+recognition_jobs = JobQueue(
+    "recognition",
+    workers=settings.recognition_job_workers,
+    max_queue=settings.recognition_job_queue_size,
+    result_ttl_seconds=settings.recognition_job_result_ttl_seconds,
+    failure_message="识别失败，请稍后重试",
+)
+
+
+def enrichment_stats() -> dict:
+    """识别补充阶段临时表命中情况（用于 /api/v1/status 监控）"""
+    hits = metrics.counter("enrichment.food_temp_hits")
+    misses = metrics.counter("enrichment.food_temp_misses")
+    total = hits + misses
+    return {
+        "hits": int(hits),
+        "misses": int(misses),
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+        "deepseek_calls": int(metrics.counter("enrichment.deepseek_calls")),
+        "deepseek_avoided": int(metrics.counter("enrichment.deepseek_avoided")),
+    }
+
+
+def compute_image_key(image_bytes: bytes) -> str:
+    """计算图片内容指纹（SHA-256），用于识别缓存和图片去重"""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def save_recognition_image(image_bytes: bytes, content_type: str, image_key: Optional[str] = None) -> str:
     """
     保存识别图片到服务器
     
+    传入 image_key 时按内容寻址保存，相同图片只落盘一次
+    
     Returns:
         保存后的图片相对路径（可通过 /static/... 访问）
     """
@@ -46,20 +108,26 @@ def save_recognition_image(image_bytes: bytes, content_type: str) -> str:
     elif content_type == "image/bmp":
         ext = ".bmp"
     
-    # 按日期分目录
-    date_dir = datetime.now().strftime("%Y%m%d")
-    save_dir = UPLOAD_DIR / date_dir
-    save_dir.mkdir(parents=True, exist_ok=True)
+    if image_key:
+        # 按指纹前缀分目录，文件名即指纹
+        sub_dir = image_key[:2]
+        filename = f"{image_key}{ext}"
+    else:
+        # 按日期分目录
+        sub_dir = datetime.now().strftime("%Y%m%d")
+        filename = f"{uuid.uuid4().hex}{ext}"
     
-    filename = f"{uuid.uuid4().hex}{ext}"
+    save_dir = UPLOAD_DIR / sub_dir
+    save_dir.mkdir(parents=True, exist_ok=True)
     file_path = save_dir / filename
     
-    # 保存文件
-    with open(file_path, "wb") as f:
-        f.write(image_bytes)
+    # 保存文件（内容相同的图片已存在时跳过）
+    if not file_path.exists():
+        with open(file_path, "wb") as f:
+            f.write(image_bytes)
     
     # 返回相对路径
-    return f"/static/uploads/recognition/{date_dir}/{filename}"
+    return f"/static/uploads/recognition/{sub_dir}/{filename}"
 
 
 @router.post("/recognize", response_model=APIResponse[RecognizeResponse])
@@ -79,7 +147,197 @@ async def recognize_food(
     - **top_result**: 最佳匹配结果的详细信息（营养、健康建议、禁忌）
     
     识别服务优先级：豆包 AI > 百度 AI > 模拟数据
+    （豆包响应过慢时并行请求百度，先返回者胜出）
+    
+    相同图片（SHA-256 一致）在缓存有效期内直接返回上次的识别结果
+    """
+    image_bytes = await _read_upload(image)
+    response = await _recognize_with_cache(image_bytes, image.content_type, db)
+    return APIResponse.success(data=response)
+
+
+@router.post("/recognize/batch", response_model=APIResponse[BatchRecognizeResponse])
+async def recognize_food_batch(
+    images: List[UploadFile] = File(..., description="同一餐的多张食物图片"),
+    db: Session = Depends(get_db),
+):
+    """
+    批量识别（一餐多张照片一次上传）
+    
+    - 多张图片并发识别（并发数受 RECOGNITION_BATCH_CONCURRENCY 限制）
+    - 共用一个数据库 Session，本地食物库按菜名一次查齐
+    - 结果按上传顺序返回，单张失败不影响其他图片
+    """
+    if len(images) > settings.recognition_batch_max_images:
+        raise HTTPException(
+            status_code=400,
+            detail=f"单次最多上传 {settings.recognition_batch_max_images} 张图片",
+        )
+    
+    items: List[BatchRecognizeItem] = [
+        BatchRecognizeItem(index=index, filename=image.filename) for index, image in enumerate(images)
+    ]
+    semaphore = asyncio.Semaphore(max(1, settings.recognition_batch_concurrency))
+    
+    async def identify(image: UploadFile):
+        """读取 + 命中缓存 / AI 识别，返回 (图片指纹, 缓存结果, 识别结果)"""
+        image_bytes = await _read_upload(image)
+        image_key = compute_image_key(image_bytes)
+        cached = recognition_cache.get(image_key)
+        if cached is not None:
+            return image_key, cached, None
+        async with semaphore:
+            return image_key, None, await _identify_image(image_bytes, image.content_type, image_key)
+    
+    identified = await asyncio.gather(
+        *(identify(image) for image in images),
+        return_exceptions=True,
+    )
+    
+    # 本地食物库按菜名一次查齐，相同菜名只查一次
+    food_service = FoodService(db)
+    names = set()
+    for outcome in identified:
+        if isinstance(outcome, BaseException):
+            continue
+        identification = outcome[2]
+        if identification and identification[1]:
+            names.add(identification[1][0].name)
+    food_details = {name: food_service.get_food_response(name) for name in names}
+    
+    async def build(item: BatchRecognizeItem, outcome):
+        if isinstance(outcome, BaseException):
+            raise outcome
+        image_key, cached, identification = outcome
+        if cached is not None:
+            return cached
+        saved_image_url, results, ai_source = identification
+        async with semaphore:
+            response = await _build_response(
+                saved_image_url, results, ai_source, food_service, db, food_details
+            )
+        if response.results:
+            recognition_cache.set(image_key, response)
+        return response
+    
+    responses = await asyncio.gather(
+        *(build(item, outcome) for item, outcome in zip(items, identified)),
+        return_exceptions=True,
+    )
+    
+    for item, response in zip(items, responses):
+        if isinstance(response, BaseException):
+            item.error = response.detail if isinstance(response, HTTPException) else "识别失败，请重试"
+            if not isinstance(response, HTTPException):
+                logger.error(f"❌ 批量识别第 {item.index + 1} 张失败: {type(response).__name__}: {response}")
+        else:
+            item.success = True
+            item.data = response
+    
+    succeeded = sum(1 for item in items if item.success)
+    metrics.incr("recognition.batch_requests")
+    metrics.incr("recognition.batch_images", len(items))
+    return APIResponse.success(data=BatchRecognizeResponse(
+        items=items,
+        succeeded=succeeded,
+        failed=len(items) - succeeded,
+    ))
+
+
+@router.post("/recognize/jobs", response_model=APIResponse[RecognitionJobResponse])
+async def submit_recognition_job(
+    image: UploadFile = File(..., description="食物图片"),
+):
+    """
+    异步识别：上传后立即返回任务 ID，不占用连接等待 AI 结果
+    
+    通过 GET /recognize/jobs/{job_id} 轮询，
+    或 GET /recognize/jobs/{job_id}/events 订阅 SSE 获取结果
+    """
+    image_bytes = await _read_upload(image)
+    content_type = image.content_type
+    
+    async def runner():
+        # 请求结束后 Session 会关闭，任务内单独创建
+        db = SessionLocal()
+        try:
+            response = await _recognize_with_cache(image_bytes, content_type, db)
+            return response.model_dump()
+        except HTTPException as e:
+            # 与同步接口一致：主动抛出的业务错误原样返回，其余异常只返回通用提示
+            raise JobError(e.detail) from e
+        finally:
+            db.close()
+    
+    try:
+        job = recognition_jobs.submit(runner)
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="识别任务繁忙，请稍后再试")
+    
+    logger.info(f"📥 识别任务已提交: {job.id}")
+    return APIResponse.success(data=_job_payload(job), message="任务已提交")
+
+
+@router.get("/recognize/jobs/{job_id}", response_model=APIResponse[RecognitionJobResponse])
+async def get_recognition_job(job_id: str):
+    """查询识别任务状态，完成后 result 为识别结果"""
+    job = _get_job_or_404(job_id)
+    return APIResponse.success(data=_job_payload(job))
+
+
+@router.get("/recognize/jobs/{job_id}/events")
+async def stream_recognition_job(job_id: str, request: Request):
+    """
+    以 Server-Sent Events 推送识别任务状态
+    
+    事件类型：status（排队/执行中）、result（完成，含识别结果或错误），推送 result 后关闭连接
     """
+    job = _get_job_or_404(job_id)
+    
+    async def events():
+        while True:
+            changed = job.changed
+            payload = _job_payload(job)
+            if job.finished:
+                yield _sse_event("result", payload)
+                return
+            yield _sse_event("status", payload)
+            
+            # 等待状态变化，期间定时发送心跳避免代理断开空闲连接
+            while not changed.is_set():
+                if await request.is_disconnected():
+                    return
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=settings.recognition_job_sse_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _get_job_or_404(job_id: str) -> Job:
+    job = recognition_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    return job
+
+
+def _job_payload(job: Job) -> dict:
+    data = job.to_dict()
+    data["queue_position"] = recognition_jobs.position(job)
+    return data
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def _read_upload(image: UploadFile) -> bytes:
+    """校验并读取上传图片"""
     # 验证文件类型
     if image.content_type not in ["image/jpeg", "image/png", "image/bmp"]:
         raise HTTPException(status_code=400, detail="仅支持 jpg, png, bmp 格式的图片")
@@ -91,55 +349,91 @@ async def recognize_food(
     # 限制图片大小（4MB）
     if len(image_bytes) > 4 * 1024 * 1024:
         raise HTTPException(status_code=400, detail="图片大小不能超过 4MB")
+    return image_bytes
+
+
+async def _recognize_with_cache(image_bytes: bytes, content_type: str, db: Session) -> RecognizeResponse:
+    """识别图片，相同图片直接返回缓存结果"""
+    image_key = compute_image_key(image_bytes)
+    cached = recognition_cache.get(image_key)
+    if cached is not None:
+        logger.info(f"♻️ 命中识别缓存: {image_key[:12]}")
+        # 返回副本，调用方修改响应不会污染缓存
+        return cached.model_copy(deep=True)
+    
+    response = await _recognize_image(image_bytes, content_type, image_key, db)
+    
+    # 只缓存成功的识别，失败结果可能是服务临时不可用
+    if response.results:
+        recognition_cache.set(image_key, response.model_copy(deep=True))
+    return response
+
+
+async def _recognize_image(
+    image_bytes: bytes, content_type: str, image_key: str, db: Session
+) -> RecognizeResponse:
+    """
+    识别流水线：保存图片 -> 近似图片匹配 / 预处理 + AI 识别 -> 详情补充
+    """
+    saved_image_url, results, ai_source = await _identify_image(image_bytes, content_type, image_key)
+    return await _build_response(saved_image_url, results, ai_source, FoodService(db), db)
+
+
+async def _identify_image(image_bytes: bytes, content_type: str, image_key: str):
+    """
+    识别阶段（不访问数据库）
     
+    Returns:
+        (图片 URL, 识别结果列表, AI 来源)
+    """
     # 保存图片
-    saved_image_url = save_recognition_image(image_bytes, image.content_type)
+    saved_image_url = save_recognition_image(image_bytes, content_type, image_key)
     logger.info(f"📸 图片已保存: {saved_image_url}")
     
-    # 转换为 base64
-    image_base64 = encode_image_to_base64(image_bytes)
-    
-    # 选择识别服务：优先豆包，降级百度
-    ai_source = None
-    results = []
+    # 近似图片（重拍/重新压缩的同一盘菜）直接复用识别结果
+    image_hash = None
+    similar = None
+    if settings.image_hash_enabled:
+        image_hash = await asyncio.to_thread(compute_dhash, image_bytes)
+        if image_hash is not None:
+            similar = image_hash_index.find(image_hash)
     
-    if settings.doubao_configured:
-        # 使用豆包 AI
-        try:
-            logger.info("🔍 使用豆包 AI 进行识别...")
-            results = await doubao_ai_service.recognize_food(image_base64)
-            ai_source = "doubao"
-        except Exception as e:
-            logger.warning(f"豆包AI调用失败，降级到百度AI: {type(e).__name__}: {str(e)}")
-            ai_source = None
-    
-    if not results and settings.baidu_ai_configured:
-        # 降级到百度 AI
-        try:
-            logger.info("🔍 使用百度 AI 进行识别...")
-            results = await baidu_ai_service.recognize_dish(image_base64)
-            ai_source = "baidu"
-        except Exception as e:
-            logger.warning(f"百度AI调用失败: {type(e).__name__}: {str(e)}")
+    if similar:
+        (results, ai_source), distance = similar
+        logger.info(f"♻️ 命中近似图片索引: 汉明距离 {distance}, 来源 {ai_source}")
+    else:
+        image_base64, mime_type, baidu_image_base64 = await _prepare_image_payload(image_bytes, content_type)
+        results, ai_source = await _recognize_with_providers(image_base64, mime_type, baidu_image_base64)
+        if results and ai_source and image_hash is not None:
+            image_hash_index.add(image_hash, (results, ai_source))
     
+    return saved_image_url, results, ai_source
+
+
+async def _build_response(
+    saved_image_url: str,
+    results,
+    ai_source: Optional[str],
+    food_service: FoodService,
+    db: Session,
+    food_details: Optional[dict] = None,
+) -> RecognizeResponse:
+    """详情阶段：查询本地库 / AI 补充营养信息，组装响应"""
     if not results:
         # 都失败了，返回空结果
-        return APIResponse.success(
-            data=RecognizeResponse(
-                results=[],
-                top_result=None,
-                image_url=saved_image_url,
-                message="未能识别出食物，请尝试更清晰的图片",
-            )
+        return RecognizeResponse(
+            results=[],
+            top_result=None,
+            image_url=saved_image_url,
+            message="未能识别出食物，请尝试更清晰的图片",
         )
     
     # 获取最佳匹配的详细信息
     top_result = results[0]
-    food_service = FoodService(db)
     
     # 构建详细结果
     top_result_detail = await _build_top_result_detail(
-        top_result, food_service, ai_source, db
+        top_result, food_service, ai_source, db, food_details
     )
     
     # 构建响应
@@ -152,28 +446,266 @@ async def recognize_food(
     elif ai_source == "baidu":
         message = "识别成功（百度AI）"
     
-    return APIResponse.success(
-        data=RecognizeResponse(
-            results=results,
-            top_result=top_result_detail,
-            image_url=saved_image_url,
-            message=message,
-            is_mock=is_mock,
+    return RecognizeResponse(
+        results=results,
+        top_result=top_result_detail,
+        image_url=saved_image_url,
+        message=message,
+        is_mock=is_mock,
+    )
+
+
+async def _prepare_image_payload(image_bytes: bytes, content_type: str):
+    """
+    预处理并编码待识别图片（在线程池中执行，不阻塞事件循环）
+    
+    Returns:
+        (base64, MIME 类型, 百度专用 base64)；输出为 WebP 时百度使用原图，否则为 None
+    """
+    if not settings.image_preprocess_enabled:
+        return encode_image_to_base64(image_bytes), content_type, None
+    
+    image = await asyncio.to_thread(
+        preprocess_image,
+        image_bytes,
+        content_type,
+        settings.image_max_edge,
+        settings.image_encode_quality,
+        settings.image_encode_format,
+    )
+    metrics.incr("preprocess.images")
+    metrics.observe("preprocess.cpu_ms", image.cpu_ms)
+    if image.transformed:
+        metrics.incr("preprocess.bytes_in", image.original_size)
+        metrics.incr("preprocess.bytes_out", len(image.data))
+        metrics.incr("preprocess.bytes_saved", image.bytes_saved)
+        logger.info(
+            f"🗜️ 图片预处理: {image.original_size} -> {len(image.data)} bytes "
+            f"({image.width}x{image.height}, 节省 {image.bytes_saved} bytes, CPU {image.cpu_ms:.1f}ms)"
         )
+    
+    image_base64 = encode_image_to_base64(image.data)
+    baidu_image_base64 = None
+    if image.mime_type == "image/webp":
+        # 百度图像识别仅支持 jpg/png/bmp
+        baidu_image_base64 = encode_image_to_base64(image_bytes)
+    return image_base64, image.mime_type, baidu_image_base64
+
+
+async def _recognize_with_providers(
+    image_base64: str, mime_type: str = "image/jpeg", baidu_image_base64: Optional[str] = None
+):
+    """
+    调用视觉识别服务：优先豆包，降级百度
+    
+    两者都已配置且开启对冲时，豆包超过延迟阈值仍未返回就并行发起百度请求，
+    先返回可用结果的一方胜出
+    
+    Returns:
+        (识别结果列表, AI 来源)
+    """
+    baidu_base64 = baidu_image_base64 or image_base64
+    if settings.recognition_hedge_enabled and settings.doubao_configured and settings.baidu_ai_configured:
+        return await _recognize_hedged(image_base64, mime_type, baidu_base64)
+    
+    ai_source = None
+    results = []
+    
+    if settings.doubao_configured:
+        # 使用豆包 AI
+        try:
+            results = await _call_doubao(image_base64, mime_type)
+            ai_source = "doubao"
+        except Exception as e:
+            logger.warning(f"豆包AI调用失败，降级到百度AI: {type(e).__name__}: {str(e)}")
+            ai_source = None
+    
+    if not results and settings.baidu_ai_configured:
+        # 降级到百度 AI
+        try:
+            results = await _call_baidu(baidu_base64)
+            ai_source = "baidu"
+        except Exception as e:
+            logger.warning(f"百度AI调用失败: {type(e).__name__}: {str(e)}")
+    
+    return results, ai_source
+
+
+async def _call_doubao(image_base64: str, mime_type: str):
+    logger.info("🔍 使用豆包 AI 进行识别...")
+    started = time.perf_counter()
+    results = await doubao_ai_service.recognize_food(image_base64, mime_type=mime_type)
+    # 只记录成功调用的耗时，作为对冲延迟的依据
+    metrics.observe("doubao.latency_ms", (time.perf_counter() - started) * 1000)
+    return results
+
+
+async def _call_baidu(image_base64: str):
+    logger.info("🔍 使用百度 AI 进行识别...")
+    return await baidu_ai_service.recognize_dish(image_base64)
+
+
+def _hedge_delay_seconds() -> float:
+    """
+    对冲延迟：豆包历史耗时的分位数（默认 p95）
+    
+    样本不足时使用默认值，并限制在 [min, max] 区间内
+    """
+    delay = settings.recognition_hedge_default_delay_seconds
+    if len(metrics.samples("doubao.latency_ms")) >= settings.recognition_hedge_min_samples:
+        delay = metrics.percentile("doubao.latency_ms", settings.recognition_hedge_quantile) / 1000
+    return min(
+        max(delay, settings.recognition_hedge_min_delay_seconds),
+        settings.recognition_hedge_max_delay_seconds,
     )
 
 
+async def _recognize_hedged(image_base64: str, mime_type: str, baidu_base64: str):
+    """豆包 + 百度对冲请求"""
+    started = time.perf_counter()
+    delay = _hedge_delay_seconds()
+    doubao_task = asyncio.create_task(_call_doubao(image_base64, mime_type))
+    tasks = {doubao_task: "doubao"}
+    finished_at = {}
+    hedged = False
+    
+    try:
+        await asyncio.wait({doubao_task}, timeout=delay)
+        if doubao_task.done():
+            finished_at[doubao_task] = time.perf_counter()
+            results = _usable_results(doubao_task, "豆包")
+            if results:
+                return results, "doubao"
+        else:
+            hedged = True
+            metrics.incr("hedge.fired")
+            logger.info(f"⏱️ 豆包 AI {delay:.1f}s 内未返回，并行发起百度 AI 请求")
+        
+        baidu_started = time.perf_counter()
+        baidu_task = asyncio.create_task(_call_baidu(baidu_base64))
+        tasks[baidu_task] = "baidu"
+        pending = {task for task in tasks if not task.done()}
+        
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            now = time.perf_counter()
+            # 同时完成时优先豆包
+            for task in sorted(done, key=lambda t: tasks[t] != "doubao"):
+                finished_at[task] = now
+                source = tasks[task]
+                results = _usable_results(task, "豆包" if source == "doubao" else "百度")
+                if results:
+                    if source == "baidu" and hedged:
+                        _record_hedge_win(started, baidu_started, now, finished_at.get(doubao_task))
+                    return results, source
+        return [], None
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        metrics.observe("recognition.providers_ms", (time.perf_counter() - started) * 1000)
+
+
+def _usable_results(task: asyncio.Task, label: str):
+    """取出任务结果，异常或空结果返回空列表"""
+    if task.cancelled():
+        return []
+    error = task.exception()
+    if error is not None:
+        logger.warning(f"{label}AI调用失败: {type(error).__name__}: {str(error)}")
+        return []
+    return task.result() or []
+
+
+def _record_hedge_win(
+    started: float, baidu_started: float, finished: float, doubao_failed_at: Optional[float]
+) -> None:
+    """
+    记录对冲胜出及节省的时间
+    
+    - 豆包已失败：顺序降级要等豆包失败后才发起百度，节省 = 豆包失败时刻 - 百度发起时刻
+    - 豆包仍未返回（被取消）：按历史上比当前耗时更慢的豆包样本均值估算，无此类样本时不计
+    """
+    metrics.incr("hedge.won")
+    elapsed_ms = (finished - started) * 1000
+    saved_ms = None
+    if doubao_failed_at is not None:
+        saved_ms = max(doubao_failed_at - baidu_started, 0) * 1000
+    else:
+        slower = [v for v in metrics.samples("doubao.latency_ms") if v > elapsed_ms]
+        if slower:
+            saved_ms = sum(slower) / len(slower) - elapsed_ms
+    if saved_ms is not None:
+        metrics.observe("hedge.latency_saved_ms", saved_ms)
+    logger.info(f"🏁 对冲请求百度 AI 胜出，耗时 {elapsed_ms:.0f}ms（百度 {(finished - baidu_started) * 1000:.0f}ms）")
+
+
+async def _fetch_ai_nutrition(name: str, baidu_calorie: Optional[str]):
+    """
+    调用 DeepSeek 获取营养信息并写入临时表（并发合并时只由发起方执行一次）
+
+    合并的任务可能比发起请求活得更久，也会被其他请求等待，入库使用独立 Session，
+    不借用发起方请求作用域的 Session
+    """
+    if deepseek_service.is_configured:
+        metrics.incr("enrichment.deepseek_calls")
+    ai_nutrition = await deepseek_service.get_nutrition_info(name, baidu_calorie)
+    if not ai_nutrition:
+        return None
+    
+    session = SessionLocal()
+    try:
+        FoodService(session).upsert_temp_food(
+            name=name,
+            nutrition={
+                "calories": ai_nutrition.get("calories", 0),
+                "protein": ai_nutrition.get("protein", 0),
+                "fat": ai_nutrition.get("fat", 0),
+                "carb": ai_nutrition.get("carbohydrate", 0),
+            },
+            source="deepseek_ai",
+            detail={
+                "gi": ai_nutrition.get("gi"),
+                "health_rating": ai_nutrition.get("health_rating"),
+                "health_tips": ai_nutrition.get("health_tips"),
+                "contraindications": [item.model_dump() for item in _parse_ai_contraindications(ai_nutrition)],
+            },
+        )
+    finally:
+        session.close()
+    return ai_nutrition
+
+
+def _parse_ai_contraindications(ai_nutrition: dict):
+    """解析 DeepSeek 返回的禁忌人群"""
+    contraindications = []
+    for item in ai_nutrition.get("contraindications", []):
+        contraindications.append(ContraindicationInfo(
+            condition_type=item.get("condition_type", ""),
+            severity=item.get("severity", "少食"),
+            reason=item.get("reason", ""),
+        ))
+    return contraindications
+
+
 async def _build_top_result_detail(
-    top_result, food_service: FoodService, ai_source: str, db: Session
+    top_result, food_service: FoodService, ai_source: str, db: Session,
+    food_details: Optional[dict] = None,
 ) -> RecognitionTopResult:
     """
     构建识别结果详情
     
     优先使用豆包返回的完整信息，
     如果是百度识别则补充 DeepSeek 分析
+    
+    food_details 为批量识别预先查好的 {菜名: FoodResponse | None}
     """
     # 先查本地数据库
-    food_detail = food_service.get_food_response(top_result.name)
+    if food_details is not None and top_result.name in food_details:
+        food_detail = food_details[top_result.name]
+    else:
+        food_detail = food_service.get_food_response(top_result.name)
     
     if food_detail:
         # 数据库有数据，使用数据库信息
@@ -208,18 +740,6 @@ async def _build_top_result_detail(
             carbohydrate=nutrition_dict.get("carbohydrate", 0),
         )
         
-        # 缓存到临时表
-        food_service.upsert_temp_food(
-            name=top_result.name,
-            nutrition={
-                "calories": nutrition_info.calories,
-                "protein": nutrition_info.protein,
-                "fat": nutrition_info.fat,
-                "carb": nutrition_info.carbohydrate,
-            },
-            source="doubao_ai",
-        )
-        
         # 解析豆包返回的不适宜人群
         contraindications = []
         raw_contraindications = getattr(top_result, 'contraindications', None) or []
@@ -232,6 +752,22 @@ async def _build_top_result_detail(
                     suggestion=item.get("advice", item.get("suggestion", "")),
                 ))
         
+        # 缓存到临时表
+        food_service.upsert_temp_food(
+            name=top_result.name,
+            nutrition={
+                "calories": nutrition_info.calories,
+                "protein": nutrition_info.protein,
+                "fat": nutrition_info.fat,
+                "carb": nutrition_info.carbohydrate,
+            },
+            source="doubao_ai",
+            detail={
+                "health_tips": top_result.health_tips,
+                "contraindications": [item.model_dump() for item in contraindications],
+            },
+        )
+        
         return RecognitionTopResult(
             name=top_result.name,
             confidence=top_result.confidence,
@@ -251,40 +787,52 @@ async def _build_top_result_detail(
             ai_source="doubao",
         )
     
-    # 百度识别或豆包信息不完整，尝试 DeepSeek 补充
+    # 百度识别或豆包信息不完整：临时表已有可信的 AI 补充数据时直接复用
     baidu_calorie = getattr(top_result, 'baidu_calorie', None)
-    ai_nutrition = await deepseek_service.get_nutrition_info(
-        top_result.name, 
-        baidu_calorie
+    temp_food = food_service.get_reusable_temp_food(top_result.name)
+    if temp_food:
+        metrics.incr("enrichment.food_temp_hits")
+        if deepseek_service.is_configured:
+            metrics.incr("enrichment.deepseek_avoided")
+        logger.info(f"♻️ 复用临时表营养数据: {top_result.name}（来源 {temp_food.source}）")
+        detail = food_service.get_temp_detail(temp_food)
+        return RecognitionTopResult(
+            name=top_result.name,
+            confidence=top_result.confidence,
+            category=top_result.category or "AI分析",
+            baidu_calorie=baidu_calorie,
+            nutrition=NutritionInfo(
+                calories=temp_food.calories,
+                protein=temp_food.protein,
+                fat=temp_food.fat,
+                carbohydrate=temp_food.carbohydrate,
+            ),
+            gi=detail.get("gi"),
+            health_rating=detail.get("health_rating"),
+            health_tips=detail.get("health_tips"),
+            contraindications=[ContraindicationInfo(**item) for item in detail.get("contraindications", [])],
+            found_in_database=False,
+            ai_generated=True,
+            ai_source=ai_source or "deepseek",
+        )
+    metrics.incr("enrichment.food_temp_misses")
+    
+    # 尝试 DeepSeek 补充（同名菜品的并发请求合并为一次调用）
+    ai_nutrition = await single_flights.get("deepseek_nutrition").do(
+        normalize_key(top_result.name),
+        _fetch_ai_nutrition,
+        top_result.name,
+        baidu_calorie,
     )
     
     if ai_nutrition:
-        food_service.upsert_temp_food(
-            name=top_result.name,
-            nutrition={
-                "calories": ai_nutrition.get("calories", 0),
-                "protein": ai_nutrition.get("protein", 0),
-                "fat": ai_nutrition.get("fat", 0),
-                "carb": ai_nutrition.get("carbohydrate", 0),
-            },
-            source="deepseek_ai",
-        )
-        
         nutrition_info = NutritionInfo(
             calories=ai_nutrition.get("calories", 0),
             protein=ai_nutrition.get("protein", 0),
             fat=ai_nutrition.get("fat", 0),
             carbohydrate=ai_nutrition.get("carbohydrate", 0),
         )
-        
-        # 解析禁忌人群
-        contraindications = []
-        for item in ai_nutrition.get("contraindications", []):
-            contraindications.append(ContraindicationInfo(
-                condition_type=item.get("condition_type", ""),
-                severity=item.get("severity", "少食"),
-                reason=item.get("reason", ""),
-            ))
+        contraindications = _parse_ai_contraindications(ai_nutrition)
         
         return RecognitionTopResult(
             name=top_result.name,
@@ -30,6 +30,10 @@ class Settings(BaseSettings):
     # 百度AI配置（备用）
     baidu_api_key: str = ""
     baidu_secret_key: str = ""
+    # 菜品/果蔬/植物三个接口并发调用的总时限（秒）
+    baidu_recognition_deadline_seconds: float = 15.0
+    # 菜品识别置信度达到该值时取消其余接口
+    baidu_dish_early_exit_confidence: float = 0.9
 
     # 豆包 AI 配置（火山引擎方舟）- 主要识别服务
     doubao_api_key: str = ""
@@ -60,7 +64,98 @@ class Settings(BaseSettings):
     
     # JWT Token 过期时间（天）
     access_token_expire_days: int = 7
-    
+
+    # 第三方 access_token 缓存（百度/FatSecret/微信），过期前提前刷新
+    credential_refresh_ahead_seconds: int = 600
+    credential_refresh_check_seconds: int = 60
+
+    # 外部服务共享 HTTP 连接池
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_seconds: float = 30.0
+    http2_enabled: bool = False
+
+    # AI 服务熔断器（按最近调用的失败率/慢调用率熔断，冷却后半开探测）
+    circuit_breaker_enabled: bool = True
+    circuit_breaker_window_size: int = 20
+    circuit_breaker_min_calls: int = 5
+    circuit_breaker_failure_rate: float = 0.5
+    circuit_breaker_slow_call_rate: float = 0.8
+    circuit_breaker_open_seconds: float = 30.0
+
+    # 识别结果缓存（按图片 SHA-256 命中，避免重复调用 AI）
+    recognition_cache_ttl_seconds: int = 3600
+    recognition_cache_max_entries: int = 512
+
+    # 近似图片匹配（感知哈希，汉明距离不超过阈值时复用识别结果）
+    image_hash_enabled: bool = True
+    image_hash_max_distance: int = 6
+    image_hash_max_entries: int = 5000
+    image_hash_ttl_seconds: int = 3600
+
+    # 临时食物表复用（识别补充营养信息时优先使用，避免重复调用 DeepSeek）
+    food_temp_max_age_days: int = 30
+    food_temp_min_source_quality: int = 2  # 见 food_service.TEMP_SOURCE_QUALITY
+
+    # 批量识别（一餐多图）
+    recognition_batch_max_images: int = 6
+    recognition_batch_concurrency: int = 3
+
+    # 异步识别任务队列
+    recognition_job_workers: int = 4
+    recognition_job_queue_size: int = 100
+    recognition_job_result_ttl_seconds: int = 600
+    recognition_job_sse_heartbeat_seconds: float = 15.0
+
+    # 识别对冲请求：豆包超过历史耗时分位数仍未返回时并行请求百度，先到先用
+    recognition_hedge_enabled: bool = True
+    recognition_hedge_quantile: float = 0.95
+    recognition_hedge_min_samples: int = 20           # 样本不足时使用默认延迟
+    recognition_hedge_default_delay_seconds: float = 8.0
+    recognition_hedge_min_delay_seconds: float = 1.0
+    recognition_hedge_max_delay_seconds: float = 20.0
+
+    # 识别前图片预处理（EXIF 旋正、缩放长边、重新编码）
+    image_preprocess_enabled: bool = True
+    image_max_edge: int = 1280
+    image_encode_quality: int = 85
+    image_encode_format: str = "JPEG"  # JPEG / WEBP（百度接口不支持 WebP，降级时会回退原图）
+
+    # 食谱生成策略：single（一次请求生成 7 天）/ parallel（先生成周大纲，再按天并发生成）
+    plan_generation_strategy: str = "single"
+    plan_parallel_concurrency: int = 3
+    plan_day_max_retries: int = 1  # 单日校验失败时的重试次数
+
+    # 食谱详情缓存（生成后不再修改，按 id + updated_at 校验）
+    plan_detail_cache_max_entries: int = 512
+    plan_detail_cache_ttl_seconds: int = 86400
+
+    # 食谱模板缓存（跨用户复用：目标、偏好、不喜欢的标签、BMI/年龄/活动分档一致）
+    plan_template_cache_max_entries: int = 256
+    plan_template_cache_ttl_seconds: int = 21600
+
+    # 精品食谱标签 / 分类目录（进程内增量维护，过期后重建以同步其他 worker 的写入）
+    recipe_catalog_ttl_seconds: int = 300
+
+    # 食物搜索：ngram（进程内倒排索引）/ like（原 LIKE 全表扫描）
+    food_search_backend: str = "ngram"
+    food_search_check_seconds: int = 60  # 校验食物表是否有外部写入的间隔（搜索索引与联想索引共用）
+
+    # 精品食谱浏览数 / 收藏数写缓冲（按间隔或累计增量达到阈值时批量写回）
+    recipe_counter_flush_seconds: float = 5.0
+    recipe_counter_flush_threshold: int = 1000
+
+    # 食谱夜间预生成（低峰时段为活跃用户提前生成当天食谱；多 worker 部署只在一个 worker 开启）
+    plan_pregen_enabled: bool = False
+    plan_pregen_quiet_start_hour: int = 2  # 低峰时段 [start, end)，支持跨零点
+    plan_pregen_quiet_end_hour: int = 6
+    plan_pregen_active_days: int = 7  # 最近 N 天有记录/生成/资料修改视为活跃
+    plan_pregen_stale_days: int = 3  # 上次生成超过 N 天即重新生成
+    plan_pregen_concurrency: int = 2
+    plan_pregen_max_per_run: int = 200  # 每晚最多调用 AI 的次数（DeepSeek 配额预算）
+    plan_pregen_min_interval_seconds: float = 2.0  # 相邻两次生成的最小间隔
+    plan_pregen_check_seconds: int = 300
+
     # 模型配置，从 .env 文件读取环境变量
     model_config = SettingsConfigDict(
         env_file=".env",
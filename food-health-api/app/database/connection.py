@@ -4,7 +4,7 @@
 """
 import logging
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from app.config import get_settings
@@ -64,8 +64,32 @@ def get_db():
 def create_tables():
     """创建所有数据库表"""
     # 导入所有模型以确保它们被注册
-    from app.models import food, user, user_meal, weight_record, user_favorite  # noqa: F401
+    from app.models import food, user, user_meal, weight_record, user_favorite, credential, diet_plan, tag  # noqa: F401
     Base.metadata.create_all(bind=engine)
+    ensure_columns()
+
+
+# 后续版本新增的可空列：(表名, 列名, 列定义)
+# create_all 不会修改已存在的表，启动时自动补齐
+ADDED_COLUMNS = [
+    ("food_temp", "detail", "TEXT NULL"),
+    ("service_credential", "lease_until", "DATETIME NULL"),
+]
+
+
+def ensure_columns():
+    """为已存在的表补齐新增列"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table, column, ddl in ADDED_COLUMNS:
+            if table not in existing_tables:
+                continue
+            columns = {col["name"] for col in inspector.get_columns(table)}
+            if column in columns:
+                continue
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            logger.info(f"🛠️ 已为 {table} 表添加列 {column}")
 
 
 def init_database():
@@ -6,6 +6,7 @@ import json
 from sqlalchemy.orm import Session
 
 from app.models.food import PremiumRecipe
+from app.services.tag_index import parse_recipe_tags, set_recipe_tags
 
 
 def init_premium_recipes(db: Session):
@@ -200,4 +201,6 @@ def init_premium_recipes(db: Session):
     ]
     
     db.add_all(recipes)
+    db.flush()
+    set_recipe_tags(db, {recipe.id: parse_recipe_tags(recipe.tags) for recipe in recipes})
     print(f"  ✓ 已初始化 {len(recipes)} 条精品食谱数据")
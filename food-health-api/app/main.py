@@ -2,6 +2,7 @@
 """
 智能食物识别健康助手 - FastAPI 应用入口
 """
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from pathlib import Path
@@ -14,6 +15,16 @@ from fastapi.responses import JSONResponse
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from app.rate_limit import limiter
+from app.services.metrics import metrics
+from app.services.http_client import http_clients
+from app.services.circuit_breaker import circuit_breakers
+from app.services.single_flight import single_flights
+from app.services.credential_store import credential_store
+from app.services.plan_pregeneration import plan_pregenerator
+from app.services.food_search_index import food_search_index
+from app.services.food_suggest import food_suggest_index
+from app.services.recipe_catalog import recipe_catalog
+from app.services.recipe_counters import recipe_counters
 
 from app.config import get_settings
 from app.database.connection import create_tables, init_database
@@ -29,13 +40,19 @@ settings = get_settings()
 async def lifespan(app: FastAPI):
     """
     应用生命周期管理
-    启动时：创建数据库表，初始化数据
+    启动时：创建数据库表，初始化数据，启动异步识别 worker
+    关闭时：停止任务队列，释放共享 HTTP 连接池
     """
     # 启动时执行
     logger.info("正在启动服务...")
     create_tables()
     init_database()
     logger.info("数据库初始化完成")
+    # 食物搜索 n-gram 索引，在线程池中构建，不阻塞事件循环
+    if settings.food_search_backend != "like":
+        await asyncio.to_thread(food_search_index.warm)
+    # 搜索联想前缀索引（名称 / 别名 / 拼音）
+    await asyncio.to_thread(food_suggest_index.warm)
     
     if settings.doubao_configured:
         logger.info("✅ 豆包AI已配置（主要识别服务）")
@@ -55,9 +72,23 @@ async def lifespan(app: FastAPI):
     else:
         logger.warning("⚠️ DeepSeek未配置，豆包识别失败时将无法补充营养信息")
     
+    # 异步识别任务 worker
+    recognition.recognition_jobs.start()
+    # 第三方 access_token 后台刷新
+    credential_store.start()
+    # 低峰时段预生成食谱（PLAN_PREGEN_ENABLED 开启时）
+    plan_pregenerator.start(plan.pregenerate_plan)
+    # 精品食谱浏览数 / 收藏数批量写回
+    recipe_counters.start()
+    
     yield
     
     # 关闭时执行
+    await recognition.recognition_jobs.stop()
+    await credential_store.stop()
+    await plan_pregenerator.stop()
+    await recipe_counters.stop()
+    await http_clients.aclose()
     logger.info("服务已关闭")
 
 
@@ -197,7 +228,34 @@ async def api_status():
                     "api_key": mask_key(settings.deepseek_api_key) if settings.deepseek_api_key else "",
                     "base_url": settings.deepseek_base_url or "https://api.deepseek.com",
                 },
-            }
+            },
+            # 进程内缓存统计
+            "caches": {
+                "recognition": recognition.recognition_cache.stats(),
+                "image_hash": recognition.image_hash_index.stats(),
+                "food_temp": recognition.enrichment_stats(),
+                "plan_detail": plan.plan_detail_cache.stats(),
+                "plan_template": plan.plan_template_cache.stats(),
+                "recipe_catalog": recipe_catalog.stats(),
+                "food_search": food_search_index.stats(),
+                "food_suggest": food_suggest_index.stats(),
+            },
+            # 异步任务队列深度与等待时间
+            "jobs": {
+                "recognition": recognition.recognition_jobs.stats(),
+                "plan_pregeneration": plan_pregenerator.stats(),
+                "recipe_counters": recipe_counters.stats(),
+            },
+            # 外部服务连接池使用与复用率
+            "http_clients": http_clients.stats(),
+            # AI 服务熔断器状态
+            "circuit_breakers": circuit_breakers.stats(),
+            # 第三方 access_token 缓存
+            "credentials": credential_store.stats(),
+            # 并发相同 AI 请求合并情况
+            "single_flight": single_flights.stats(),
+            # 运行时指标（调用次数、耗时分布）
+            "metrics": metrics.snapshot(),
         }
     }
 
@@ -4,9 +4,14 @@ from app.models.food import Food, FoodTemp, FoodContraindication, FoodPortion, C
 from app.models.user import User, RecognitionHistory
 from app.models.weight_record import WeightRecord
 from app.models.user_favorite import UserFavorite
+from app.models.credential import ServiceCredential
+from app.models.diet_plan import DietPlan, DietPlanDay, DietPlanMeal
+from app.models.tag import Tag, DietPlanTag, PremiumRecipeTag
 
 __all__ = [
     "Food", "FoodTemp", "FoodContraindication", "FoodPortion", "CookingMethod",
     "User", "RecognitionHistory", "WeightRecord",
-    "UserFavorite",
+    "UserFavorite", "ServiceCredential",
+    "DietPlan", "DietPlanDay", "DietPlanMeal",
+    "Tag", "DietPlanTag", "PremiumRecipeTag",
 ]
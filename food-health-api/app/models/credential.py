@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""
+第三方服务凭证模型
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime
+
+from app.database.connection import Base
+
+
+class ServiceCredential(Base):
+    """第三方接口 access_token 缓存（多进程共享，重启后仍有效）"""
+    __tablename__ = "service_credential"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(50), unique=True, index=True, nullable=False, comment="服务名：baidu/fatsecret/wechat")
+    token = Column(Text, nullable=False, comment="access_token")
+    expires_at = Column(DateTime, nullable=False, comment="过期时间")
+    lease_until = Column(DateTime, nullable=True, comment="刷新租约到期时间（多 worker 只由持有者刷新）")
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
+
+    def __repr__(self):
+        return f"<ServiceCredential(name='{self.name}', expires_at={self.expires_at})>"
@@ -3,7 +3,7 @@
 推荐食谱数据库模型
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Enum, Boolean, Index
 from sqlalchemy.orm import relationship
 
 from app.database.connection import Base
@@ -33,6 +33,13 @@ class DietPlan(Base):
     
     # 关联
     days = relationship("DietPlanDay", back_populates="plan", cascade="all, delete-orphan", order_by="DietPlanDay.day_index")
+
+    # 索引：列表按 (created_at, id) 游标翻页；按来源筛选；按用户查今日/推荐食谱
+    __table_args__ = (
+        Index("idx_plan_created", "created_at"),
+        Index("idx_plan_source_created", "source", "created_at"),
+        Index("idx_plan_author_source_created", "author_id", "source", "created_at"),
+    )
     
     def __repr__(self):
         return f"<DietPlan(id={self.id}, name='{self.name}')>"
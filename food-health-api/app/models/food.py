@@ -62,6 +62,8 @@ class FoodTemp(Base):
     carbohydrate = Column(Float, nullable=False, comment="碳水化合物 g/100g")
 
     source = Column(String(50), comment="数据来源")
+    # AI 补充的健康信息 JSON：gi / health_rating / health_tips / contraindications
+    detail = Column(Text, nullable=True, comment="AI 补充详情(JSON)")
     created_at = Column(DateTime, default=datetime.now, comment="创建时间")
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
 
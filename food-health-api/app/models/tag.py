@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+标签字典与关联表
+
+食谱计划（逗号分隔）与精品食谱（JSON 数组）的 tags 文本列仍用于展示，
+按标签筛选走关联表，以 tag_id 开头的复合索引避免全表扫描与子串误匹配。
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+
+from app.database.connection import Base
+
+
+class Tag(Base):
+    """标签字典"""
+    __tablename__ = "tag"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(50), nullable=False, unique=True, comment="标签名")
+
+    def __repr__(self):
+        return f"<Tag(id={self.id}, name='{self.name}')>"
+
+
+class DietPlanTag(Base):
+    """食谱计划-标签关联"""
+    __tablename__ = "diet_plan_tag"
+    __table_args__ = (
+        # 按标签筛选后直接按 (created_at, id) 倒序翻页，无需回表排序
+        Index("idx_plan_tag_tag_created", "tag_id", "plan_created_at", "plan_id"),
+    )
+
+    plan_id = Column(Integer, ForeignKey("diet_plan.id", ondelete="CASCADE"), primary_key=True, comment="食谱计划ID")
+    tag_id = Column(Integer, ForeignKey("tag.id", ondelete="CASCADE"), primary_key=True, comment="标签ID")
+    plan_created_at = Column(DateTime, comment="食谱创建时间（冗余，创建后不变）")
+
+
+class PremiumRecipeTag(Base):
+    """精品食谱-标签关联"""
+    __tablename__ = "premium_recipe_tag"
+    __table_args__ = (
+        Index("idx_recipe_tag_tag", "tag_id", "recipe_id"),
+    )
+
+    recipe_id = Column(Integer, ForeignKey("premium_recipes.id", ondelete="CASCADE"), primary_key=True, comment="精品食谱ID")
+    tag_id = Column(Integer, ForeignKey("tag.id", ondelete="CASCADE"), primary_key=True, comment="标签ID")
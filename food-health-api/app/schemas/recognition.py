@@ -82,3 +82,31 @@ class RecognizeResponse(BaseModel):
     message: Optional[str] = None
     is_mock: bool = Field(default=False, description="是否为模拟数据")
 
+
+
+class BatchRecognizeItem(BaseModel):
+    """批量识别中单张图片的结果"""
+    index: int = Field(description="图片在上传列表中的序号（从 0 开始）")
+    filename: Optional[str] = None
+    success: bool = False
+    data: Optional[RecognizeResponse] = None
+    error: Optional[str] = Field(None, description="失败原因")
+
+
+class BatchRecognizeResponse(BaseModel):
+    """批量识别接口响应"""
+    items: List[BatchRecognizeItem] = Field(description="按上传顺序排列的识别结果")
+    succeeded: int = 0
+    failed: int = 0
+
+
+class RecognitionJobResponse(BaseModel):
+    """异步识别任务状态"""
+    job_id: str
+    status: str = Field(description="queued / running / succeeded / failed")
+    queue_position: int = Field(0, description="排队位置，0 表示已开始或已结束")
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[RecognizeResponse] = Field(None, description="识别结果（成功时）")
+    error: Optional[str] = Field(None, description="错误信息（失败时）")
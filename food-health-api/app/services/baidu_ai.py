@@ -2,12 +2,17 @@
 """
 百度AI菜品识别服务封装
 """
+import asyncio
 import base64
-from typing import List, Optional
-import httpx
+import time
+from typing import Dict, List, Optional
 
 from app.config import get_settings
 from app.schemas.recognition import RecognitionResult
+from app.services.circuit_breaker import circuit_breakers
+from app.services.credential_store import credential_store
+from app.services.http_client import http_clients
+from app.services.metrics import metrics
 
 settings = get_settings()
 
@@ -20,11 +25,17 @@ class BaiduAIService:
     DISH_URL = "https://aip.baidubce.com/rest/2.0/image-classify/v2/dish"
     FRUIT_URL = "https://aip.baidubce.com/rest/2.0/image-classify/v1/classify/ingredient"
     PLANT_URL = "https://aip.baidubce.com/rest/2.0/image-classify/v1/plant"
+
+    # 百度API返回的否定性结果
+    NEGATIVE_NAMES = {"非果蔬食材", "非植物", "非食材", "非菜品", "未知"}
+
+    # 分类接口中文名（用于日志）
+    ENDPOINT_LABELS = {"dish": "菜品", "fruit": "果蔬", "plant": "植物"}
     
     def __init__(self):
         self.api_key = settings.baidu_api_key
         self.secret_key = settings.baidu_secret_key
-        self.access_token: Optional[str] = None
+        credential_store.register("baidu", self._fetch_access_token)
     
     @property
     def is_configured(self) -> bool:
@@ -34,8 +45,12 @@ class BaiduAIService:
     async def get_access_token(self) -> str:
         """
         获取百度AI访问令牌
-        令牌有效期30天，实际使用时应该缓存
+        令牌有效期30天，由 credential_store 缓存并在过期前刷新
         """
+        return await credential_store.get("baidu")
+    
+    async def _fetch_access_token(self):
+        """向百度申请新令牌，返回 (access_token, expires_in)"""
         if not self.is_configured:
             raise ValueError("百度AI未配置，请在 .env 文件中设置 BAIDU_API_KEY 和 BAIDU_SECRET_KEY")
         
@@ -45,15 +60,15 @@ class BaiduAIService:
             "client_secret": self.secret_key,
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(self.TOKEN_URL, params=params)
-            result = response.json()
+        client = http_clients.get("baidu")
+        response = await client.post(self.TOKEN_URL, params=params)
+        result = response.json()
             
-            if "access_token" in result:
-                self.access_token = result["access_token"]
-                return self.access_token
-            else:
-                raise ValueError(f"获取access_token失败: {result}")
+        if "access_token" in result:
+            print("✅ 获取 access_token 成功")
+            return result["access_token"], result.get("expires_in", 2592000)
+        else:
+            raise ValueError(f"获取access_token失败: {result}")
     
     async def recognize_dish(self, image_base64: str, top_num: int = 5) -> List[RecognitionResult]:
         """
@@ -66,7 +81,7 @@ class BaiduAIService:
         Returns:
             识别结果列表
         """
-        return await self._recognize_with_fallback(image_base64, top_num)
+        return await circuit_breakers.get("baidu").call(self._recognize_with_fallback, image_base64, top_num)
 
     async def _recognize_with_fallback(self, image_base64: str, top_num: int = 5) -> List[RecognitionResult]:
         """优先菜品识别，置信度不足时自动切换到果蔬/植物识别"""
@@ -74,30 +89,75 @@ class BaiduAIService:
             print("⚠️ 百度AI未配置，使用模拟数据")
             return self._get_mock_results()
 
-        dish_results = await self._request_recognition(
-            url=self.DISH_URL,
-            image_base64=image_base64,
-            top_num=top_num,
-            category_label="菜品识别",
-            extra_data={"filter_threshold": 0.1},
-        )
-
-        fruit_results = await self._request_recognition(
-            url=self.FRUIT_URL,
-            image_base64=image_base64,
-            top_num=top_num,
-            category_label="果蔬识别",
-        )
+        # 先取令牌，避免三个并发请求同时刷新
+        await self.get_access_token()
+
+        # 三个分类接口并发调用
+        latencies: Dict[str, Optional[float]] = {}
+        tasks = {
+            "dish": asyncio.create_task(self._timed_recognition(
+                "dish", latencies,
+                url=self.DISH_URL,
+                image_base64=image_base64,
+                top_num=top_num,
+                category_label="菜品识别",
+                extra_data={"filter_threshold": 0.1},
+            )),
+            "fruit": asyncio.create_task(self._timed_recognition(
+                "fruit", latencies,
+                url=self.FRUIT_URL,
+                image_base64=image_base64,
+                top_num=top_num,
+                category_label="果蔬识别",
+            )),
+            "plant": asyncio.create_task(self._timed_recognition(
+                "plant", latencies,
+                url=self.PLANT_URL,
+                image_base64=image_base64,
+                top_num=top_num,
+                category_label="植物识别",
+            )),
+        }
 
-        plant_results = await self._request_recognition(
-            url=self.PLANT_URL,
-            image_base64=image_base64,
-            top_num=top_num,
-            category_label="植物识别",
-        )
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + settings.baidu_recognition_deadline_seconds
+        pending = set(tasks.values())
+        early_exit = False
+
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            dish_task = tasks["dish"]
+            if dish_task in done and self._is_confident_dish(dish_task):
+                early_exit = True
+                break
+
+        # 提前结束或超过总时限：取消剩余请求
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        total_ms = (loop.time() - started) * 1000
+        timed_out = bool(pending) and not early_exit
+        self._report_latency(latencies, total_ms, early_exit, timed_out=timed_out)
+
+        outcomes = {name: self._task_outcome(task) for name, task in tasks.items()}
+        errors = [item for item in outcomes.values() if isinstance(item, Exception)]
+        if errors and len(errors) == len(outcomes):
+            # 全部失败时沿用原有行为，把异常抛给调用方降级处理
+            raise errors[0]
+
+        # 被取消、超时或单个接口失败时按空结果处理
+        dish_results = outcomes["dish"] if isinstance(outcomes["dish"], list) else []
+        fruit_results = outcomes["fruit"] if isinstance(outcomes["fruit"], list) else []
+        plant_results = outcomes["plant"] if isinstance(outcomes["plant"], list) else []
 
         # 过滤掉百度API返回的否定性结果（如"非果蔬食材"、"非植物"等）
-        NEGATIVE_NAMES = {"非果蔬食材", "非植物", "非食材", "非菜品", "未知"}
+        NEGATIVE_NAMES = self.NEGATIVE_NAMES
 
         filtered_dish = [r for r in dish_results if r.name not in NEGATIVE_NAMES]
         filtered_fruit = [r for r in fruit_results if r.name not in NEGATIVE_NAMES]
@@ -124,9 +184,63 @@ class BaiduAIService:
         if dish_results:
             return sorted(dish_results, key=lambda x: x.confidence, reverse=True)
 
+        if timed_out:
+            # 有接口超时被取消且没有拿到结果：按失败处理，交给降级 / 对冲，也不会被缓存
+            raise asyncio.TimeoutError(f"百度识别超过总时限 {settings.baidu_recognition_deadline_seconds}s 且无结果")
+
         print("⚠️ 未识别到菜品/果蔬/植物，使用模拟数据")
         return self._get_mock_results()
 
+    async def _timed_recognition(self, name: str, latencies: Dict[str, Optional[float]], **kwargs) -> List[RecognitionResult]:
+        """调用单个分类接口并记录耗时（被取消时记为 None）"""
+        started = time.perf_counter()
+        latencies[name] = None
+        try:
+            results = await self._request_recognition(**kwargs)
+        except asyncio.CancelledError:
+            metrics.incr(f"baidu.{name}.cancelled")
+            raise
+        except Exception:
+            latencies[name] = (time.perf_counter() - started) * 1000
+            metrics.incr(f"baidu.{name}.errors")
+            raise
+        latencies[name] = (time.perf_counter() - started) * 1000
+        metrics.observe(f"baidu.{name}_ms", latencies[name])
+        return results
+
+    def _is_confident_dish(self, task: "asyncio.Task") -> bool:
+        """菜品识别首位结果置信度足够高时，无需等待果蔬/植物识别"""
+        results = self._task_outcome(task)
+        if not isinstance(results, list) or not results:
+            return False
+        top = max(results, key=lambda x: x.confidence)
+        return top.name not in self.NEGATIVE_NAMES and top.confidence >= settings.baidu_dish_early_exit_confidence
+
+    @staticmethod
+    def _task_outcome(task: "asyncio.Task"):
+        """返回任务结果；未完成/被取消返回 None，失败返回异常对象"""
+        if not task.done() or task.cancelled():
+            return None
+        if task.exception() is not None:
+            return task.exception()
+        return task.result()
+
+    def _report_latency(self, latencies: Dict[str, Optional[float]], total_ms: float, early_exit: bool, timed_out: bool) -> None:
+        """输出各分类接口耗时明细并记录指标"""
+        parts = []
+        for name, label in self.ENDPOINT_LABELS.items():
+            value = latencies.get(name)
+            parts.append(f"{label} {value:.0f}ms" if value is not None else f"{label} 已取消")
+        note = "（菜品高置信度提前结束）" if early_exit else "（超过总时限）" if timed_out else ""
+        print(f"⏱️ 百度识别耗时: {' | '.join(parts)} | 总计 {total_ms:.0f}ms{note}")
+
+        metrics.observe("baidu.total_ms", total_ms)
+        metrics.incr("baidu.requests")
+        if early_exit:
+            metrics.incr("baidu.early_exits")
+        if timed_out:
+            metrics.incr("baidu.deadline_exceeded")
+
     async def _request_recognition(
         self,
         url: str,
@@ -134,12 +248,10 @@ class BaiduAIService:
         top_num: int,
         category_label: str,
         extra_data: Optional[dict] = None,
+        retry_on_invalid_token: bool = True,
     ) -> List[RecognitionResult]:
-        if not self.access_token:
-            await self.get_access_token()
-            print("✅ 获取 access_token 成功")
-
-        request_url = f"{url}?access_token={self.access_token}"
+        access_token = await self.get_access_token()
+        request_url = f"{url}?access_token={access_token}"
 
         data = {
             "image": image_base64,
@@ -156,13 +268,13 @@ class BaiduAIService:
         print(f"   URL: {url}")
         print(f"   图片大小: {len(image_base64)} 字符")
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                request_url,
-                data=data,
-                headers=headers,
-            )
-            result = response.json()
+        client = http_clients.get("baidu")
+        response = await client.post(
+            request_url,
+            data=data,
+            headers=headers,
+        )
+        result = response.json()
 
         print(f"📥 百度AI返回: {result}")
 
@@ -194,15 +306,16 @@ class BaiduAIService:
             error_msg = result.get("error_msg", "未知错误")
             print(f"❌ 百度AI错误: {error_code} - {error_msg}")
 
-            if error_code in [110, 111]:
-                self.access_token = None
-                await self.get_access_token()
+            # 令牌无效/过期：作废缓存后重试一次
+            if error_code in [110, 111] and retry_on_invalid_token:
+                await credential_store.invalidate("baidu", access_token)
                 return await self._request_recognition(
                     url=url,
                     image_base64=image_base64,
                     top_num=top_num,
                     category_label=category_label,
                     extra_data=extra_data,
+                    retry_on_invalid_token=False,
                 )
 
             return []
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+外部 AI 服务熔断器
+
+服务降级时，每个请求都要等满 httpx 超时才进入降级逻辑。
+熔断器按最近 N 次调用的失败率 / 慢调用率判断服务健康：
+- closed：正常放行，持续统计
+- open：直接抛出 CircuitOpenError，调用方立即走降级路径
+- half_open：冷却期结束后放行少量探测请求，成功则恢复，失败则重新熔断
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# 各服务慢调用阈值（毫秒），约为对应 HTTP 超时的一半
+SLOW_CALL_THRESHOLDS_MS: Dict[str, float] = {
+    "doubao": 30000,
+    "doubao_image": 60000,
+    "baidu": 15000,
+    "deepseek": 15000,
+    "deepseek_plan": 90000,
+}
+DEFAULT_SLOW_CALL_MS = 15000
+
+
+def _is_server_error(response: Any) -> bool:
+    status_code = getattr(response, "status_code", 200)
+    return status_code >= 500 or status_code == 429
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，调用被直接拒绝"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{name} 熔断中，{retry_after:.0f}s 后重试")
+
+
+class CircuitBreaker:
+    """
+    基于滚动窗口的熔断器
+
+    Args:
+        name: 服务名
+        window_size: 统计最近多少次调用
+        min_calls: 窗口内调用数达到该值才开始判断
+        failure_rate_threshold: 失败率达到该值时熔断
+        slow_call_ms: 超过该耗时视为慢调用
+        slow_call_rate_threshold: 慢调用率达到该值时熔断
+        open_seconds: 熔断后的冷却时间
+        half_open_max_calls: 半开状态允许的并发探测数
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int = 20,
+        min_calls: int = 5,
+        failure_rate_threshold: float = 0.5,
+        slow_call_ms: float = DEFAULT_SLOW_CALL_MS,
+        slow_call_rate_threshold: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+        enabled: bool = True,
+    ):
+        self.name = name
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_ms = slow_call_ms
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.enabled = enabled
+
+        # 每次调用记录 (是否失败, 是否慢调用, 耗时ms)
+        self._window: Deque[Tuple[bool, bool, float]] = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._lock = threading.Lock()
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._half_open_in_flight = 0
+            logger.info(f"🟡 熔断器 {self.name} 进入半开状态，放行探测请求")
+        return self._state
+
+    def _acquire(self) -> None:
+        """申请调用许可，不允许时抛出 CircuitOpenError"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+                self._half_open_in_flight += 1
+                return
+            self.rejected += 1
+            retry_after = max(self.open_seconds - (time.monotonic() - self._opened_at), 0)
+        raise CircuitOpenError(self.name, retry_after)
+
+    def _record(self, failed: Optional[bool], latency_ms: float) -> None:
+        """记录调用结果；failed 为 None 表示调用被取消，不计入统计"""
+        with self._lock:
+            state = self._state
+            if state == HALF_OPEN:
+                self._half_open_in_flight = max(self._half_open_in_flight - 1, 0)
+            if failed is None:
+                return
+
+            slow = latency_ms >= self.slow_call_ms
+            if state == HALF_OPEN:
+                if failed or slow:
+                    self._trip("探测失败" if failed else "探测慢调用")
+                else:
+                    self._state = CLOSED
+                    self._window.clear()
+                    logger.info(f"🟢 熔断器 {self.name} 已恢复")
+                return
+
+            self._window.append((failed, slow, latency_ms))
+            if state == CLOSED and len(self._window) >= self.min_calls:
+                failure_rate, slow_rate = self._rates()
+                if failure_rate >= self.failure_rate_threshold:
+                    self._trip(f"失败率 {failure_rate:.0%}")
+                elif slow_rate >= self.slow_call_rate_threshold:
+                    self._trip(f"慢调用率 {slow_rate:.0%}")
+
+    def _trip(self, reason: str) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        logger.warning(f"🔴 熔断器 {self.name} 打开（{reason}），{self.open_seconds:.0f}s 内直接降级")
+
+    def _rates(self) -> Tuple[float, float]:
+        total = len(self._window)
+        if not total:
+            return 0.0, 0.0
+        failures = sum(1 for failed, _, _ in self._window if failed)
+        slow = sum(1 for _, is_slow, _ in self._window if is_slow)
+        return failures / total, slow / total
+
+    async def call(self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """经熔断器调用异步函数，抛出异常即计为失败，异常原样抛出"""
+        return await self._invoke(func, args, kwargs, None)
+
+    async def call_http(self, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """经熔断器发送 HTTP 请求，5xx / 429 响应也计为失败（响应仍原样返回）"""
+        return await self._invoke(func, args, kwargs, _is_server_error)
+
+    async def _invoke(self, func, args, kwargs, is_failure: Optional[Callable[[Any], bool]]):
+        if not self.enabled:
+            return await func(*args, **kwargs)
+
+        self._acquire()
+        started = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            # 被对冲/超时取消的调用无法判断服务健康
+            self._record(None, 0)
+            raise
+        except Exception:
+            self._record(True, (time.perf_counter() - started) * 1000)
+            raise
+        failed = bool(is_failure and is_failure(result))
+        self._record(failed, (time.perf_counter() - started) * 1000)
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._window.clear()
+            self._half_open_in_flight = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            failure_rate, slow_rate = self._rates()
+            latencies = sorted(latency for _, _, latency in self._window)
+            data = {
+                "state": state,
+                "calls": len(self._window),
+                "failure_rate": round(failure_rate, 4),
+                "slow_call_rate": round(slow_rate, 4),
+                "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 1) if latencies else None,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+            if state == OPEN:
+                data["retry_after"] = round(max(self.open_seconds - (time.monotonic() - self._opened_at), 0), 1)
+            return data
+
+
+class CircuitBreakerRegistry:
+    """按服务名管理熔断器"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is not None:
+            return breaker
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(
+                    name,
+                    window_size=settings.circuit_breaker_window_size,
+                    min_calls=settings.circuit_breaker_min_calls,
+                    failure_rate_threshold=settings.circuit_breaker_failure_rate,
+                    slow_call_ms=SLOW_CALL_THRESHOLDS_MS.get(name, DEFAULT_SLOW_CALL_MS),
+                    slow_call_rate_threshold=settings.circuit_breaker_slow_call_rate,
+                    open_seconds=settings.circuit_breaker_open_seconds,
+                    enabled=settings.circuit_breaker_enabled,
+                )
+            return self._breakers[name]
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: breaker.stats() for name, breaker in sorted(self._breakers.items())}
+
+
+# 全局单例
+circuit_breakers = CircuitBreakerRegistry()
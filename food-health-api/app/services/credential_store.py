@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+第三方接口凭证缓存
+
+百度 / FatSecret / 微信的 access_token 都有有效期，以前要么只存在进程内存
+（重启、多 worker 各取一次），要么从不过期、要么每次调用都重新获取。
+
+- 记录 expires_in，过期前在后台提前刷新（refresh-ahead）
+- 持久化到 service_credential 表，重启后和多个 worker 之间共享
+- 同一服务的刷新在进程内串行，刷新前先读数据库，其他 worker 已刷新则直接复用
+- 多 worker 之间通过数据库租约（条件 UPDATE lease_until）保证同一时刻只有一个
+  worker 去申请新令牌（微信等服务申请新令牌会让旧令牌立即失效），其余 worker
+  等待并读取对方写入的新令牌
+- 数据库读写放到线程池执行，不阻塞事件循环
+- 数据库不可用时退化为仅内存缓存
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from app.config import get_settings
+from app.database.connection import SessionLocal
+from app.models.credential import ServiceCredential
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 获取凭证：返回 (access_token, expires_in 秒)，失败时抛出异常
+Fetcher = Callable[[], Awaitable[Tuple[str, float]]]
+
+# 刷新租约时长：持有者崩溃时，其他 worker 最多等待这么久后接手
+CLAIM_LEASE_SECONDS = 30
+# 未抢到租约时轮询数据库、等待持有者写入新令牌的间隔
+PEER_POLL_SECONDS = 0.2
+
+
+@dataclass
+class _Credential:
+    token: str
+    expires_at: float  # time.time() 时间戳
+
+    def remaining(self) -> float:
+        return self.expires_at - time.time()
+
+
+class CredentialStore:
+    """按服务名缓存 access_token"""
+
+    def __init__(self, session_factory=SessionLocal):
+        self._session_factory = session_factory
+        self._fetchers: Dict[str, Fetcher] = {}
+        self._memory: Dict[str, _Credential] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._background: Dict[str, asyncio.Task] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def register(self, name: str, fetcher: Fetcher) -> None:
+        """注册凭证获取函数（服务初始化时调用）"""
+        self._fetchers[name] = fetcher
+        self._stats.setdefault(name, {"memory_hits": 0, "db_hits": 0, "fetches": 0, "failures": 0, "peer_waits": 0})
+
+    @property
+    def refresh_ahead_seconds(self) -> float:
+        return settings.credential_refresh_ahead_seconds
+
+    async def get(self, name: str) -> str:
+        """
+        获取有效的 access_token
+
+        Raises:
+            凭证获取失败时抛出 fetcher 的异常
+        """
+        cached = self._memory.get(name)
+        if cached and cached.remaining() > 0:
+            self._stats[name]["memory_hits"] += 1
+            if cached.remaining() < self.refresh_ahead_seconds:
+                self._schedule_refresh(name)
+            return cached.token
+
+        # 内存中没有：其他 worker 或上次运行可能已写入数据库
+        stored = await asyncio.to_thread(self._load, name)
+        if stored and stored.remaining() > 0:
+            self._stats[name]["db_hits"] += 1
+            self._memory[name] = stored
+            if stored.remaining() < self.refresh_ahead_seconds:
+                self._schedule_refresh(name)
+            return stored.token
+
+        return (await self.refresh(name)).token
+
+    async def refresh(self, name: str, force: bool = False) -> _Credential:
+        """
+        刷新凭证
+
+        进程内按服务名串行；跨 worker 先抢数据库租约，抢到的才去申请新令牌，
+        没抢到的等待持有者写回数据库后直接复用
+        """
+        lock = self._locks.get(name)
+        if lock is None:
+            lock = self._locks[name] = asyncio.Lock()
+
+        async with lock:
+            if not force:
+                for candidate in (self._memory.get(name), await asyncio.to_thread(self._load, name)):
+                    if candidate and candidate.remaining() >= self.refresh_ahead_seconds:
+                        self._memory[name] = candidate
+                        return candidate
+
+            claimed, previous = await asyncio.to_thread(self._claim, name)
+            if not claimed:
+                credential = await self._wait_for_peer(name, previous)
+                if credential is not None:
+                    self._memory[name] = credential
+                    return credential
+                # 等待超时：持有者可能已崩溃，租约也已过期，由本 worker 接手
+                logger.warning(f"⚠️ 等待其他 worker 刷新 {name} access_token 超时，自行刷新")
+
+            try:
+                token, expires_in = await self._fetchers[name]()
+            except Exception:
+                self._stats[name]["failures"] += 1
+                await asyncio.to_thread(self._release, name)
+                raise
+            self._stats[name]["fetches"] += 1
+            credential = _Credential(token=token, expires_at=time.time() + float(expires_in))
+            self._memory[name] = credential
+            await asyncio.to_thread(self._save, name, credential)
+            logger.info(f"🔑 已刷新 {name} access_token，有效期 {int(expires_in)}s")
+            return credential
+
+    def set(self, name: str, token: str, expires_in: float, persist: bool = True) -> None:
+        """直接写入凭证（预置 / 测试用）"""
+        credential = _Credential(token=token, expires_at=time.time() + float(expires_in))
+        self._memory[name] = credential
+        if persist:
+            self._save(name, credential)
+
+    async def invalidate(self, name: str, token: Optional[str] = None) -> None:
+        """
+        令牌被服务端拒绝时调用，下次获取会重新申请
+
+        传入被拒绝的 token 时只作废该 token，避免误删其他 worker 刚刷新的新令牌
+        """
+        cached = self._memory.get(name)
+        if cached and (token is None or cached.token == token):
+            del self._memory[name]
+        await asyncio.to_thread(self._delete, name, token)
+        logger.warning(f"⚠️ {name} access_token 已失效，等待重新获取")
+
+    async def _wait_for_peer(self, name: str, previous: Optional[str]) -> Optional[_Credential]:
+        """其他 worker 持有刷新租约：轮询数据库，直到出现与 previous 不同的有效令牌"""
+        self._stats[name]["peer_waits"] += 1
+        deadline = time.monotonic() + CLAIM_LEASE_SECONDS
+        while time.monotonic() < deadline:
+            await asyncio.sleep(PEER_POLL_SECONDS)
+            stored = await asyncio.to_thread(self._load, name)
+            if stored and stored.token != previous and stored.remaining() > 0:
+                return stored
+        return None
+
+    def _schedule_refresh(self, name: str) -> None:
+        """后台提前刷新，不阻塞当前请求"""
+        task = self._background.get(name)
+        if task is not None and not task.done():
+            return
+        self._background[name] = asyncio.create_task(self._refresh_quietly(name))
+
+    async def _refresh_quietly(self, name: str) -> None:
+        try:
+            await self.refresh(name)
+        except Exception as e:
+            logger.error(f"❌ 后台刷新 {name} access_token 失败: {type(e).__name__}: {e}")
+
+    # ------ 后台巡检 ------
+
+    def start(self) -> None:
+        """启动后台巡检：已使用过的凭证即将过期时自动刷新"""
+        if self._loop_task is not None and not self._loop_task.done():
+            return
+        self._loop_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        tasks = [task for task in [self._loop_task, *self._background.values()] if task is not None]
+        self._loop_task = None
+        self._background.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.credential_refresh_check_seconds)
+            for name, credential in list(self._memory.items()):
+                if credential.remaining() < self.refresh_ahead_seconds:
+                    await self._refresh_quietly(name)
+
+    # ------ 持久化 ------
+
+    def _load(self, name: str) -> Optional[_Credential]:
+        try:
+            with self._session_factory() as db:
+                row = db.query(ServiceCredential).filter(ServiceCredential.name == name).first()
+                if row is None:
+                    return None
+                return _Credential(token=row.token, expires_at=row.expires_at.timestamp())
+        except Exception as e:
+            logger.warning(f"读取 {name} 凭证缓存失败: {type(e).__name__}: {e}")
+            return None
+
+    def _claim(self, name: str) -> Tuple[bool, Optional[str]]:
+        """
+        抢占刷新租约，返回 (是否抢到, 抢占时库中的令牌)
+
+        通过条件 UPDATE（租约为空或已过期才更新）保证多个 worker 中只有一个成功；
+        记录不存在时插入占位行，唯一索引冲突说明已被其他 worker 抢先
+        """
+        now = datetime.now()
+        lease_until = now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+        try:
+            with self._session_factory() as db:
+                row = db.query(ServiceCredential.token).filter(ServiceCredential.name == name).first()
+                if row is None:
+                    # 占位行的过期时间为纪元时间，读取时视为无效令牌
+                    db.add(ServiceCredential(
+                        name=name, token="", expires_at=datetime.fromtimestamp(0), lease_until=lease_until,
+                    ))
+                    try:
+                        db.commit()
+                        return True, None
+                    except IntegrityError:
+                        db.rollback()
+                        return False, None
+                updated = (
+                    db.query(ServiceCredential)
+                    .filter(
+                        ServiceCredential.name == name,
+                        or_(ServiceCredential.lease_until.is_(None), ServiceCredential.lease_until < now),
+                    )
+                    .update({ServiceCredential.lease_until: lease_until}, synchronize_session=False)
+                )
+                db.commit()
+                return updated == 1, row.token
+        except Exception as e:
+            # 数据库不可用：退化为仅进程内串行
+            logger.warning(f"抢占 {name} 刷新租约失败: {type(e).__name__}: {e}")
+            return True, None
+
+    def _release(self, name: str) -> None:
+        """刷新失败时释放租约，让其他 worker 可以立即重试"""
+        try:
+            with self._session_factory() as db:
+                db.query(ServiceCredential).filter(ServiceCredential.name == name).update(
+                    {ServiceCredential.lease_until: None}, synchronize_session=False
+                )
+                db.commit()
+        except Exception as e:
+            logger.warning(f"释放 {name} 刷新租约失败: {type(e).__name__}: {e}")
+
+    def _save(self, name: str, credential: _Credential) -> None:
+        expires_at = datetime.fromtimestamp(credential.expires_at)
+        try:
+            with self._session_factory() as db:
+                row = db.query(ServiceCredential).filter(ServiceCredential.name == name).first()
+                if row is None:
+                    db.add(ServiceCredential(name=name, token=credential.token, expires_at=expires_at))
+                else:
+                    row.token = credential.token
+                    row.expires_at = expires_at
+                    row.lease_until = None
+                db.commit()
+        except Exception as e:
+            logger.warning(f"保存 {name} 凭证缓存失败: {type(e).__name__}: {e}")
+
+    def _delete(self, name: str, token: Optional[str] = None) -> None:
+        try:
+            with self._session_factory() as db:
+                query = db.query(ServiceCredential).filter(ServiceCredential.name == name)
+                if token is not None:
+                    query = query.filter(ServiceCredential.token == token)
+                query.delete()
+                db.commit()
+        except Exception as e:
+            logger.warning(f"删除 {name} 凭证缓存失败: {type(e).__name__}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        data = {}
+        for name, counters in sorted(self._stats.items()):
+            cached = self._memory.get(name)
+            data[name] = {
+                **counters,
+                "expires_in": int(cached.remaining()) if cached else None,
+            }
+        return data
+
+
+# 全局单例
+credential_store = CredentialStore()
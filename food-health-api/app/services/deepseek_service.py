@@ -3,15 +3,25 @@
 DeepSeek AI 服务封装
 用于生成食物的营养数据和健康建议
 """
+import asyncio
 import json
 import re
-from typing import Optional, Dict, Any, List
+import time
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
 import httpx
 
 from app.config import get_settings
+from app.services.circuit_breaker import CircuitOpenError, circuit_breakers
+from app.services.http_client import http_clients
+from app.services.metrics import metrics
+from app.services.plan_stream_parser import PlanStreamParser
+from app.services.single_flight import single_flights
 
 settings = get_settings()
 
+# 食谱生成超时（秒）
+PLAN_TIMEOUT = 120.0
+
 
 class DeepSeekService:
     """DeepSeek AI 营养分析服务"""
@@ -83,46 +93,47 @@ class DeepSeekService:
         try:
             print(f"🤖 调用 DeepSeek 分析: {food_name}")
 
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.3,
-                    }
-                )
-
-                if response.status_code != 200:
-                    print(f"❌ DeepSeek API 错误: {response.status_code} - {response.text}")
-                    return None
-
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-
-                print(f"📥 DeepSeek 返回: {content[:200]}...")
-
-                # 解析 JSON
-                nutrition_data = self._parse_json_response(content)
-
-                if nutrition_data:
-                    # 验证数据
-                    validated_data = self._validate_nutrition_data(nutrition_data)
-                    if validated_data:
-                        print("✅ DeepSeek 分析完成")
-                        return validated_data
-                    else:
-                        print("⚠️ 数据验证失败")
-                        return None
+            client = http_clients.get("deepseek")
+            response = await circuit_breakers.get("deepseek").call_http(
+                client.post,
+                f"{self.base_url}/v1/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": self.model,
+                    "messages": [
+                        {"role": "user", "content": prompt}
+                    ],
+                    "temperature": 0.3,
+                }
+            )
+
+            if response.status_code != 200:
+                print(f"❌ DeepSeek API 错误: {response.status_code} - {response.text}")
+                return None
+
+            result = response.json()
+            content = result["choices"][0]["message"]["content"]
+
+            print(f"📥 DeepSeek 返回: {content[:200]}...")
+
+            # 解析 JSON
+            nutrition_data = self._parse_json_response(content)
+
+            if nutrition_data:
+                # 验证数据
+                validated_data = self._validate_nutrition_data(nutrition_data)
+                if validated_data:
+                    print("✅ DeepSeek 分析完成")
+                    return validated_data
                 else:
-                    print("⚠️ JSON 解析失败")
+                    print("⚠️ 数据验证失败")
                     return None
+            else:
+                print("⚠️ JSON 解析失败")
+                return None
 
         except Exception as e:
             print(f"❌ DeepSeek 异常: {type(e).__name__}: {str(e)}")
@@ -132,9 +143,15 @@ class DeepSeekService:
         """
         根据健康档案获取饮食与运动建议
 
+        相同档案的并发请求合并为一次调用
+
         Args:
             profile: 包含体重、身高、年龄、性别、活动水平等信息
         """
+        key = tuple(str(profile.get(field)) for field in ("weight", "height", "age", "gender", "activity"))
+        return await single_flights.get("deepseek_health_advice").do(key, self._get_health_advice, profile)
+
+    async def _get_health_advice(self, profile: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         if not self.is_configured:
             print("⚠️ DeepSeek 未配置，跳过健康建议生成")
             return None
@@ -165,41 +182,42 @@ class DeepSeekService:
         try:
             print("🤖 调用 DeepSeek 生成健康建议")
 
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.3,
-                    }
-                )
-
-                if response.status_code != 200:
-                    print(f"❌ DeepSeek API 错误: {response.status_code} - {response.text}")
-                    return None
-
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-
-                print(f"📥 DeepSeek 建议: {content[:200]}...")
-
-                advice_data = self._parse_json_response(content)
-                if not advice_data:
-                    print("⚠️ JSON 解析失败")
-                    return None
-
-                if "diet_advice" not in advice_data or "exercise_advice" not in advice_data:
-                    print("⚠️ 建议字段缺失")
-                    return None
-
-                return advice_data
+            client = http_clients.get("deepseek")
+            response = await circuit_breakers.get("deepseek").call_http(
+                client.post,
+                f"{self.base_url}/v1/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": self.model,
+                    "messages": [
+                        {"role": "user", "content": prompt}
+                    ],
+                    "temperature": 0.3,
+                }
+            )
+
+            if response.status_code != 200:
+                print(f"❌ DeepSeek API 错误: {response.status_code} - {response.text}")
+                return None
+
+            result = response.json()
+            content = result["choices"][0]["message"]["content"]
+
+            print(f"📥 DeepSeek 建议: {content[:200]}...")
+
+            advice_data = self._parse_json_response(content)
+            if not advice_data:
+                print("⚠️ JSON 解析失败")
+                return None
+
+            if "diet_advice" not in advice_data or "exercise_advice" not in advice_data:
+                print("⚠️ 建议字段缺失")
+                return None
+
+            return advice_data
 
         except Exception as e:
             print(f"❌ DeepSeek 异常: {type(e).__name__}: {str(e)}")
@@ -289,6 +307,10 @@ class DeepSeekService:
         """
         生成7天推荐食谱
 
+        按 PLAN_GENERATION_STRATEGY 选择生成方式：
+        - single：一次请求生成全部 7 天
+        - parallel：先生成周大纲，再按天并发生成，单日失败只重试该日
+
         Args:
             user_profile: 用户简况字符串 (如 "男性, 25岁, 70kg")
             goal: 健康目标 (如 "减脂", "增肌")
@@ -299,6 +321,334 @@ class DeepSeekService:
             print("⚠️ DeepSeek 未配置，跳过食谱生成")
             return None
 
+        if settings.plan_generation_strategy == "parallel":
+            return await self._generate_diet_plan_parallel(user_profile, goal, preferences, disliked_tags)
+        return await self._generate_diet_plan_single(user_profile, goal, preferences, disliked_tags)
+
+    async def _generate_diet_plan_single(
+        self,
+        user_profile: str,
+        goal: str,
+        preferences: str,
+        disliked_tags: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """一次请求生成全部 7 天"""
+        prompt = self._build_diet_plan_prompt(user_profile, goal, preferences, disliked_tags)
+
+        try:
+            if disliked_tags and len(disliked_tags) > 0:
+                print(f"🤖 调用 DeepSeek 生成食谱: {goal} | 用户不喜欢: {', '.join(disliked_tags)}")
+            else:
+                print(f"🤖 调用 DeepSeek 生成食谱: {goal}")
+
+            content = await self._request_plan_completion(prompt, max_tokens=4000)
+            if content is None:
+                return None
+            return self._finalize_diet_plan(content)
+
+        except Exception as e:
+            print(f"❌ DeepSeek 异常: {type(e).__name__}: {str(e)}")
+            return None
+
+    async def _generate_diet_plan_parallel(
+        self,
+        user_profile: str,
+        goal: str,
+        preferences: str,
+        disliked_tags: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        先生成周大纲，再按天并发生成（并发数受 PLAN_PARALLEL_CONCURRENCY 限制）
+
+        每次请求的输出只有一天的量，总耗时约为 大纲 + 单日耗时 × ⌈7 / 并发数⌉；
+        某一天校验失败只重试该天；大纲不足 7 天或某天重试后仍失败时改用单次生成，
+        不返回缺天的食谱。
+        """
+        started = time.perf_counter()
+        print(f"🤖 调用 DeepSeek 并发生成食谱: {goal}")
+        context = self._plan_user_context(user_profile, goal, preferences, disliked_tags)
+
+        outline = await self._generate_plan_outline(context)
+        if not outline or sorted(day["day_index"] for day in outline["days"]) != list(range(1, 8)):
+            print("⚠️ 周大纲生成失败或不是完整 7 天，改用单次生成")
+            return await self._generate_diet_plan_single(user_profile, goal, preferences, disliked_tags)
+        metrics.observe("plan.parallel.outline_ms", (time.perf_counter() - started) * 1000)
+
+        semaphore = asyncio.Semaphore(max(1, settings.plan_parallel_concurrency))
+
+        async def run_day(day_outline: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await self._generate_plan_day(context, outline, day_outline)
+
+        days = await asyncio.gather(*(run_day(day_outline) for day_outline in outline["days"]))
+        missing = [day_outline["day_index"] for day_outline, day in zip(outline["days"], days) if not day]
+        if missing:
+            # 缺天的食谱不能作为 7 日计划保存，整份改用单次生成
+            metrics.incr("plan.parallel.incomplete")
+            print(f"⚠️ 第 {missing} 天重试后仍生成失败，改用单次生成")
+            return await self._generate_diet_plan_single(user_profile, goal, preferences, disliked_tags)
+
+        plan_data = {
+            "name": outline.get("name"),
+            "description": outline.get("description"),
+            "tags": outline.get("tags", []),
+            "days": sorted(days, key=lambda day: day["day_index"]),
+        }
+        # 大纲缺字段时交给入库逻辑使用默认名称/简介
+        plan_data = {key: value for key, value in plan_data.items() if value is not None}
+        if not self._validate_diet_plan_data(plan_data):
+            print("⚠️ 食谱数据结构校验失败")
+            return None
+
+        metrics.observe("plan.parallel.total_ms", (time.perf_counter() - started) * 1000)
+        print(f"✅ DeepSeek 并发食谱生成完成: {len(days)} 天")
+        return plan_data
+
+    async def _generate_plan_outline(self, context: str) -> Optional[Dict[str, Any]]:
+        """生成周大纲：食谱名称、简介、标签与每天的主题"""
+        prompt = context + """
+请先为这份食谱拟定一周大纲，不需要具体餐单。
+请直接返回满足 strict JSON 格式的数据，不要包裹markdown标记，JSON结构如下：
+{
+  "name": "食谱名称（如：高效减脂7日计划）",
+  "description": "简短的推荐理由（50字以内）",
+  "tags": ["减脂", "低碳水"],
+  "days": [
+    {"day_index": 1, "title": "每日主题（如：排毒清肠日）", "focus": "当日主打食材与做法（20字以内）"}
+  ]
+}
+
+要求：
+1. 必须包含完整7天，day_index 依次为 1-7。
+2. 每天的主打食材互不重复，保证一周饮食多样。
+3. tags 字段必须且仅能包含以下词汇：减脂, 增肌, 低碳水, 高蛋白, 素食, 快速。选择最匹配的1-3个。
+4. 请确保JSON格式合法，不要包含注释。"""
+
+        try:
+            content = await self._request_plan_completion(prompt, max_tokens=600)
+        except Exception as e:
+            print(f"❌ DeepSeek 周大纲异常: {type(e).__name__}: {str(e)}")
+            return None
+        outline = self._parse_json_response(content) if content else None
+        if not isinstance(outline, dict) or not isinstance(outline.get("days"), list):
+            return None
+
+        days = []
+        seen = set()
+        for index, day in enumerate(outline["days"], start=1):
+            if not isinstance(day, dict):
+                continue
+            day_index = day.get("day_index")
+            if not isinstance(day_index, int) or day_index in seen:
+                day_index = index
+            seen.add(day_index)
+            days.append({
+                "day_index": day_index,
+                "title": str(day.get("title") or f"Day {day_index}")[:100],
+                "focus": str(day.get("focus") or ""),
+            })
+        if not days:
+            return None
+        outline["days"] = days[:7]
+        return outline
+
+    async def _generate_plan_day(
+        self,
+        context: str,
+        outline: Dict[str, Any],
+        day_outline: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """按大纲生成某一天的餐单，校验失败时单独重试"""
+        day_index = day_outline["day_index"]
+        week = "\n".join(
+            f"第{day['day_index']}天：{day['title']}（{day['focus']}）" for day in outline["days"]
+        )
+        prompt = context + f"""
+本周食谱《{outline.get("name", "定制食谱")}》大纲：
+{week}
+
+请只生成第{day_index}天「{day_outline["title"]}」的具体餐单，主打：{day_outline["focus"] or "均衡搭配"}。
+请直接返回满足 strict JSON 格式的数据，不要包裹markdown标记，JSON结构如下：
+{{
+  "day_index": {day_index},
+  "title": "{day_outline["title"]}",
+  "meals": [
+    {{
+      "meal_type": "breakfast/lunch/dinner/snack",
+      "food_name": "具体食物名（通俗易懂）",
+      "amount_desc": "份量描述（支持普通单位，如1碗、200g、1个）",
+      "calories": 估算热量(int)
+    }}
+  ]
+}}
+
+要求：
+1. 必须包含早(breakfast)、午(lunch)、晚(dinner)三餐，加餐(snack)可选。
+2. 确保热量和营养搭配符合用户的健康目标。
+3. 【重要】严格遵守用户的"饮食偏好"。
+4. 食材要常见易获得，做法简单，避免与大纲中其他天的主打食材重复。
+5. 请确保JSON格式合法，不要包含注释。"""
+
+        attempts = 1 + max(0, settings.plan_day_max_retries)
+        for attempt in range(attempts):
+            if attempt:
+                metrics.incr("plan.parallel.day_retries")
+                print(f"🔁 第{day_index}天数据无效，重试 ({attempt}/{attempts - 1})")
+            started = time.perf_counter()
+            try:
+                content = await self._request_plan_completion(prompt, max_tokens=800)
+            except CircuitOpenError as e:
+                # 熔断中重试没有意义
+                print(f"⚠️ 第{day_index}天生成跳过: {e}")
+                break
+            except Exception as e:
+                print(f"❌ 第{day_index}天生成异常: {type(e).__name__}: {str(e)}")
+                continue
+            finally:
+                metrics.observe("plan.parallel.day_ms", (time.perf_counter() - started) * 1000)
+
+            day = self._parse_json_response(content) if content else None
+            if not isinstance(day, dict):
+                continue
+            plan_data = self._clean_diet_plan_data({"days": [day]})
+            if not self._validate_diet_plan_data(plan_data):
+                continue
+            # 以大纲为准，避免模型返回错位的 day_index
+            day["day_index"] = day_index
+            day["title"] = day.get("title") or day_outline["title"]
+            return day
+
+        metrics.incr("plan.parallel.day_failed")
+        print(f"⚠️ 第{day_index}天生成失败，已跳过")
+        return None
+
+    async def _request_plan_completion(self, prompt: str, max_tokens: int) -> Optional[str]:
+        """
+        调用食谱生成接口，返回模型输出文本
+
+        非 200 响应返回 None；网络异常、熔断等异常直接抛出
+        """
+        client = http_clients.get("deepseek")
+        response = await circuit_breakers.get("deepseek_plan").call_http(
+            client.post,
+            f"{self.base_url}/v1/chat/completions",
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": self.model,
+                "messages": [
+                    {"role": "user", "content": prompt}
+                ],
+                "temperature": 0.5,
+                "max_tokens": max_tokens
+            },
+            # 食谱输出较长，单独放宽超时
+            timeout=httpx.Timeout(PLAN_TIMEOUT, connect=10.0),
+        )
+
+        if response.status_code != 200:
+            print(f"❌ DeepSeek API 错误: {response.status_code} - {response.text}")
+            return None
+
+        result = response.json()
+        return result["choices"][0]["message"]["content"]
+
+    async def stream_diet_plan(
+        self,
+        user_profile: str,
+        goal: str,
+        preferences: str,
+        disliked_tags: Optional[List[str]] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        流式生成7天推荐食谱
+
+        依次产出 ("day", 单日数据)，每完成一天推送一次；
+        最后产出 ("plan", 完整食谱数据)，整体解析或校验失败时为 None。
+        调用失败（未配置、熔断、网络错误）时抛出异常，已产出的天数由调用方自行处理。
+        """
+        if not self.is_configured:
+            raise ValueError("DeepSeek 未配置")
+
+        prompt = self._build_diet_plan_prompt(user_profile, goal, preferences, disliked_tags)
+        print(f"🤖 流式调用 DeepSeek 生成食谱: {goal}")
+
+        client = http_clients.get("deepseek")
+        request = client.build_request(
+            "POST",
+            f"{self.base_url}/v1/chat/completions",
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": self.model,
+                "messages": [
+                    {"role": "user", "content": prompt}
+                ],
+                "temperature": 0.5,
+                "max_tokens": 4000,
+                "stream": True
+            },
+            timeout=httpx.Timeout(PLAN_TIMEOUT, connect=10.0),
+        )
+        # 熔断器只统计建立连接到收到响应头，流式读取的耗时不计入慢调用
+        response = await circuit_breakers.get("deepseek_plan").call_http(client.send, request, stream=True)
+        try:
+            if response.status_code != 200:
+                body = await response.aread()
+                raise ValueError(f"DeepSeek API 错误: {response.status_code} - {body[:200]!r}")
+
+            parser = PlanStreamParser()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                chunk = line[5:].strip()
+                if chunk == "[DONE]":
+                    break
+                try:
+                    delta = json.loads(chunk)["choices"][0].get("delta") or {}
+                except (json.JSONDecodeError, KeyError, IndexError):
+                    continue
+                text = delta.get("content")
+                if not text:
+                    continue
+                for day in parser.feed(text):
+                    yield "day", self._clean_diet_plan_data({"days": [day]})["days"][0]
+        finally:
+            await response.aclose()
+
+        yield "plan", self._finalize_diet_plan(parser.buffer)
+
+    def _finalize_diet_plan(self, content: str) -> Optional[Dict[str, Any]]:
+        """解析、清洗并校验完整的食谱 JSON"""
+        plan_data = self._parse_json_response(content)
+            
+        if plan_data:
+            # 清洗数据（处理可能的格式问题）
+            plan_data = self._clean_diet_plan_data(plan_data)
+                
+            # 验证数据
+            if self._validate_diet_plan_data(plan_data):
+                print("✅ DeepSeek 食谱生成完成")
+                return plan_data
+            else:
+                print("⚠️ 食谱数据结构校验失败")
+                return None
+        else:
+            print("⚠️ JSON 解析失败")
+            return None
+
+    def _plan_user_context(
+        self,
+        user_profile: str,
+        goal: str,
+        preferences: str,
+        disliked_tags: Optional[List[str]] = None
+    ) -> str:
+        """食谱 prompt 的用户画像部分（含不喜欢的标签）"""
         prompt = f"""你是一位资深营养师。请根据以下用户情况，设计一份科学的【7天定制食谱】。
 用户画像：{user_profile}
 健康目标：{goal}
@@ -317,6 +667,18 @@ class DeepSeekService:
 - 如果标签是"油炸"、"辣"等做法，避免相关烹饪方式
 """
 
+        return prompt
+
+    def _build_diet_plan_prompt(
+        self,
+        user_profile: str,
+        goal: str,
+        preferences: str,
+        disliked_tags: Optional[List[str]] = None
+    ) -> str:
+        """构造食谱生成 prompt（普通与流式生成共用）"""
+        prompt = self._plan_user_context(user_profile, goal, preferences, disliked_tags)
+
         prompt += """
 请直接返回满足 strict JSON 格式的数据，不要包裹markdown标记，JSON结构如下：
 {
@@ -348,57 +710,7 @@ class DeepSeekService:
 6. tags 字段必须且仅能包含以下词汇：减脂, 增肌, 低碳水, 高蛋白, 素食, 快速。根据食谱特点选择最匹配的1-3个。
 7. 请确保JSON格式合法的 List/Dict 嵌套，不要包含注释。"""
 
-        try:
-            if disliked_tags and len(disliked_tags) > 0:
-                print(f"🤖 调用 DeepSeek 生成食谱: {goal} | 用户不喜欢: {', '.join(disliked_tags)}")
-            else:
-                print(f"🤖 调用 DeepSeek 生成食谱: {goal}")
-
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.5,
-                        "max_tokens": 4000
-                    }
-                )
-
-                if response.status_code != 200:
-                    print(f"❌ DeepSeek API 错误: {response.status_code} - {response.text}")
-                    return None
-
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-                
-                # 解析 JSON
-                plan_data = self._parse_json_response(content)
-                
-                if plan_data:
-                    # 清洗数据（处理可能的格式问题）
-                    plan_data = self._clean_diet_plan_data(plan_data)
-                    
-                    # 验证数据
-                    if self._validate_diet_plan_data(plan_data):
-                        print("✅ DeepSeek 食谱生成完成")
-                        return plan_data
-                    else:
-                        print("⚠️ 食谱数据结构校验失败")
-                        return None
-                else:
-                    print("⚠️ JSON 解析失败")
-                    return None
-
-        except Exception as e:
-            print(f"❌ DeepSeek 异常: {type(e).__name__}: {str(e)}")
-            return None
+        return prompt
 
     def _clean_diet_plan_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """清洗食谱数据，处理非标准格式"""
@@ -435,6 +747,10 @@ class DeepSeekService:
             print(f"⚠️ 数据清洗异常: {e}")
             return data
 
+    def is_valid_plan_day(self, day: Any) -> bool:
+        """单日数据结构是否完整（流式生成时逐天校验）"""
+        return isinstance(day, dict) and self._validate_diet_plan_data({"days": [day]})
+
     def _validate_diet_plan_data(self, data: Dict[str, Any]) -> bool:
         """验证食谱数据结构"""
         try:
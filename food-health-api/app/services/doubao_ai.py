@@ -11,10 +11,11 @@ import re
 import logging
 from typing import List, Optional, Dict, Any
 
-import httpx
-
 from app.config import get_settings
 from app.schemas.recognition import RecognitionResult
+from app.services.circuit_breaker import circuit_breakers
+from app.services.http_client import http_clients
+from app.services.single_flight import normalize_key, single_flights
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -33,12 +34,13 @@ class DoubaoAIService:
         """检查是否已配置豆包AI"""
         return bool(self.api_key and self.model)
     
-    async def recognize_food(self, image_base64: str) -> List[RecognitionResult]:
+    async def recognize_food(self, image_base64: str, mime_type: str = "image/jpeg") -> List[RecognitionResult]:
         """
         识别食物并估算热量
         
         Args:
             image_base64: 图片的 base64 编码
+            mime_type: 图片 MIME 类型（用于构建 data URL）
             
         Returns:
             识别结果列表
@@ -49,7 +51,8 @@ class DoubaoAIService:
         
         try:
             # 构建请求
-            result = await self._call_vision_api(image_base64)
+            # 豆包持续失败/超时时熔断，调用方直接降级到百度
+            result = await circuit_breakers.get("doubao").call(self._call_vision_api, image_base64, mime_type)
             
             if result:
                 return [result]
@@ -61,14 +64,14 @@ class DoubaoAIService:
             logger.error(f"❌ 豆包AI调用失败: {type(e).__name__}: {str(e)}")
             raise
     
-    async def _call_vision_api(self, image_base64: str) -> Optional[RecognitionResult]:
+    async def _call_vision_api(self, image_base64: str, mime_type: str = "image/jpeg") -> Optional[RecognitionResult]:
         """
         调用豆包视觉理解 API
         
         使用 OpenAI 兼容格式的 /chat/completions API
         """
         # 构建 data URL
-        image_url = f"data:image/jpeg;base64,{image_base64}"
+        image_url = f"data:{mime_type};base64,{image_base64}"
         
         # 构建 prompt，引导模型返回结构化数据
         prompt = """请识别图片中的食物，并提供以下信息。请严格按照 JSON 格式返回，不要有其他文字：
@@ -146,20 +149,20 @@ class DoubaoAIService:
         logger.info(f"   模型: {self.model}")
         logger.info(f"   图片大小: {len(image_base64)} 字符")
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                api_url,
-                headers=headers,
-                json=payload,
-            )
+        client = http_clients.get("doubao")
+        response = await client.post(
+            api_url,
+            headers=headers,
+            json=payload,
+        )
             
-            if response.status_code != 200:
-                error_text = response.text[:500] if response.text else "无响应内容"
-                logger.error(f"❌ 豆包API返回错误: {response.status_code} - {error_text}")
-                raise ValueError(f"豆包API错误: {response.status_code} - {error_text}")
+        if response.status_code != 200:
+            error_text = response.text[:500] if response.text else "无响应内容"
+            logger.error(f"❌ 豆包API返回错误: {response.status_code} - {error_text}")
+            raise ValueError(f"豆包API错误: {response.status_code} - {error_text}")
             
-            result = response.json()
-            logger.info(f"📥 豆包AI返回成功")
+        result = response.json()
+        logger.info(f"📥 豆包AI返回成功")
         
         # 解析返回结果
         return self._parse_response(result)
@@ -285,6 +288,8 @@ async def generate_food_image(food_name: str, description: str = "") -> Optional
     """
     使用豆包 seedream 模型生成菜品图片
 
+    同一菜品的并发生成请求合并为一次调用
+
     Args:
         food_name: 菜品名称
         description: 菜品描述
@@ -292,6 +297,12 @@ async def generate_food_image(food_name: str, description: str = "") -> Optional
     Returns:
         本地保存的图片路径，失败返回 None
     """
+    return await single_flights.get("doubao_food_image").do(
+        normalize_key(food_name), _generate_food_image, food_name, description
+    )
+
+
+async def _generate_food_image(food_name: str, description: str = "") -> Optional[str]:
     import uuid
     from pathlib import Path
 
@@ -326,30 +337,32 @@ async def generate_food_image(food_name: str, description: str = "") -> Optional
     logger.info(f"🎨 生成菜品图片: {food_name}, 模型: {image_model}")
 
     try:
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(api_url, headers=headers, json=payload)
-            if response.status_code != 200:
-                logger.error(f"图片生成API错误: {response.status_code} - {response.text[:500]}")
-                return None
+        client = http_clients.get("doubao_image")
+        response = await circuit_breakers.get("doubao_image").call_http(
+            client.post, api_url, headers=headers, json=payload
+        )
+        if response.status_code != 200:
+            logger.error(f"图片生成API错误: {response.status_code} - {response.text[:500]}")
+            return None
 
-            result = response.json()
-            image_url = result["data"][0]["url"]
+        result = response.json()
+        image_url = result["data"][0]["url"]
 
-            save_dir = Path("static/uploads/recipes")
-            save_dir.mkdir(parents=True, exist_ok=True)
-            filename = f"{uuid.uuid4().hex[:12]}.jpg"
-            filepath = save_dir / filename
+        save_dir = Path("static/uploads/recipes")
+        save_dir.mkdir(parents=True, exist_ok=True)
+        filename = f"{uuid.uuid4().hex[:12]}.jpg"
+        filepath = save_dir / filename
 
-            img_resp = await client.get(image_url, timeout=60.0)
-            if img_resp.status_code == 200:
-                with open(filepath, "wb") as f:
-                    f.write(img_resp.content)
-                local_path = f"/static/uploads/recipes/{filename}"
-                logger.info(f"✅ 图片已保存: {local_path}")
-                return local_path
+        img_resp = await client.get(image_url, timeout=60.0)
+        if img_resp.status_code == 200:
+            with open(filepath, "wb") as f:
+                f.write(img_resp.content)
+            local_path = f"/static/uploads/recipes/{filename}"
+            logger.info(f"✅ 图片已保存: {local_path}")
+            return local_path
 
-            logger.error(f"图片下载失败: {img_resp.status_code}")
-            return None
+        logger.error(f"图片下载失败: {img_resp.status_code}")
+        return None
     except Exception as e:
         logger.error(f"图片生成失败: {type(e).__name__}: {e}")
         return None
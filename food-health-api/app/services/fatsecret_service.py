@@ -11,13 +11,14 @@ from typing import Optional, List, Dict, Any
 import httpx
 
 from app.config import get_settings
+from app.services.credential_store import credential_store
+from app.services.http_client import http_clients
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 FATSECRET_TOKEN_URL = "https://oauth.fatsecret.com/connect/token"
 FATSECRET_API_URL = "https://platform.fatsecret.com/rest/server.api"
-REQUEST_TIMEOUT = 10.0
 
 
 class FatSecretService:
@@ -26,35 +27,35 @@ class FatSecretService:
     def __init__(self):
         self.client_id = settings.fatsecret_client_id
         self.client_secret = settings.fatsecret_client_secret
-        self._access_token: Optional[str] = None
+        credential_store.register("fatsecret", self._fetch_token)
 
     @property
     def is_configured(self) -> bool:
         return bool(self.client_id and self.client_secret)
 
     async def _get_token(self) -> Optional[str]:
-        """获取 OAuth 2.0 access token"""
-        if self._access_token:
-            return self._access_token
-
+        """获取 OAuth 2.0 access token（credential_store 缓存，过期前刷新）"""
         if not self.is_configured:
             return None
 
         try:
-            async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
-                response = await client.post(
-                    FATSECRET_TOKEN_URL,
-                    data={"grant_type": "client_credentials", "scope": "basic"},
-                    auth=(self.client_id, self.client_secret),
-                )
-                response.raise_for_status()
-                data = response.json()
-                self._access_token = data["access_token"]
-                return self._access_token
+            return await credential_store.get("fatsecret")
         except Exception as e:
             logger.error(f"FatSecret token 获取失败: {e}")
             return None
 
+    async def _fetch_token(self):
+        """申请新 token，返回 (access_token, expires_in)"""
+        client = http_clients.get("fatsecret")
+        response = await client.post(
+            FATSECRET_TOKEN_URL,
+            data={"grant_type": "client_credentials", "scope": "basic"},
+            auth=(self.client_id, self.client_secret),
+        )
+        response.raise_for_status()
+        data = response.json()
+        return data["access_token"], data.get("expires_in", 86400)
+
     async def search_foods(self, keyword: str, max_results: int = 10) -> List[Dict[str, Any]]:
         """搜索食物，返回统一格式的结果列表"""
         if not self.is_configured:
@@ -74,14 +75,14 @@ class FatSecretService:
                 "max_results": max_results,
             }
 
-            async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
-                response = await client.get(
-                    FATSECRET_API_URL,
-                    params=params,
-                    headers={"Authorization": f"Bearer {token}"},
-                )
-                response.raise_for_status()
-                data = response.json()
+            client = http_clients.get("fatsecret")
+            response = await client.get(
+                FATSECRET_API_URL,
+                params=params,
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            response.raise_for_status()
+            data = response.json()
 
             foods_data = data.get("foods", {})
             if not foods_data or "food" not in foods_data:
@@ -95,7 +96,7 @@ class FatSecretService:
 
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 401:
-                self._access_token = None
+                await credential_store.invalidate("fatsecret", token)
             logger.warning(f"FatSecret API 错误: {e}")
             return []
         except Exception as e:
@@ -10,6 +10,7 @@ from sqlalchemy import desc
 
 from app.models.user_favorite import UserFavorite
 from app.models.food import PremiumRecipe
+from app.services.recipe_counters import recipe_counters
 
 logger = logging.getLogger(__name__)
 
@@ -40,22 +41,17 @@ class FavoriteService:
         if existing:
             # 取消收藏
             self.db.delete(existing)
-            # 减少食谱收藏计数
-            self.db.query(PremiumRecipe).filter(
-                PremiumRecipe.id == recipe_id,
-                PremiumRecipe.favorite_count > 0,
-            ).update({"favorite_count": PremiumRecipe.favorite_count - 1})
             self.db.commit()
+            # 减少食谱收藏计数（写缓冲，不在本事务内锁食谱行）
+            recipe_counters.add(recipe_id, "favorite_count", -1)
             return False
         else:
             # 添加收藏
             fav = UserFavorite(user_id=user_id, recipe_id=recipe_id)
             self.db.add(fav)
-            # 增加食谱收藏计数
-            self.db.query(PremiumRecipe).filter(
-                PremiumRecipe.id == recipe_id,
-            ).update({"favorite_count": PremiumRecipe.favorite_count + 1})
             self.db.commit()
+            # 增加食谱收藏计数（写缓冲，不在本事务内锁食谱行）
+            recipe_counters.add(recipe_id, "favorite_count", 1)
             return True
 
     def get_user_favorites(
@@ -108,6 +104,8 @@ class FavoriteService:
             PremiumRecipe.id == recipe_id
         ).first()
         count = recipe.favorite_count if recipe else 0
+        # 叠加尚未写回的增量，刚收藏/取消后立即可见
+        count = max(count + recipe_counters.pending(recipe_id)["favorite_count"], 0)
         return {"is_favorited": is_fav, "favorite_count": count}
 
     def get_user_favorite_ids(self, user_id: int) -> List[int]:
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+食物搜索 n-gram 倒排索引
+
+search_foods 原先用 LIKE '%关键词%' 搜索 food.name / food.alias / food_temp.name，
+无法使用索引，每次搜索都全表扫描。这里在进程内维护单字 + 二元组（bigram）倒排表：
+
+- 关键词为单字时取单字倒排，多字时对其所有二元组的倒排求交集得到候选，
+  候选再做一次子串校验（与 LIKE 语义一致，不会误匹配）
+- 排序与原 SQL 一致：精确匹配 > 前缀匹配 > 别名匹配 > 包含匹配，同级按 id；
+  精确 / 前缀在按名称排序的列表上二分查找，别名 / 包含按 id 升序校验候选，够数即停
+- 启动时在线程池中构建（warm），首次搜索时若尚未加载再同步构建；
+  upsert_temp_food 提交后增量更新，并只推进指纹中 food_temp 的本地部分
+- 每隔 FOOD_SEARCH_CHECK_SECONDS 比对两表的 (行数, 最大 id, 最大更新时间)，
+  导入脚本、其他 worker 的写入使指纹变化后在后台线程整体重建，重建期间继续使用旧索引
+
+FOOD_SEARCH_BACKEND=like 时退回原来的 LIKE 查询。
+"""
+import bisect
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database.connection import SessionLocal
+from app.models.food import Food, FoodTemp
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def _normalize(text: Optional[str]) -> str:
+    return (text or "").strip().casefold()
+
+
+def read_fingerprint(db: Session) -> Tuple:
+    """Food / FoodTemp 各自的 (行数, 最大 id, 最大更新时间)，用于发现其他进程的写入"""
+    return tuple(
+        tuple(db.query(func.count(model.id), func.max(model.id), func.max(model.updated_at)).one())
+        for model in (Food, FoodTemp)
+    )
+
+
+def _grams(text: str) -> Set[str]:
+    """单字 + 相邻二元组"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def _query_grams(keyword: str) -> Set[str]:
+    if len(keyword) == 1:
+        return {keyword}
+    return {keyword[i:i + 2] for i in range(len(keyword) - 1)}
+
+
+class _NgramIndex:
+    """单个文本字段的倒排索引：id -> 归一化文本"""
+
+    def __init__(self):
+        self.docs: Dict[int, str] = {}
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+
+    def add(self, doc_id: int, text: Optional[str]) -> None:
+        self.remove(doc_id)
+        text = _normalize(text)
+        if not text:
+            return
+        self.docs[doc_id] = text
+        for gram in _grams(text):
+            self.postings[gram].add(doc_id)
+
+    def remove(self, doc_id: int) -> None:
+        text = self.docs.pop(doc_id, None)
+        if text is None:
+            return
+        for gram in _grams(text):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.postings[gram]
+
+    def candidates(self, keyword: str) -> Set[int]:
+        """包含关键词所有 n-gram 的文档（需再做子串校验）"""
+        lists = []
+        for gram in _query_grams(keyword):
+            ids = self.postings.get(gram)
+            if not ids:
+                return set()
+            lists.append(ids)
+        lists.sort(key=len)
+        return lists[0].intersection(*lists[1:])
+
+    def matches(self, keyword: str, limit: int, exclude: Set[int] = frozenset()) -> List[int]:
+        """文本包含关键词的前 limit 个 id（按 id 升序）"""
+        result = []
+        for doc_id in sorted(self.candidates(keyword) - exclude):
+            if keyword in self.docs[doc_id]:
+                result.append(doc_id)
+                if len(result) >= limit:
+                    break
+        return result
+
+
+class _PrefixIndex:
+    """按名称排序的 (名称, id) 列表，二分查找前缀区间（Food 只在重建时整体加载）"""
+
+    def __init__(self):
+        self.entries: List[Tuple[str, int]] = []
+
+    def prefixed(self, keyword: str) -> Iterable[Tuple[str, int]]:
+        i = bisect.bisect_left(self.entries, (keyword,))
+        while i < len(self.entries) and self.entries[i][0].startswith(keyword):
+            yield self.entries[i]
+            i += 1
+
+
+class FoodSearchIndex:
+    """Food + FoodTemp 搜索索引（线程安全）"""
+
+    def __init__(self, check_seconds: float = 60, session_factory=SessionLocal):
+        self.check_seconds = check_seconds
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._names = _NgramIndex()
+        self._aliases = _NgramIndex()
+        self._prefixes = _PrefixIndex()
+        self._temps = _NgramIndex()
+        self._bind = None
+        self._fingerprint = None
+        self._checked_at = 0.0
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._pending: List[Tuple[int, str]] = []  # 后台重建期间的增量写入，换入新索引时补上
+
+        self.rebuilds = 0
+        self.background_refreshes = 0
+        self.incremental_updates = 0
+        self.last_rebuild_ms = 0.0
+
+    # ------ 查询 ------
+
+    def search_foods(self, db: Session, keyword: str, limit: int) -> List[int]:
+        """匹配 name / alias 的 Food id，按优先级排序"""
+        keyword = _normalize(keyword)
+        if not keyword:
+            return []
+        with self._lock:
+            self._ensure_fresh(db)
+            # 精确、前缀：名称有序表上的前缀区间
+            exact, prefixed = [], []
+            for name, doc_id in self._prefixes.prefixed(keyword):
+                (exact if name == keyword else prefixed).append(doc_id)
+            ranked = exact + sorted(prefixed)
+            # 别名、包含：倒排候选按 id 升序校验，够数即停
+            for index in (self._aliases, self._names):
+                if len(ranked) >= limit:
+                    break
+                ranked += index.matches(keyword, limit - len(ranked), exclude=set(ranked))
+        return ranked[:limit]
+
+    def search_temps(self, db: Session, keyword: str, limit: int) -> List[int]:
+        """名称包含关键词的 FoodTemp id，按 id 排序"""
+        keyword = _normalize(keyword)
+        if not keyword:
+            return []
+        with self._lock:
+            self._ensure_fresh(db)
+            return self._temps.matches(keyword, limit)
+
+    # ------ 写入后增量更新 ------
+
+    def upsert_temp(self, db: Session, temp: FoodTemp) -> None:
+        """FoodTemp 写入提交后调用"""
+        with self._lock:
+            if self._bind is not db.get_bind():
+                # 尚未加载（或属于其他数据库），下次搜索时整体构建
+                return
+            self._fingerprint = self._advance_fingerprint(temp)
+            self._temps.add(temp.id, temp.name)
+            if self._refresh_thread is not None:
+                self._pending.append((temp.id, temp.name))
+            self.incremental_updates += 1
+
+    def _advance_fingerprint(self, temp: FoodTemp):
+        """
+        只按这一行推进指纹中 food_temp 的部分（新行数 +1、最大 id / 更新时间取较大值），
+        上次校验以来其他进程的写入仍会在下次校验时被发现
+        """
+        if self._fingerprint is None:
+            return None
+        foods, (count, max_id, max_updated) = self._fingerprint
+        if temp.id not in self._temps.docs:
+            count += 1
+        max_id = max(max_id or 0, temp.id)
+        if temp.updated_at is not None and (max_updated is None or temp.updated_at > max_updated):
+            max_updated = temp.updated_at
+        return foods, (count, max_id, max_updated)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._bind = None
+            self._fingerprint = None
+
+    def warm(self) -> None:
+        """启动时构建（由 lifespan 放到线程池执行；数据库不可用时留到首次搜索）"""
+        try:
+            with self._session_factory() as db:
+                with self._lock:
+                    self._rebuild(db)
+            logger.info(f"✅ 食物搜索索引已构建: {len(self._names.docs)} 条食物，"
+                        f"{len(self._temps.docs)} 条临时食物，耗时 {self.last_rebuild_ms:.0f}ms")
+        except Exception as e:
+            logger.warning(f"⚠️ 食物搜索索引构建失败，将在首次搜索时重试: {type(e).__name__}: {e}")
+
+    def wait_refresh(self, timeout: Optional[float] = None) -> None:
+        """等待进行中的后台重建完成（测试与基准脚本使用）"""
+        thread = self._refresh_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    # ------ 加载与校验 ------
+
+    def _ensure_fresh(self, db: Session) -> None:
+        bind = db.get_bind()
+        if self._bind is not bind:
+            # 尚未加载（启动预热失败或属于其他数据库），只能同步构建
+            self._rebuild(db)
+            return
+        if self._refresh_thread is not None or time.monotonic() - self._checked_at < self.check_seconds:
+            return
+        self._checked_at = time.monotonic()
+        if read_fingerprint(db) != self._fingerprint:
+            logger.info("🔄 食物表有外部写入，后台重建搜索索引")
+            self._refresh_thread = threading.Thread(
+                target=self._refresh, args=(bind,), name="food-search-refresh", daemon=True
+            )
+            self._refresh_thread.start()
+
+    def _refresh(self, bind) -> None:
+        """后台线程：用独立 Session 加载新索引，加载期间不持锁，搜索继续使用旧索引"""
+        try:
+            with Session(bind=bind) as db:
+                loaded = self._load(db)
+            with self._lock:
+                if self._bind is bind:
+                    self._install(bind, *loaded)
+                    for doc_id, name in self._pending:
+                        self._temps.add(doc_id, name)
+                    self.background_refreshes += 1
+        except Exception as e:
+            logger.warning(f"⚠️ 后台重建食物搜索索引失败，下次校验时重试: {type(e).__name__}: {e}")
+        finally:
+            with self._lock:
+                self._pending = []
+                self._refresh_thread = None
+
+    def _rebuild(self, db: Session) -> None:
+        self._install(db.get_bind(), *self._load(db))
+
+    def _load(self, db: Session):
+        started = time.perf_counter()
+        fingerprint = read_fingerprint(db)
+        names, aliases, prefixes, temps = _NgramIndex(), _NgramIndex(), _PrefixIndex(), _NgramIndex()
+        for doc_id, name, alias in db.query(Food.id, Food.name, Food.alias).yield_per(5000):
+            names.add(doc_id, name)
+            aliases.add(doc_id, alias)
+            prefixes.entries.append((_normalize(name), doc_id))
+        prefixes.entries.sort()
+        for doc_id, name in db.query(FoodTemp.id, FoodTemp.name).yield_per(5000):
+            temps.add(doc_id, name)
+        return fingerprint, (names, aliases, prefixes, temps), (time.perf_counter() - started) * 1000
+
+    def _install(self, bind, fingerprint, indexes, elapsed_ms: float) -> None:
+        self._names, self._aliases, self._prefixes, self._temps = indexes
+        self._bind = bind
+        self._fingerprint = fingerprint
+        self._checked_at = time.monotonic()
+        self.rebuilds += 1
+        self.last_rebuild_ms = elapsed_ms
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": settings.food_search_backend,
+            "loaded": self._bind is not None,
+            "foods": len(self._names.docs),
+            "temps": len(self._temps.docs),
+            "grams": sum(len(index.postings) for index in (self._names, self._aliases, self._temps)),
+            "rebuilds": self.rebuilds,
+            "background_refreshes": self.background_refreshes,
+            "refreshing": self._refresh_thread is not None,
+            "incremental_updates": self.incremental_updates,
+            "last_rebuild_ms": round(self.last_rebuild_ms, 1),
+        }
+
+
+# 全局单例
+food_search_index = FoodSearchIndex(check_seconds=settings.food_search_check_seconds)
@@ -2,14 +2,31 @@
 """
 食物数据服务
 """
+import json
+from datetime import datetime, timedelta
 from typing import Optional, List
 from sqlalchemy.orm import Session
 
+from app.config import get_settings
 from app.models.food import Food, FoodTemp, FoodContraindication, CookingMethod, FoodPortion
 from app.schemas.food import (
     FoodResponse, NutritionInfo, ContraindicationInfo,
     CookingMethodResponse, PortionResponse
 )
+from app.services.food_search_index import food_search_index
+from app.services.food_suggest import food_suggest_index
+
+settings = get_settings()
+
+# 临时数据来源可信度（越高越可信）
+# 新数据不会覆盖仍在有效期内的更可信数据；低于阈值的数据不用于跳过 AI 补充
+TEMP_SOURCE_QUALITY = {
+    "deepseek_ai": 3,
+    "doubao_ai": 3,
+    "fatsecret": 2,
+    "openfoodfacts": 2,
+    "baidu_ai": 0,  # 只有热量，三大营养素为 0
+}
 
 
 class FoodService:
@@ -155,8 +172,45 @@ class FoodService:
             is_temp=True,
         )
 
-    def upsert_temp_food(self, name: str, nutrition: dict, source: str) -> Optional[FoodTemp]:
-        """写入临时食物数据（AI/用户补充）"""
+    @staticmethod
+    def _is_fresh(temp: FoodTemp) -> bool:
+        updated_at = temp.updated_at or temp.created_at
+        if updated_at is None:
+            return False
+        return datetime.now() - updated_at <= timedelta(days=settings.food_temp_max_age_days)
+
+    def get_reusable_temp_food(self, name: str) -> Optional[FoodTemp]:
+        """
+        获取可直接复用的 AI 补充数据（用于识别时跳过 DeepSeek 调用）
+
+        条件：未过期、来源可信度达标、包含健康详情
+        """
+        temp = self.db.query(FoodTemp).filter(FoodTemp.name == name).first()
+        if not temp or not temp.detail:
+            return None
+        if TEMP_SOURCE_QUALITY.get(temp.source, 0) < settings.food_temp_min_source_quality:
+            return None
+        if not self._is_fresh(temp):
+            return None
+        return temp
+
+    @staticmethod
+    def get_temp_detail(temp: FoodTemp) -> dict:
+        """解析临时数据中的健康详情 JSON"""
+        try:
+            return json.loads(temp.detail) if temp.detail else {}
+        except (TypeError, ValueError):
+            return {}
+
+    def upsert_temp_food(
+        self, name: str, nutrition: dict, source: str, detail: Optional[dict] = None
+    ) -> Optional[FoodTemp]:
+        """
+        写入临时食物数据（AI/用户补充）
+
+        detail 为健康详情（gi / health_rating / health_tips / contraindications），
+        新数据没有详情时保留原有详情
+        """
         food = self.get_food_by_name(name)
         if food:
             return None
@@ -166,13 +220,22 @@ class FoodService:
         protein = nutrition.get("protein", 0) or 0
         fat = nutrition.get("fat", 0) or 0
         carb = nutrition.get("carb", 0) or 0
+        detail_json = json.dumps(detail, ensure_ascii=False) if detail else None
 
         if temp:
+            # 不用低可信度来源覆盖有效期内的高可信度数据
+            if (
+                TEMP_SOURCE_QUALITY.get(temp.source, 0) > TEMP_SOURCE_QUALITY.get(source, 0)
+                and self._is_fresh(temp)
+            ):
+                return temp
             temp.calories = calories
             temp.protein = protein
             temp.fat = fat
             temp.carbohydrate = carb
             temp.source = source
+            if detail_json:
+                temp.detail = detail_json
         else:
             temp = FoodTemp(
                 name=name,
@@ -181,11 +244,14 @@ class FoodService:
                 fat=fat,
                 carbohydrate=carb,
                 source=source,
+                detail=detail_json,
             )
             self.db.add(temp)
 
         self.db.commit()
         self.db.refresh(temp)
+        food_search_index.upsert_temp(self.db, temp)
+        food_suggest_index.add_temp(self.db, temp)
         return temp
     
     def _get_contraindications(self, food: Food) -> List[ContraindicationInfo]:
@@ -265,6 +331,47 @@ class FoodService:
     
     def search_foods(self, keyword: str, limit: int = 10) -> List[FoodResponse]:
         """搜索食物 - 优化版：精确匹配优先"""
+        if settings.food_search_backend == "like":
+            foods, temp_foods = self._search_like(keyword, limit)
+        else:
+            foods, temp_foods = self._search_indexed(keyword, limit)
+
+        results: List[FoodResponse] = []
+        seen_names = set()
+        for item in foods:
+            response = self.get_food_response(item.name)
+            if response:
+                results.append(response)
+                seen_names.add(response.name)
+
+        # FoodTemp 补充
+        if len(results) < limit:
+            for temp in temp_foods(limit - len(results)):
+                if temp.name in seen_names:
+                    continue
+                results.append(self._build_temp_response(temp))
+                seen_names.add(temp.name)
+
+        return results[:limit]
+
+    def _search_indexed(self, keyword: str, limit: int):
+        """n-gram 倒排索引取 id，再按主键回表"""
+        food_ids = food_search_index.search_foods(self.db, keyword, limit)
+        foods = self._load_by_ids(Food, food_ids)
+
+        def temp_foods(remaining: int) -> List[FoodTemp]:
+            return self._load_by_ids(FoodTemp, food_search_index.search_temps(self.db, keyword, remaining))
+
+        return foods, temp_foods
+
+    def _load_by_ids(self, model, ids: List[int]) -> list:
+        if not ids:
+            return []
+        rows = {row.id: row for row in self.db.query(model).filter(model.id.in_(ids)).all()}
+        return [rows[i] for i in ids if i in rows]
+
+    def _search_like(self, keyword: str, limit: int):
+        """LIKE 全表扫描（FOOD_SEARCH_BACKEND=like）"""
         from sqlalchemy import case, or_
 
         # 构建优先级排序：精确匹配 > 前缀匹配 > 别名匹配 > 包含匹配
@@ -280,27 +387,11 @@ class FoodService:
                 Food.name.contains(keyword),
                 Food.alias.contains(keyword)
             )
-        ).order_by(priority).limit(limit).all()
+        ).order_by(priority, Food.id).limit(limit).all()
 
-        results: List[FoodResponse] = []
-        seen_names = set()
-        for item in foods:
-            response = self.get_food_response(item.name)
-            if response:
-                results.append(response)
-                seen_names.add(response.name)
-
-        # FoodTemp 补充
-        if len(results) < limit:
-            remaining = limit - len(results)
-            temp_foods = self.db.query(FoodTemp).filter(
+        def temp_foods(remaining: int) -> List[FoodTemp]:
+            return self.db.query(FoodTemp).filter(
                 FoodTemp.name.contains(keyword)
-            ).limit(remaining).all()
+            ).order_by(FoodTemp.id).limit(remaining).all()
 
-            for temp in temp_foods:
-                if temp.name in seen_names:
-                    continue
-                results.append(self._build_temp_response(temp))
-                seen_names.add(temp.name)
-
-        return results[:limit]
+        return foods, temp_foods
@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+食物搜索联想（/food/suggest）
+
+搜索框每次按键都调 /food?keyword= 会走 search_foods，本地结果不足时还会请求
+FatSecret / Open Food Facts。联想只需要名称，这里在进程内维护前缀索引，不访问网络：
+
+- 检索键：名称、别名（逗号等分隔）、全拼（xihongshi）、拼音首字母（xhs），
+  统一小写并去掉空白；拼音依赖 pypinyin，未安装时只按汉字 / 别名匹配
+- 所有 (检索键, 条目) 按检索键排序存放，前缀查询二分定位区间（相当于压平的 trie，
+  10 万条食物时比逐字符节点的 trie 省一个数量级内存）
+- 区间较小时直接扫描排序；区间较大的热门前缀（如单个字母）缓存前 N 条，
+  构建时预热，新增条目时同步更新缓存
+- 排序：检索键与输入完全相同优先，其次标准库食物优先于临时食物、名称短的优先
+- 启动时在线程池中从 Food / FoodTemp 构建；upsert_temp_food 提交后增量加入，
+  新检索键先放进小的增量表，攒够 DELTA_MAX 条再并入主表，避免每次插入都移动整个列表
+- 与搜索索引相同，每隔 FOOD_SEARCH_CHECK_SECONDS 比对两表指纹，其他 worker、
+  导入脚本的新增 / 改名 / 删除使指纹变化后在后台线程重建，重建期间继续使用旧索引
+"""
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database.connection import SessionLocal
+from app.models.food import Food, FoodTemp
+from app.services.food_search_index import read_fingerprint
+
+try:
+    from pypinyin import Style, lazy_pinyin
+    from pypinyin.seg.simpleseg import seg as _segment
+except ImportError:  # pypinyin 未安装时不支持拼音联想
+    Style = lazy_pinyin = None
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+MAX_LIMIT = 20
+SCAN_THRESHOLD = 256  # 前缀区间超过该条数时走热门前缀缓存
+DELTA_MAX = 2048  # 增量检索键超过该条数时并入主表
+_KEY_END = "\U0010ffff"
+_ALIAS_SEPARATORS = re.compile(r"[,，、;；/|]")
+_WHITESPACE = re.compile(r"\s+")
+_HAN = re.compile(r"[一-鿿]")
+
+
+def _normalize(text: Optional[str]) -> str:
+    return _WHITESPACE.sub("", text or "").casefold()
+
+
+@lru_cache(maxsize=65536)
+def _phrase_pinyin(phrase: str) -> Tuple[str, str]:
+    """词组的 (全拼, 首字母)；食物名由少量常见词组合而成，按词缓存避免重复转换"""
+    return "".join(lazy_pinyin(phrase)), "".join(lazy_pinyin(phrase, style=Style.FIRST_LETTER))
+
+
+def _pinyin_keys(text: str) -> Tuple[str, str]:
+    # 先按 pypinyin 的词库分词，多音字按词组读音（如 重庆 chongqing）
+    phrases = [_phrase_pinyin(phrase) for phrase in _segment(text)]
+    return "".join(full for full, _ in phrases), "".join(initials for _, initials in phrases)
+
+
+def _search_keys(name: str, alias: Optional[str] = None) -> Set[str]:
+    """条目的全部检索键"""
+    texts = [name] + [part for part in _ALIAS_SEPARATORS.split(alias or "") if part.strip()]
+    keys = set()
+    for text in texts:
+        keys.add(_normalize(text))
+        if lazy_pinyin is not None and _HAN.search(text):
+            keys.update(_normalize(key) for key in _pinyin_keys(text))
+    keys.discard("")
+    return keys
+
+
+def _span(keys: List[Tuple[str, int]], prefix: str) -> Tuple[int, int]:
+    """有序 (检索键, 条目下标) 列表中以 prefix 开头的区间"""
+    lo = bisect.bisect_left(keys, (prefix,))
+    return lo, bisect.bisect_left(keys, (prefix + _KEY_END,), lo)
+
+
+def _exact(keys: List[Tuple[str, int]], lo: int, hi: int, prefix: str) -> List[int]:
+    """区间开头检索键与 prefix 完全相同的条目"""
+    result = []
+    while lo < hi and keys[lo][0] == prefix:
+        result.append(keys[lo][1])
+        lo += 1
+    return result
+
+
+class _Entry(NamedTuple):
+    name: str
+    data_source: str
+
+
+class FoodSuggestIndex:
+    """食物名称前缀索引（线程安全）"""
+
+    def __init__(self, session_factory=SessionLocal, check_seconds: float = 60):
+        self._session_factory = session_factory
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._entries: List[_Entry] = []
+        self._ranks: List[Tuple[int, int, str]] = []  # 与 _entries 对应：(是否临时食物, 名称长度, 名称)
+        self._names: Dict[str, int] = {}  # 名称 -> 条目下标，同名只保留一条
+        self._temp_ids: Set[int] = set()  # 已收录的 FoodTemp id，推进指纹时判断是否新增行
+        self._keys: List[Tuple[str, int]] = []  # (检索键, 条目下标)，按检索键排序
+        self._delta: List[Tuple[str, int]] = []  # 增量写入的 (检索键, 条目下标)，同样有序
+        self._hot: Dict[str, List[int]] = {}  # 热门前缀 -> 排好序的前 MAX_LIMIT 个条目下标
+        self._bind = None
+        self._fingerprint = None
+        self._checked_at = 0.0
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._pending: List[Tuple[int, str, Optional[str]]] = []  # 后台重建期间的增量写入
+
+        self.rebuilds = 0
+        self.background_refreshes = 0
+        self.incremental_updates = 0
+        self.last_rebuild_ms = 0.0
+
+    # ------ 查询 ------
+
+    def suggest(self, db: Session, keyword: str, limit: int = 10) -> List[Dict[str, str]]:
+        prefix = _normalize(keyword)
+        if not prefix:
+            return []
+        limit = min(limit, MAX_LIMIT)
+        with self._lock:
+            self._ensure_fresh(db)
+            lo, hi = _span(self._keys, prefix)
+            dlo, dhi = _span(self._delta, prefix)
+
+            # 检索键与输入完全相同的条目优先
+            exact = _exact(self._keys, lo, hi, prefix) + _exact(self._delta, dlo, dhi, prefix)
+            ordered = sorted(set(exact), key=self._ranks.__getitem__)
+            if len(ordered) < limit:
+                ordered += self._top(prefix, lo, hi, dlo, dhi)
+            result, seen = [], set()
+            for index in ordered:
+                if index in seen:
+                    continue
+                seen.add(index)
+                entry = self._entries[index]
+                result.append({"name": entry.name, "data_source": entry.data_source})
+                if len(result) >= limit:
+                    break
+        return result
+
+    def _top(self, prefix: str, lo: int, hi: int, dlo: int = 0, dhi: int = 0) -> List[int]:
+        """前缀区间内排序最靠前的 MAX_LIMIT 个条目；大区间结果缓存"""
+        if hi - lo <= SCAN_THRESHOLD:
+            return self._best(lo, hi, dlo, dhi)
+        hot = self._hot.get(prefix)
+        if hot is None:
+            hot = self._hot[prefix] = self._best(lo, hi, dlo, dhi)
+        return hot
+
+    def _best(self, lo: int, hi: int, dlo: int = 0, dhi: int = 0) -> List[int]:
+        indexes = {self._keys[i][1] for i in range(lo, hi)}
+        indexes.update(self._delta[i][1] for i in range(dlo, dhi))
+        return heapq.nsmallest(MAX_LIMIT, indexes, key=self._ranks.__getitem__)
+
+    # ------ 写入后增量更新 ------
+
+    def add_temp(self, db: Session, temp: FoodTemp) -> None:
+        """FoodTemp 写入提交后调用"""
+        with self._lock:
+            if self._bind is not db.get_bind():
+                # 尚未加载（或属于其他数据库），下次查询时整体构建
+                return
+            self._fingerprint = self._advance_fingerprint(temp)
+            if self._refresh_thread is not None:
+                self._pending.append((temp.id, temp.name, temp.source))
+            self._add_temp(temp.id, temp.name, temp.source)
+
+    def _add_temp(self, temp_id: int, name: str, source: Optional[str]) -> None:
+        self._temp_ids.add(temp_id)
+        if name in self._names:
+            return
+        index = self._append(_Entry(name, source or "temp"), name, is_temp=True)
+        keys = _search_keys(name)
+        for key in keys:
+            bisect.insort(self._delta, (key, index))
+        if len(self._delta) > DELTA_MAX:
+            self._keys = list(heapq.merge(self._keys, self._delta))
+            self._delta = []
+        # 多个检索键可能有相同前缀（如全拼与首字母都以 x 开头），每个前缀只插入一次
+        prefixes = {key[:end] for key in keys for end in range(1, len(key) + 1)}
+        for prefix in prefixes:
+            hot = self._hot.get(prefix)
+            if hot is not None:
+                bisect.insort(hot, index, key=self._ranks.__getitem__)
+                del hot[MAX_LIMIT:]
+        self.incremental_updates += 1
+
+    def _advance_fingerprint(self, temp: FoodTemp):
+        """只按这一行推进指纹中 food_temp 的部分，其他进程的写入仍会在下次校验时被发现"""
+        if self._fingerprint is None:
+            return None
+        foods, (count, max_id, max_updated) = self._fingerprint
+        if temp.id not in self._temp_ids:
+            count += 1
+        max_id = max(max_id or 0, temp.id)
+        if temp.updated_at is not None and (max_updated is None or temp.updated_at > max_updated):
+            max_updated = temp.updated_at
+        return foods, (count, max_id, max_updated)
+
+    def _append(self, entry: _Entry, name: str, is_temp: bool) -> int:
+        self._entries.append(entry)
+        self._ranks.append((int(is_temp), len(name), name))
+        self._names[name] = len(self._entries) - 1
+        return self._names[name]
+
+    # ------ 构建与校验 ------
+
+    def warm(self) -> None:
+        """启动时构建（由 lifespan 放到线程池执行；数据库不可用时留到首次查询）"""
+        try:
+            with self._session_factory() as db:
+                with self._lock:
+                    self._rebuild(db)
+            logger.info(f"✅ 食物联想索引已构建: {len(self._entries)} 条，{len(self._keys)} 个检索键，"
+                        f"耗时 {self.last_rebuild_ms:.0f}ms")
+        except Exception as e:
+            logger.warning(f"⚠️ 食物联想索引构建失败，将在首次查询时重试: {type(e).__name__}: {e}")
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._bind = None
+            self._fingerprint = None
+
+    def wait_refresh(self, timeout: Optional[float] = None) -> None:
+        """等待进行中的后台重建完成（测试使用）"""
+        thread = self._refresh_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _ensure_fresh(self, db: Session) -> None:
+        bind = db.get_bind()
+        if self._bind is not bind:
+            # 尚未加载（启动预热失败或属于其他数据库），只能同步构建
+            self._rebuild(db)
+            return
+        if self._refresh_thread is not None or time.monotonic() - self._checked_at < self.check_seconds:
+            return
+        self._checked_at = time.monotonic()
+        if read_fingerprint(db) != self._fingerprint:
+            logger.info("🔄 食物表有外部写入，后台重建联想索引")
+            self._refresh_thread = threading.Thread(
+                target=self._refresh, args=(bind,), name="food-suggest-refresh", daemon=True
+            )
+            self._refresh_thread.start()
+
+    def _refresh(self, bind) -> None:
+        """后台线程：在新实例上构建，完成后整体换入，构建期间不持锁"""
+        try:
+            fresh = FoodSuggestIndex(self._session_factory, self.check_seconds)
+            with Session(bind=bind) as db:
+                fresh._rebuild(db)
+            with self._lock:
+                if self._bind is bind:
+                    self._adopt(fresh)
+                    for item in self._pending:
+                        self._add_temp(*item)
+                    self.background_refreshes += 1
+        except Exception as e:
+            logger.warning(f"⚠️ 后台重建食物联想索引失败，下次校验时重试: {type(e).__name__}: {e}")
+        finally:
+            with self._lock:
+                self._pending = []
+                self._refresh_thread = None
+
+    def _adopt(self, fresh: "FoodSuggestIndex") -> None:
+        self._entries, self._ranks, self._names, self._temp_ids = (
+            fresh._entries, fresh._ranks, fresh._names, fresh._temp_ids
+        )
+        self._keys, self._delta, self._hot = fresh._keys, fresh._delta, fresh._hot
+        self._fingerprint, self._checked_at = fresh._fingerprint, fresh._checked_at
+        self.rebuilds += 1
+        self.last_rebuild_ms = fresh.last_rebuild_ms
+
+    def _rebuild(self, db: Session) -> None:
+        started = time.perf_counter()
+        self._fingerprint = read_fingerprint(db)
+        self._entries, self._ranks, self._names, self._temp_ids = [], [], {}, set()
+        self._keys, self._delta, self._hot = [], [], {}
+        for name, alias in db.query(Food.name, Food.alias).yield_per(5000):
+            index = self._append(_Entry(name, "database"), name, is_temp=False)
+            self._keys.extend((key, index) for key in _search_keys(name, alias))
+        for temp_id, name, source in db.query(FoodTemp.id, FoodTemp.name, FoodTemp.source).yield_per(5000):
+            self._temp_ids.add(temp_id)
+            if name in self._names:
+                continue
+            index = self._append(_Entry(name, source or "temp"), name, is_temp=True)
+            self._keys.extend((key, index) for key in _search_keys(name))
+        self._keys.sort()
+        self._warm_hot("", 0, len(self._keys))
+        self._bind = db.get_bind()
+        self._checked_at = time.monotonic()
+        self.rebuilds += 1
+        self.last_rebuild_ms = (time.perf_counter() - started) * 1000
+
+    def _warm_hot(self, prefix: str, lo: int, hi: int) -> None:
+        """逐层缓存条目数超过阈值的前缀"""
+        depth = len(prefix)
+        i = lo
+        while i < hi:
+            key = self._keys[i][0]
+            if len(key) <= depth:
+                i += 1
+                continue
+            child = key[:depth + 1]
+            child_hi = bisect.bisect_left(self._keys, (child + _KEY_END,), i, hi)
+            if child_hi - i > SCAN_THRESHOLD:
+                self._top(child, i, child_hi)
+                self._warm_hot(child, i, child_hi)
+            i = child_hi
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self._bind is not None,
+            "pinyin": lazy_pinyin is not None,
+            "entries": len(self._entries),
+            "keys": len(self._keys) + len(self._delta),
+            "hot_prefixes": len(self._hot),
+            "rebuilds": self.rebuilds,
+            "background_refreshes": self.background_refreshes,
+            "refreshing": self._refresh_thread is not None,
+            "incremental_updates": self.incremental_updates,
+            "last_rebuild_ms": round(self.last_rebuild_ms, 1),
+        }
+
+
+# 全局单例
+food_suggest_index = FoodSuggestIndex(check_seconds=settings.food_search_check_seconds)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+共享 HTTP 客户端
+所有外部 AI / 数据服务复用同一组连接池，避免每次请求重新建立 TCP + TLS 连接
+
+- 每个服务一个 httpx.AsyncClient（按服务区分超时配置），客户端内部按主机维护连接池
+- 长连接保活，可选 HTTP/2（需安装 h2）
+- 统计请求数与新建连接数，用于计算连接复用率
+- 由 app/main.py 的 lifespan 在关闭时统一释放
+"""
+import importlib.util
+import logging
+import threading
+from typing import Any, Dict
+
+import httpx
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 各服务超时配置（秒）
+TIMEOUT_PROFILES: Dict[str, float] = {
+    "doubao": 60.0,          # 视觉识别
+    "doubao_image": 120.0,   # 菜品图片生成
+    "baidu": 30.0,
+    "deepseek": 30.0,        # 营养分析 / 健康建议（食谱生成按请求单独放宽）
+    "recipe": 120.0,         # 精品食谱批量生成
+    "fatsecret": 10.0,
+    "openfoodfacts": 10.0,
+    "wechat": 10.0,
+}
+DEFAULT_TIMEOUT = 30.0
+CONNECT_TIMEOUT = 10.0
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class _ClientStats:
+    """单个客户端的请求与连接统计"""
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.connect_failures = 0
+
+    async def on_request(self, request: httpx.Request) -> None:
+        self.requests += 1
+        # 通过 httpcore trace 扩展感知新建连接
+        request.extensions["trace"] = self.trace
+
+    async def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+        elif event_name == "connection.connect_tcp.failed":
+            self.connect_failures += 1
+
+
+class HTTPClientRegistry:
+    """按服务名管理共享的 AsyncClient"""
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, _ClientStats] = {}
+        self._lock = threading.Lock()
+        self.http2 = settings.http2_enabled and _http2_available()
+        if settings.http2_enabled and not self.http2:
+            logger.warning("⚠️ 已开启 HTTP2_ENABLED 但未安装 h2，回退到 HTTP/1.1")
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """获取服务对应的共享客户端（首次使用时创建）"""
+        client = self._clients.get(name)
+        if client is not None and not client.is_closed:
+            return client
+
+        with self._lock:
+            client = self._clients.get(name)
+            if client is not None and not client.is_closed:
+                return client
+
+            stats = self._stats.setdefault(name, _ClientStats())
+            timeout = TIMEOUT_PROFILES.get(name, DEFAULT_TIMEOUT)
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(timeout, connect=min(CONNECT_TIMEOUT, timeout)),
+                limits=httpx.Limits(
+                    max_connections=settings.http_max_connections,
+                    max_keepalive_connections=settings.http_max_keepalive_connections,
+                    keepalive_expiry=settings.http_keepalive_expiry_seconds,
+                ),
+                http2=self.http2,
+                event_hooks={"request": [stats.on_request]},
+            )
+            self._clients[name] = client
+            logger.info(f"🔌 创建共享 HTTP 客户端: {name}（超时 {timeout}s）")
+            return client
+
+    async def aclose(self) -> None:
+        """关闭全部客户端（应用关闭时调用）"""
+        with self._lock:
+            clients = list(self._clients.items())
+            self._clients.clear()
+        for name, client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"关闭 HTTP 客户端失败 [{name}]: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        连接复用率（用于 /api/v1/status 监控）
+
+        只报告 trace 钩子统计到的数据，不读取 httpx / httpcore 的内部连接池结构
+        """
+        data: Dict[str, Any] = {}
+        for name, stats in self._stats.items():
+            reused = max(stats.requests - stats.new_connections, 0)
+            data[name] = {
+                "requests": stats.requests,
+                "new_connections": stats.new_connections,
+                "connect_failures": stats.connect_failures,
+                "reuse_rate": round(reused / stats.requests, 4) if stats.requests else 0.0,
+                "timeout": TIMEOUT_PROFILES.get(name, DEFAULT_TIMEOUT),
+            }
+        return {"http2": self.http2, "clients": data}
+
+
+# 全局单例
+http_clients = HTTPClientRegistry()
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+图片感知哈希（dHash）与近似图片索引
+
+同一盘菜重拍或重新压缩后字节不同，但感知哈希的汉明距离很小，
+可直接复用最近一次的识别结果，避免重复调用视觉大模型。
+"""
+import io
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow 未安装时退化为不做近似匹配
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+
+
+def compute_dhash(image_bytes: bytes, hash_size: int = 8) -> Optional[int]:
+    """
+    计算图片的差值哈希（dHash）
+
+    灰度化后缩放到 (hash_size+1) x hash_size，比较相邻像素明暗得到 64 位指纹。
+    图片无法解码或未安装 Pillow 时返回 None。
+    """
+    if Image is None:
+        return None
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            # JPEG 解码时直接按比例降采样，避免解码整张大图
+            img.draft("L", (hash_size * 8, hash_size * 8))
+            small = img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+            pixels = list(small.getdata())
+    except Exception as e:
+        logger.warning(f"⚠️ 计算图片哈希失败: {type(e).__name__}: {e}")
+        return None
+
+    value = 0
+    width = hash_size + 1
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            value = (value << 1) | (1 if pixels[offset + col] > pixels[offset + col + 1] else 0)
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个哈希之间的汉明距离"""
+    return (a ^ b).bit_count()
+
+
+class PerceptualHashIndex:
+    """
+    近似图片索引（多段索引 Multi-Index Hashing）
+
+    把 64 位哈希切成 max_distance + 1 段，按鸽巢原理，
+    距离不超过 max_distance 的两个哈希至少有一段完全相同，
+    因此只需比对同段桶内的候选，而不是全量扫描。
+    """
+
+    def __init__(self, max_distance: int = 6, max_entries: int = 5000, ttl_seconds: Optional[float] = 3600):
+        self.max_distance = max(0, min(int(max_distance), HASH_BITS - 1))
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+
+        band_count = self.max_distance + 1
+        base, extra = divmod(HASH_BITS, band_count)
+        self._bands: List[Tuple[int, int]] = []
+        shift = 0
+        for i in range(band_count):
+            width = base + (1 if i < extra else 0)
+            self._bands.append((shift, (1 << width) - 1))
+            shift += width
+
+        # hash -> (expires_at, value)
+        self._entries: "OrderedDict[int, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._buckets: List[Dict[int, set]] = [dict() for _ in self._bands]
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+        self.exact_hits = 0
+        self.evictions = 0
+
+    def _band_keys(self, value: int):
+        for i, (shift, mask) in enumerate(self._bands):
+            yield i, (value >> shift) & mask
+
+    def _remove(self, value: int) -> None:
+        self._entries.pop(value, None)
+        for i, key in self._band_keys(value):
+            bucket = self._buckets[i].get(key)
+            if bucket is not None:
+                bucket.discard(value)
+                if not bucket:
+                    del self._buckets[i][key]
+
+    def add(self, value: int, payload: Any) -> None:
+        """写入索引，超出容量时淘汰最旧的条目"""
+        expires_at = None
+        if self.ttl_seconds and self.ttl_seconds > 0:
+            expires_at = time.monotonic() + self.ttl_seconds
+
+        with self._lock:
+            if value in self._entries:
+                self._entries.move_to_end(value)
+            else:
+                for i, key in self._band_keys(value):
+                    self._buckets[i].setdefault(key, set()).add(value)
+            self._entries[value] = (expires_at, payload)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def find(self, value: int) -> Optional[Tuple[Any, int]]:
+        """
+        查找距离最近且不超过 max_distance 的条目
+
+        Returns:
+            (payload, distance)，未找到返回 None
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.lookups += 1
+
+            candidates = set()
+            for i, key in self._band_keys(value):
+                bucket = self._buckets[i].get(key)
+                if bucket:
+                    candidates.update(bucket)
+
+            best = None
+            best_distance = self.max_distance + 1
+            expired = []
+            for candidate in candidates:
+                distance = (candidate ^ value).bit_count()
+                if distance >= best_distance:
+                    continue
+                expires_at, _ = self._entries[candidate]
+                if expires_at is not None and expires_at <= now:
+                    expired.append(candidate)
+                    continue
+                best, best_distance = candidate, distance
+
+            for candidate in expired:
+                self._remove(candidate)
+
+            if best is None:
+                return None
+
+            self.hits += 1
+            if best_distance == 0:
+                self.exact_hits += 1
+            self._entries.move_to_end(best)
+            return self._entries[best][1], best_distance
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            for bucket in self._buckets:
+                bucket.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """索引统计（用于 /api/v1/status 监控）"""
+        return {
+            "enabled": Image is not None,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "max_distance": self.max_distance,
+            "ttl_seconds": self.ttl_seconds,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "exact_hits": self.exact_hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "evictions": self.evictions,
+        }
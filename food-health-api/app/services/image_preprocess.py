@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+识别前图片预处理
+
+手机原图远超视觉模型所需分辨率，原样 base64 上传既慢又费流量：
+- 按 EXIF 方向旋正
+- 长边缩放到配置上限
+- 重新编码为 JPEG / WebP
+
+CPU 密集，调用方应在线程池中执行（asyncio.to_thread）。
+"""
+import io
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow 未安装时原图直传
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# 输出格式 -> MIME 类型
+OUTPUT_MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+}
+
+
+@dataclass
+class PreprocessedImage:
+    """预处理结果"""
+    data: bytes
+    mime_type: str
+    original_size: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+    cpu_ms: float = 0.0
+    transformed: bool = False
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_size - len(self.data)
+
+
+def preprocess_image(
+    image_bytes: bytes,
+    content_type: str,
+    max_edge: int = 1280,
+    quality: int = 85,
+    output_format: str = "JPEG",
+) -> PreprocessedImage:
+    """
+    解码 -> EXIF 旋正 -> 缩放 -> 重新编码
+
+    重新编码后反而更大（已是小图 JPEG）时保留原图；
+    图片无法解码或未安装 Pillow 时原样返回。
+    """
+    started = time.thread_time()
+    original = PreprocessedImage(
+        data=image_bytes,
+        mime_type=content_type,
+        original_size=len(image_bytes),
+    )
+    output_format = output_format.upper()
+    if Image is None or output_format not in OUTPUT_MIME_TYPES:
+        return original
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            source_format = img.format
+            # JPEG 解码时按比例降采样，减少大图解码开销（draft 只会缩小到不低于目标尺寸）
+            if max_edge:
+                img.draft("RGB", (max_edge, max_edge))
+            # EXIF Orientation 标记（0x0112），1 表示无需旋转
+            rotated = img.getexif().get(0x0112, 1) != 1
+            img = ImageOps.exif_transpose(img)
+            if max_edge and max(img.size) > max_edge:
+                img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+            if img.mode in ("RGBA", "LA", "P"):
+                # 透明背景铺白，避免 JPEG 下变黑
+                rgba = img.convert("RGBA")
+                background = Image.new("RGB", rgba.size, (255, 255, 255))
+                background.paste(rgba, mask=rgba.getchannel("A"))
+                img = background
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+
+            buffer = io.BytesIO()
+            save_kwargs = {"quality": quality}
+            if output_format == "JPEG":
+                save_kwargs["optimize"] = True
+            img.save(buffer, format=output_format, **save_kwargs)
+            width, height = img.size
+    except Exception as e:
+        logger.warning(f"⚠️ 图片预处理失败，使用原图: {type(e).__name__}: {e}")
+        original.cpu_ms = (time.thread_time() - started) * 1000
+        return original
+
+    data = buffer.getvalue()
+    cpu_ms = (time.thread_time() - started) * 1000
+    if len(data) >= len(image_bytes) and source_format == output_format and not rotated:
+        # 原图已足够小且方向正确，重新编码没有收益
+        original.width, original.height = width, height
+        original.cpu_ms = cpu_ms
+        return original
+
+    return PreprocessedImage(
+        data=data,
+        mime_type=OUTPUT_MIME_TYPES[output_format],
+        original_size=len(image_bytes),
+        width=width,
+        height=height,
+        cpu_ms=cpu_ms,
+        transformed=True,
+    )
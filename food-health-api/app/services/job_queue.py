@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+进程内异步任务队列
+
+耗时的 AI 流水线（识别 + 营养补充）不再占用 HTTP 连接：
+接口提交任务后立即返回任务 ID，由固定数量的 worker 协程执行，
+客户端通过轮询或 SSE 获取结果。
+
+- 队列有界，满时拒绝提交（调用方返回 503）
+- 已结束的任务保留一段时间供查询，之后自动清理
+- 统计排队深度、等待时间、执行时间
+- 失败原因只对外展示 JobError 的信息，其他异常记日志、对外返回通用提示
+"""
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+
+class QueueFullError(Exception):
+    """任务队列已满"""
+
+
+class JobError(Exception):
+    """可以直接展示给用户的任务失败原因"""
+
+
+@dataclass
+class Job:
+    """单个任务"""
+    id: str
+    runner: Callable[[], Awaitable[Any]] = field(repr=False)
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    # 每次状态变化时 set 并替换，供 SSE 等待
+    changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def _transition(self, status: str) -> None:
+        self.status = status
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == SUCCEEDED:
+            data["result"] = self.result
+        elif self.status == FAILED:
+            data["error"] = self.error
+        return data
+
+
+class JobQueue:
+    """
+    有界任务队列 + 固定大小 worker 池
+
+    Args:
+        name: 队列名（用于日志与指标）
+        workers: 并发 worker 数
+        max_queue: 最大排队任务数
+        result_ttl_seconds: 已结束任务保留时间
+    """
+
+    def __init__(
+        self,
+        name: str,
+        workers: int = 4,
+        max_queue: int = 100,
+        result_ttl_seconds: float = 600,
+        failure_message: str = "任务执行失败，请稍后重试",
+    ):
+        self.name = name
+        self.failure_message = failure_message
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.result_ttl_seconds = result_ttl_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._running = 0
+
+    @property
+    def started(self) -> bool:
+        return bool(self._worker_tasks) and not all(task.done() for task in self._worker_tasks)
+
+    def start(self) -> None:
+        """启动 worker（需在事件循环内调用，重复调用无副作用）"""
+        if self.started:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        # 上一个事件循环遗留的排队任务无法再执行
+        for job in self._jobs.values():
+            if not job.finished:
+                self._finish(job, error="服务重启，任务已取消")
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"{self.name}-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"🚀 任务队列 {self.name} 已启动: {self.workers} 个 worker，队列上限 {self.max_queue}")
+
+    async def stop(self) -> None:
+        """停止 worker，未完成的任务标记为失败"""
+        tasks, self._worker_tasks = self._worker_tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in self._jobs.values():
+            if not job.finished:
+                self._finish(job, error="服务关闭，任务已取消")
+
+    def submit(self, runner: Callable[[], Awaitable[Any]]) -> Job:
+        """
+        提交任务
+
+        Raises:
+            QueueFullError: 队列已满
+        """
+        self.start()
+        self._prune()
+        job = Job(id=uuid.uuid4().hex, runner=runner)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            metrics.incr(f"jobs.{self.name}.rejected")
+            raise QueueFullError(f"{self.name} 任务队列已满")
+        self._jobs[job.id] = job
+        metrics.incr(f"jobs.{self.name}.submitted")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def position(self, job: Job) -> int:
+        """排队位置（0 表示已开始执行或已结束）"""
+        if job.status != QUEUED:
+            return 0
+        queued = [j for j in self._jobs.values() if j.status == QUEUED]
+        queued.sort(key=lambda j: j.created_at)
+        return queued.index(job) + 1
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.finished:
+                    continue
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.started_at = time.time()
+        metrics.observe(f"jobs.{self.name}.wait_ms", (job.started_at - job.created_at) * 1000)
+        job._transition(RUNNING)
+        self._running += 1
+        try:
+            result = await job.runner()
+        except asyncio.CancelledError:
+            self._finish(job, error="任务已取消")
+            raise
+        except JobError as e:
+            logger.warning(f"⚠️ 任务执行失败 [{self.name}:{job.id[:8]}]: {e}")
+            self._finish(job, error=str(e))
+        except Exception as e:
+            # 内部异常细节只写日志，不通过查询接口 / SSE 暴露
+            logger.exception(f"❌ 任务执行失败 [{self.name}:{job.id[:8]}]: {type(e).__name__}: {e}")
+            self._finish(job, error=self.failure_message)
+        else:
+            self._finish(job, result=result)
+        finally:
+            self._running -= 1
+
+    def _finish(self, job: Job, result: Any = None, error: Optional[str] = None) -> None:
+        job.finished_at = time.time()
+        job.runner = None
+        if error is None:
+            job.result = result
+            job._transition(SUCCEEDED)
+            metrics.incr(f"jobs.{self.name}.succeeded")
+        else:
+            job.error = error
+            job._transition(FAILED)
+            metrics.incr(f"jobs.{self.name}.failed")
+        if job.started_at:
+            metrics.observe(f"jobs.{self.name}.run_ms", (job.finished_at - job.started_at) * 1000)
+
+    def _prune(self) -> None:
+        """清理过期的已结束任务"""
+        cutoff = time.time() - self.result_ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """队列状态（用于 /api/v1/status 监控）"""
+        return {
+            "workers": self.workers,
+            "started": self.started,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "running": self._running,
+            "tracked_jobs": len(self._jobs),
+            "wait_ms": metrics.summary(f"jobs.{self.name}.wait_ms"),
+            "run_ms": metrics.summary(f"jobs.{self.name}.run_ms"),
+        }
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+运行时指标
+进程内计数器与耗时分布（滚动窗口），通过 /api/v1/status 暴露
+"""
+import threading
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+# 每个耗时指标保留的最近样本数
+WINDOW_SIZE = 500
+
+
+class Metrics:
+    """进程内指标注册表"""
+
+    def __init__(self, window_size: int = WINDOW_SIZE):
+        self.window_size = window_size
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._timings: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """计数器累加"""
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        """记录一次耗时/数值样本"""
+        with self._lock:
+            samples = self._timings.get(name)
+            if samples is None:
+                samples = self._timings[name] = deque(maxlen=self.window_size)
+            samples.append(value)
+
+    def counter(self, name: str) -> float:
+        return self._counters.get(name, 0)
+
+    def samples(self, name: str) -> List[float]:
+        """滚动窗口内的样本副本"""
+        with self._lock:
+            return list(self._timings.get(name) or ())
+
+    def percentile(self, name: str, q: float) -> Optional[float]:
+        """滚动窗口内的分位数，样本为空时返回 None"""
+        with self._lock:
+            samples = sorted(self._timings.get(name) or ())
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(q * (len(samples) - 1)))))
+        return samples[index]
+
+    def summary(self, name: str) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._timings.get(name) or ())
+        if not samples:
+            return {"count": 0}
+
+        def pick(q: float) -> float:
+            return round(samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))], 2)
+
+        return {
+            "count": len(samples),
+            "avg": round(sum(samples) / len(samples), 2),
+            "p50": pick(0.5),
+            "p95": pick(0.95),
+            "max": round(samples[-1], 2),
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """全部指标快照"""
+        with self._lock:
+            counters = {k: (int(v) if float(v).is_integer() else round(v, 2)) for k, v in self._counters.items()}
+            names = list(self._timings.keys())
+        return {
+            "counters": dict(sorted(counters.items())),
+            "timings": {name: self.summary(name) for name in sorted(names)},
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+# 全局单例
+metrics = Metrics()
@@ -7,6 +7,8 @@ import httpx
 import logging
 from typing import Optional, List, Dict, Any
 
+from app.services.http_client import http_clients
+
 logger = logging.getLogger(__name__)
 
 # Open Food Facts API 配置
@@ -14,9 +16,6 @@ OFF_API_BASE = "https://world.openfoodfacts.org"
 OFF_SEARCH_URL = f"{OFF_API_BASE}/cgi/search.pl"
 OFF_PRODUCT_URL = f"{OFF_API_BASE}/api/v2/product"
 
-# 请求超时设置
-REQUEST_TIMEOUT = 10.0
-
 
 class OpenFoodFactsService:
     """Open Food Facts API 服务"""
@@ -47,14 +46,14 @@ class OpenFoodFactsService:
                 "fields": "code,product_name,product_name_zh,brands,nutriments,image_url,categories_tags",
             }
 
-            async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
-                response = await client.get(
-                    OFF_SEARCH_URL,
-                    params=params,
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                data = response.json()
+            client = http_clients.get("openfoodfacts")
+            response = await client.get(
+                OFF_SEARCH_URL,
+                params=params,
+                headers=self.headers
+            )
+            response.raise_for_status()
+            data = response.json()
 
             products = data.get("products", [])
             return [self._parse_product(p) for p in products if self._is_valid_product(p)]
@@ -82,10 +81,10 @@ class OpenFoodFactsService:
                 "fields": "code,product_name,product_name_zh,brands,nutriments,image_url,categories_tags"
             }
 
-            async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
-                response = await client.get(url, params=params, headers=self.headers)
-                response.raise_for_status()
-                data = response.json()
+            client = http_clients.get("openfoodfacts")
+            response = await client.get(url, params=params, headers=self.headers)
+            response.raise_for_status()
+            data = response.json()
 
             if data.get("status") == 1:
                 product = data.get("product", {})
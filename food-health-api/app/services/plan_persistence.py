@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+AI 食谱入库
+
+普通生成（/plans/generate）与流式生成（/plans/generate/stream）共用：
+AI 返回的食谱数据写入 diet_plan / diet_plan_day / diet_plan_meal，
+AI 不可用或入库失败时写入 Mock 示例食谱。
+"""
+import re
+import traceback
+from typing import Any, Dict, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.diet_plan import DietPlan, DietPlanDay, DietPlanMeal
+from app.services.tag_index import set_plan_tags, split_plan_tags
+
+# 健康目标 -> 基础标签
+GOAL_TAG_MAP = {
+    "lose_weight": "减脂",
+    "loss_weight": "减脂",
+    "keep_fit": "维持",
+    "maintain": "维持",
+    "gain_muscle": "增肌",
+    "减脂": "减脂",
+    "增肌": "增肌",
+    "保持健康": "维持",
+    "维持": "维持"
+}
+
+MOCK_MEALS = [
+    {"type": "breakfast", "name": "全麦面包+牛奶", "amount": "2片+1杯", "cal": 350},
+    {"type": "lunch", "name": "鸡胸肉蔬菜沙拉", "amount": "1份", "cal": 450},
+    {"type": "dinner", "name": "清蒸鲈鱼+杂粮饭", "amount": "100g+1碗", "cal": 400},
+    {"type": "snack", "name": "苹果", "amount": "1个", "cal": 80}
+]
+
+# 批量写入餐单时复制的字段
+MEAL_COLUMNS = ("meal_type", "sort_order", "food_name", "amount_desc", "calories", "alternatives")
+
+
+def parse_calories(raw_cal: Any) -> int:
+    """安全转换热量（AI 可能返回 "350kcal" 之类的字符串）"""
+    try:
+        if isinstance(raw_cal, str):
+            # 提取第一个数字序列
+            match = re.search(r'\d+', raw_cal)
+            return int(match.group()) if match else 0
+        return int(raw_cal)
+    except (ValueError, TypeError):
+        return 0
+
+
+def build_plan_tags(plan_data: Dict[str, Any], goal_key: str, goal_label: str, prefs: str) -> str:
+    """组合 AI 标签、目标标签与素食标签"""
+    # 确保 ai_tags 里面的每一项都是 string
+    ai_tags = [str(t) for t in plan_data.get("tags", [])]
+
+    mapped_goal_tag = GOAL_TAG_MAP.get(goal_key, goal_label)
+    base_tags = ["DeepSeek", "AI定制", mapped_goal_tag]
+
+    # 如果偏好含素，或标题含素，强制打上"素食"标签
+    if "素" in prefs or "素" in plan_data.get("name", ""):
+        base_tags.append("素食")
+
+    # 去重合并
+    return ",".join(list(set(base_tags + ai_tags)))
+
+
+def build_ai_plan(
+    plan_data: Dict[str, Any],
+    goal_key: str,
+    goal_label: str,
+    prefs: str,
+    user_profile: str,
+    user_id: Optional[int],
+) -> DietPlan:
+    """AI 食谱数据 -> DietPlan 对象树（天、餐通过 relationship 挂在计划下，尚未入库）"""
+    days = []
+    for day_info in plan_data.get("days", []):
+        meals = []
+        for idx, meal_info in enumerate(day_info.get("meals", [])):
+            meals.append(DietPlanMeal(
+                meal_type=meal_info.get("meal_type", "snack"),
+                sort_order=idx + 1,
+                # Truncate to match DB constraints
+                food_name=str(meal_info.get("food_name", "未命名食物"))[:100],
+                amount_desc=str(meal_info.get("amount_desc", ""))[:50],
+                calories=parse_calories(meal_info.get("calories", 0))
+            ))
+        days.append(DietPlanDay(
+            day_index=day_info.get("day_index"),
+            title=day_info.get("title", f"Day {day_info.get('day_index')}"),
+            # AI 可能未直接返回总热量，按餐累加
+            total_calories=sum(meal.calories for meal in meals),
+            meals=meals
+        ))
+
+    return DietPlan(
+        name=plan_data.get("name", f"AI定制：{goal_label}食谱"),
+        description=plan_data.get("description", "为您量身定制的7天健康饮食计划"),
+        cover_image="/static/ai_plan.png",
+        duration_days=7,
+        tags=build_plan_tags(plan_data, goal_key, goal_label, prefs),
+        source="ai_generated",
+        difficulty="medium",
+        target_user=f"{user_profile} | {goal_label}",
+        author_id=user_id if user_id else 0,  # 未登录时使用 0
+        days=days
+    )
+
+
+def build_mock_plan(goal_label: str, user_profile: str, user_id: Optional[int]) -> DietPlan:
+    """AI 不可用时的示例食谱（只生成第一天）"""
+    day1 = DietPlanDay(
+        day_index=1,
+        title="启动日 (示例)",
+        total_calories=1500,
+        meals=[
+            DietPlanMeal(
+                meal_type=m["type"],
+                sort_order=idx,
+                food_name=m["name"],
+                amount_desc=m["amount"],
+                calories=m["cal"]
+            )
+            for idx, m in enumerate(MOCK_MEALS)
+        ]
+    )
+    return DietPlan(
+        name=f"推荐食谱：{goal_label}计划 (Mock)",
+        description=f"AI 服务暂时繁忙，为您生成的推荐计划。目标：{goal_label}",
+        cover_image="/static/mock_plan.png",
+        duration_days=7,
+        tags="Mock,示例,推荐",
+        source="mock_data",
+        difficulty="easy",
+        target_user=user_profile,
+        author_id=user_id if user_id else 0,  # 未登录时使用 0
+        days=[day1]
+    )
+
+
+def add_plan(db: Session, plan: DietPlan) -> None:
+    """
+    在当前事务中写入食谱（不提交）
+
+    计划和天经 relationship 级联写入（子表需要回填的自增 ID）；
+    餐单不需要回填 ID，合并为一条 executemany 批量 INSERT
+    """
+    meals_by_day = [(day, list(day.meals)) for day in plan.days]
+    for day in plan.days:
+        day.meals = []
+    db.add(plan)
+    db.flush()
+
+    rows = [
+        {**{column: getattr(meal, column) for column in MEAL_COLUMNS}, "day_id": day.id}
+        for day, meals in meals_by_day
+        for meal in meals
+    ]
+    if rows:
+        db.execute(insert(DietPlanMeal), rows)
+    # 标签关联（按标签筛选列表时使用）
+    set_plan_tags(db, {plan.id: (plan.created_at, split_plan_tags(plan.tags))})
+    # 餐单不在 Session 中，访问时从数据库重新加载
+    for day in plan.days:
+        db.expire(day, ["meals"])
+
+
+def save_ai_plan(
+    db: Session,
+    plan_data: Dict[str, Any],
+    goal_key: str,
+    goal_label: str,
+    prefs: str,
+    user_profile: str,
+    user_id: Optional[int],
+) -> DietPlan:
+    """写入 AI 生成的食谱（单个事务），失败时抛出异常（调用方负责回滚）"""
+    new_plan = build_ai_plan(plan_data, goal_key, goal_label, prefs, user_profile, user_id)
+    add_plan(db, new_plan)
+    db.commit()
+    print(f"✅ AI 食谱已保存: Plan ID {new_plan.id}")
+    return new_plan
+
+
+def save_mock_plan(db: Session, goal_label: str, user_profile: str, user_id: Optional[int]) -> DietPlan:
+    """AI 不可用时写入示例食谱（单个事务）"""
+    print("⚠️ 启用 Mock 数据生成")
+    new_plan = build_mock_plan(goal_label, user_profile, user_id)
+    add_plan(db, new_plan)
+    db.commit()
+    return new_plan
+
+
+def persist_generated_plan(
+    db: Session,
+    plan_data: Optional[Dict[str, Any]],
+    goal_key: str,
+    goal_label: str,
+    prefs: str,
+    user_profile: str,
+    user_id: Optional[int],
+) -> DietPlan:
+    """保存 AI 食谱；plan_data 为空或入库失败时回退到 Mock 食谱"""
+    if plan_data:
+        try:
+            return save_ai_plan(db, plan_data, goal_key, goal_label, prefs, user_profile, user_id)
+        except Exception as e:
+            print(f"❌ 保存 AI 食谱失败，回退到 Mock: {e}")
+            traceback.print_exc()
+            db.rollback()
+
+    return save_mock_plan(db, goal_label, user_profile, user_id)
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+食谱夜间预生成
+
+用户早上打开食谱页时才调用 AI 生成，要等一两分钟。
+在凌晨低峰时段为活跃用户提前生成当天的食谱，白天直接命中今日缓存：
+- 候选：最近 N 天活跃（记录过饮食、生成过食谱或修改过资料），且
+  没有 AI 食谱、资料在上次生成后有修改、或上次生成已超过 N 天
+- 并发数、每晚生成上限、两次调用的最小间隔均可配置，避免挤占 DeepSeek 配额
+- 每个进程独立调度，多 worker 部署时只应在一个 worker 上开启
+"""
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import func
+
+from app.config import get_settings
+from app.database.connection import SessionLocal
+from app.models.diet_plan import DietPlan
+from app.models.user import User
+from app.models.user_meal import MealRecord
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 为指定用户生成并保存食谱，返回食谱 ID
+Generator = Callable[[int], Awaitable[Any]]
+
+
+def in_quiet_hours(now: datetime, start_hour: int, end_hour: int) -> bool:
+    """是否处于低峰时段 [start_hour, end_hour)，支持跨零点（如 23 -> 5）"""
+    if start_hour == end_hour:
+        return False
+    if start_hour < end_hour:
+        return start_hour <= now.hour < end_hour
+    return now.hour >= start_hour or now.hour < end_hour
+
+
+class PlanPregenerator:
+    """低峰时段批量预生成食谱"""
+
+    def __init__(self, session_factory=SessionLocal):
+        self._session_factory = session_factory
+        self._generate: Optional[Generator] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_run_date: Optional[date] = None
+        self._last_started = 0.0
+        self.running = False
+        self.last_run: Dict[str, Any] = {}
+
+    def start(self, generate: Generator) -> None:
+        """启动后台调度（未开启 PLAN_PREGEN_ENABLED 时不启动）"""
+        self._generate = generate
+        if not settings.plan_pregen_enabled:
+            return
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._loop())
+        logger.info(
+            f"🌙 食谱预生成已启用: {settings.plan_pregen_quiet_start_hour}:00-"
+            f"{settings.plan_pregen_quiet_end_hour}:00，每晚最多 {settings.plan_pregen_max_per_run} 份"
+        )
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _loop(self) -> None:
+        while True:
+            now = datetime.now()
+            if (
+                in_quiet_hours(now, settings.plan_pregen_quiet_start_hour, settings.plan_pregen_quiet_end_hour)
+                and self._last_run_date != now.date()
+            ):
+                self._last_run_date = now.date()
+                try:
+                    await self.run_once(now)
+                except Exception as e:
+                    logger.error(f"❌ 食谱预生成失败: {type(e).__name__}: {e}")
+            await asyncio.sleep(settings.plan_pregen_check_seconds)
+
+    def find_candidates(self, now: Optional[datetime] = None) -> List[int]:
+        """需要预生成食谱的活跃用户 ID（最久未更新的优先）"""
+        now = now or datetime.now()
+        active_since = now - timedelta(days=settings.plan_pregen_active_days)
+        stale_before = now - timedelta(days=settings.plan_pregen_stale_days)
+        today_start = datetime.combine(now.date(), datetime.min.time())
+
+        with self._session_factory() as db:
+            latest_plans = dict(
+                db.query(DietPlan.author_id, func.max(DietPlan.created_at))
+                .filter(DietPlan.source == "ai_generated", DietPlan.author_id > 0)
+                .group_by(DietPlan.author_id)
+                .all()
+            )
+            recent_meal_users = {
+                user_id for (user_id,) in
+                db.query(MealRecord.user_id).filter(MealRecord.meal_date >= active_since.date()).distinct()
+            }
+            users = db.query(User.id, User.updated_at).all()
+
+        candidates = []
+        for user_id, updated_at in users:
+            last_plan_at = latest_plans.get(user_id)
+            active = (
+                user_id in recent_meal_users
+                or (last_plan_at is not None and last_plan_at >= active_since)
+                or (updated_at is not None and updated_at >= active_since)
+            )
+            if not active:
+                continue
+            if last_plan_at is not None and last_plan_at >= today_start:
+                # 今天已经有食谱
+                continue
+            if (
+                last_plan_at is None
+                or last_plan_at < stale_before
+                or (updated_at is not None and updated_at > last_plan_at)
+            ):
+                candidates.append((last_plan_at or datetime.min, user_id))
+
+        candidates.sort()
+        return [user_id for _, user_id in candidates]
+
+    async def run_once(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """执行一轮预生成，返回本轮统计"""
+        if self._generate is None:
+            raise RuntimeError("未设置食谱生成函数")
+
+        started = time.perf_counter()
+        candidates = self.find_candidates(now)
+        budget = max(0, settings.plan_pregen_max_per_run)
+        selected = candidates[:budget]
+        result = {
+            "started_at": (now or datetime.now()).isoformat(timespec="seconds"),
+            "candidates": len(candidates),
+            "generated": 0,
+            "failed": 0,
+            "skipped_budget": len(candidates) - len(selected),
+        }
+        self.running = True
+        logger.info(f"🌙 开始预生成食谱: 候选 {len(candidates)} 人，本轮 {len(selected)} 人")
+
+        semaphore = asyncio.Semaphore(max(1, settings.plan_pregen_concurrency))
+        pace = asyncio.Lock()
+
+        async def generate_for(user_id: int) -> None:
+            async with semaphore:
+                # 速率预算：相邻两次调用至少间隔 min_interval 秒
+                async with pace:
+                    wait = self._last_started + settings.plan_pregen_min_interval_seconds - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    self._last_started = time.monotonic()
+                try:
+                    await self._generate(user_id)
+                    result["generated"] += 1
+                    metrics.incr("plan.pregen.generated")
+                except Exception as e:
+                    result["failed"] += 1
+                    metrics.incr("plan.pregen.failed")
+                    logger.warning(f"⚠️ 用户 {user_id} 食谱预生成失败: {type(e).__name__}: {e}")
+
+        try:
+            await asyncio.gather(*(generate_for(user_id) for user_id in selected))
+        finally:
+            self.running = False
+            result["duration_seconds"] = round(time.perf_counter() - started, 1)
+            self.last_run = result
+        logger.info(f"🌙 食谱预生成完成: {result}")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.plan_pregen_enabled,
+            "quiet_hours": f"{settings.plan_pregen_quiet_start_hour}-{settings.plan_pregen_quiet_end_hour}",
+            "running": self.running,
+            "last_run": self.last_run or None,
+        }
+
+
+# 全局单例
+plan_pregenerator = PlanPregenerator()
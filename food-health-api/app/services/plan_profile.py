@@ -2,7 +2,7 @@
 """
 食谱用户画像构建
 """
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 
 GOAL_LABELS = {
@@ -103,3 +103,61 @@ def build_plan_profile_text(
     parts.append(f"偏好：{prefs_label}")
 
     return "，".join(parts)
+
+
+# BMI 分档（中国成人标准）：上限 -> 档位
+BMI_BANDS = [(18.5, "underweight"), (24.0, "normal"), (28.0, "overweight")]
+# 年龄分档：上限 -> 档位
+AGE_BANDS = [(18, "teen"), (30, "18-29"), (45, "30-44"), (60, "45-59")]
+
+
+def _band(value: Optional[float], bands, last: str) -> Optional[str]:
+    if value is None:
+        return None
+    for upper, label in bands:
+        if value < upper:
+            return label
+    return last
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number > 0 else None
+
+
+def bucket_health_profile(health_profile: Optional[Dict[str, Any]]) -> Tuple[Optional[str], ...]:
+    """
+    健康档案分档：(BMI 档, 年龄段, 性别, 活动水平)
+
+    同一档内的用户对食谱的热量与结构要求基本一致，可共用同一份生成结果
+    """
+    profile = health_profile or {}
+    weight = _to_float(profile.get("weight"))
+    height = _to_float(profile.get("height"))
+    bmi = weight / (height / 100) ** 2 if weight and height else None
+
+    gender = profile.get("gender")
+    activity = profile.get("activity")
+    return (
+        _band(bmi, BMI_BANDS, "obese"),
+        _band(_to_float(profile.get("age")), AGE_BANDS, "60+"),
+        gender if gender in GENDER_LABELS else None,
+        activity if activity in ACTIVITY_LABELS else None,
+    )
+
+
+def build_plan_template_key(
+    health_goal: Optional[str],
+    dietary_preferences: Any,
+    disliked_tags: Optional[List[str]],
+    health_profile: Optional[Dict[str, Any]]
+) -> Tuple:
+    """食谱模板缓存 key：目标、偏好、不喜欢的标签与健康档案分档都一致时可复用生成结果"""
+    # 用中文标签：lose_weight / loss_weight 等同义目标生成的 prompt 相同
+    _, goal_label = normalize_goal(health_goal)
+    prefs = tuple(sorted(set(normalize_preferences(dietary_preferences).split("、"))))
+    disliked = tuple(sorted({str(tag).strip() for tag in disliked_tags or [] if str(tag).strip()}))
+    return (goal_label, prefs, disliked, bucket_health_profile(health_profile))
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+食谱流式输出的增量 JSON 解析
+
+DeepSeek 流式返回的是逐段到达的 JSON 文本：
+{"name": ..., "days": [{...第1天...}, {...第2天...}, ...]}
+
+每收到一段文本就继续扫描，"days" 数组中的某一天对象闭合时立即解析并返回，
+不必等整份 7 天食谱生成完毕。只跟踪括号层级与字符串状态，不构建完整语法树。
+"""
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PlanStreamParser:
+    """增量解析 {"days": [...]} 中已完成的每日对象"""
+
+    def __init__(self, array_key: str = "days"):
+        self.array_key = array_key
+        self.buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._in_array = False
+        self._item_start: Optional[int] = None
+        self.items_parsed = 0
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """追加一段文本，返回本次新完成的数组元素"""
+        self.buffer += text
+        completed = []
+        buffer = self.buffer
+        for i in range(self._pos, len(buffer)):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = buffer[self._string_start:i]
+                continue
+
+            if ch == '"':
+                if self._stack:
+                    self._in_string = True
+                    self._string_start = i + 1
+            elif ch == ":":
+                if self._stack == ["{"]:
+                    self._current_key = self._last_string
+            elif ch in "{[":
+                # 顶层对象之前的内容（如 ```json 标记）直接跳过
+                if not self._stack and ch != "{":
+                    continue
+                if ch == "[" and self._stack == ["{"] and self._current_key == self.array_key:
+                    self._in_array = True
+                elif ch == "{" and self._in_array and self._stack == ["{", "["]:
+                    self._item_start = i
+                self._stack.append(ch)
+            elif ch in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if ch == "}" and self._in_array and self._stack == ["{", "["] and self._item_start is not None:
+                    item = self._parse_item(buffer[self._item_start:i + 1])
+                    self._item_start = None
+                    if item is not None:
+                        completed.append(item)
+                elif ch == "]" and self._in_array and self._stack == ["{"]:
+                    self._in_array = False
+        self._pos = len(buffer)
+        return completed
+
+    def _parse_item(self, text: str) -> Optional[Dict[str, Any]]:
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError as e:
+            logger.warning(f"⚠️ 流式食谱单日解析失败: {e}")
+            return None
+        if not isinstance(item, dict):
+            return None
+        self.items_parsed += 1
+        return item
@@ -15,6 +15,15 @@ from app.schemas.premium_recipe import (
     PremiumRecipeUpdate,
     PremiumRecipeResponse,
 )
+from app.services.recipe_catalog import recipe_catalog, recipe_facets
+from app.services.recipe_counters import recipe_counters
+from app.services.tag_index import (
+    delete_recipe_tags,
+    find_tag_id,
+    parse_recipe_tags,
+    recipes_with_tag,
+    set_recipe_tags,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -54,8 +63,11 @@ class PremiumRecipeService:
             query = query.filter(PremiumRecipe.category == category)
         
         if tag:
-            # JSON 字符串中包含标签
-            query = query.filter(PremiumRecipe.tags.like(f'%"{tag}"%'))
+            # 走标签关联表（tag_id, recipe_id 索引），不扫描 JSON 文本
+            tag_id = find_tag_id(self.db, tag)
+            if tag_id is None:
+                return [], 0
+            query = query.filter(PremiumRecipe.id.in_(recipes_with_tag(tag_id)))
         
         if is_featured is not None:
             query = query.filter(PremiumRecipe.is_featured == is_featured)
@@ -111,8 +123,11 @@ class PremiumRecipeService:
         
         recipe = PremiumRecipe(**data)
         self.db.add(recipe)
+        self.db.flush()
+        set_recipe_tags(self.db, {recipe.id: parse_recipe_tags(recipe.tags)})
         self.db.commit()
         self.db.refresh(recipe)
+        recipe_catalog.apply(None, recipe_facets(recipe))
         
         logger.info(f"✅ 创建精品食谱: {recipe.name}")
         return recipe
@@ -123,6 +138,7 @@ class PremiumRecipeService:
         if not recipe:
             return None
         
+        before = recipe_facets(recipe)
         # 只更新非 None 的字段
         update_data = recipe_data.model_dump(exclude_unset=True)
         
@@ -142,9 +158,12 @@ class PremiumRecipeService:
         
         for key, value in update_data.items():
             setattr(recipe, key, value)
+        if "tags" in update_data:
+            set_recipe_tags(self.db, {recipe.id: parse_recipe_tags(recipe.tags)})
         
         self.db.commit()
         self.db.refresh(recipe)
+        recipe_catalog.apply(before, recipe_facets(recipe))
         
         logger.info(f"✅ 更新精品食谱: {recipe.name}")
         return recipe
@@ -155,68 +174,30 @@ class PremiumRecipeService:
         if not recipe:
             return False
         
+        before = recipe_facets(recipe)
+        delete_recipe_tags(self.db, recipe.id)
         self.db.delete(recipe)
         self.db.commit()
+        recipe_catalog.apply(before, None)
         
         logger.info(f"🗑️ 删除精品食谱: {recipe.name}")
         return True
     
     def increment_view_count(self, recipe_id: int) -> None:
-        """增加浏览数"""
-        self.db.query(PremiumRecipe).filter(
-            PremiumRecipe.id == recipe_id
-        ).update(
-            {"view_count": PremiumRecipe.view_count + 1}
-        )
-        self.db.commit()
+        """增加浏览数（写缓冲，批量写回）"""
+        recipe_counters.add(recipe_id, "view_count")
     
     def toggle_favorite(self, recipe_id: int, increment: bool = True) -> None:
-        """切换收藏状态（增加/减少收藏数）"""
-        if increment:
-            self.db.query(PremiumRecipe).filter(
-                PremiumRecipe.id == recipe_id
-            ).update(
-                {"favorite_count": PremiumRecipe.favorite_count + 1}
-            )
-        else:
-            self.db.query(PremiumRecipe).filter(
-                PremiumRecipe.id == recipe_id,
-                PremiumRecipe.favorite_count > 0
-            ).update(
-                {"favorite_count": PremiumRecipe.favorite_count - 1}
-            )
-        self.db.commit()
+        """切换收藏状态（增加/减少收藏数，写缓冲，批量写回）"""
+        recipe_counters.add(recipe_id, "favorite_count", 1 if increment else -1)
     
     def get_categories(self) -> List[str]:
-        """获取所有分类"""
-        result = (
-            self.db.query(PremiumRecipe.category)
-            .filter(PremiumRecipe.is_active == True)
-            .filter(PremiumRecipe.category.isnot(None))
-            .distinct()
-            .all()
-        )
-        return [r[0] for r in result if r[0]]
+        """获取所有分类（目录缓存）"""
+        return recipe_catalog.view(self.db, "categories").names
     
     def get_tags(self) -> List[str]:
-        """获取所有标签（从 JSON 中提取）"""
-        recipes = (
-            self.db.query(PremiumRecipe.tags)
-            .filter(PremiumRecipe.is_active == True)
-            .filter(PremiumRecipe.tags.isnot(None))
-            .all()
-        )
-        
-        all_tags = set()
-        for (tags_json,) in recipes:
-            if tags_json:
-                try:
-                    tags = json.loads(tags_json)
-                    all_tags.update(tags)
-                except json.JSONDecodeError:
-                    pass
-        
-        return sorted(list(all_tags))
+        """获取上架食谱使用的所有标签（目录缓存）"""
+        return recipe_catalog.view(self.db, "tags").names
     
     def get_featured(self, limit: int = 6) -> List[PremiumRecipe]:
         """获取精选食谱"""
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+精品食谱标签 / 分类目录
+
+进程内物化的「标签 -> 上架食谱数」「分类 -> 上架食谱数」：
+- 首次访问或过期后从数据库重建：标签走 premium_recipe_tag 关联表，
+  关联表尚未回填（未执行 scripts/migrate_tags.py）时直接解析 premium_recipes.tags
+- 标签按忽略大小写的名称计数（MySQL 默认排序规则下 "AI" 与 "ai" 是同一标签），
+  重建与增量更新使用同一规则，显示名取该组中的一个原始写法
+- PremiumRecipeService 创建、修改、删除食谱提交后按前后差异增量更新
+- 每个目录附带内容哈希 ETag，客户端带 If-None-Match 时可直接返回 304
+
+其他进程（多 worker、脚本）写入的变更在 TTL 过期重建后可见。
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.food import PremiumRecipe
+from app.models.tag import PremiumRecipeTag, Tag
+from app.services.tag_index import parse_recipe_tags
+
+settings = get_settings()
+
+
+class RecipeFacets(NamedTuple):
+    """影响目录的食谱属性"""
+    is_active: bool
+    category: Optional[str]
+    tags: List[str]
+
+
+def _fold(name: str) -> str:
+    return name.casefold()
+
+
+def _folded_tags(tags: Iterable[str]) -> Dict[str, str]:
+    """同一食谱的标签按忽略大小写去重：折叠名 -> 原始写法"""
+    result: Dict[str, str] = {}
+    for tag in tags:
+        result.setdefault(_fold(tag), tag)
+    return result
+
+
+def recipe_facets(recipe: Optional[PremiumRecipe]) -> Optional[RecipeFacets]:
+    if recipe is None:
+        return None
+    return RecipeFacets(bool(recipe.is_active), recipe.category or None, parse_recipe_tags(recipe.tags))
+
+
+@dataclass(frozen=True)
+class CatalogView:
+    """某一目录的只读快照"""
+    etag: str
+    names: List[str]
+    counts: Dict[str, int]
+
+
+class RecipeCatalog:
+    """精品食谱标签 / 分类目录（线程安全）"""
+
+    def __init__(self, ttl_seconds: float = 300):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._counters: Optional[Dict[str, Counter]] = None
+        self._tag_labels: Dict[str, str] = {}  # 折叠后的标签名 -> 显示名
+        self._views: Dict[str, CatalogView] = {}
+        self._loaded_at = 0.0
+
+        self.rebuilds = 0
+        self.incremental_updates = 0
+
+    def view(self, db: Session, kind: str) -> CatalogView:
+        """读取目录；未加载或已过期时从数据库重建"""
+        with self._lock:
+            if self._counters is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+                self._rebuild(db)
+            view = self._views.get(kind)
+            if view is None:
+                labels = self._tag_labels if kind == "tags" else {}
+                view = self._views[kind] = _build_view(self._counters[kind], labels)
+            return view
+
+    def apply(self, before: Optional[RecipeFacets], after: Optional[RecipeFacets]) -> None:
+        """食谱写入提交后调用：before / after 为修改前后属性，新增或删除时对应一侧为 None"""
+        with self._lock:
+            if self._counters is None:
+                # 尚未加载，下次读取时整体构建
+                return
+            for facets, delta in ((before, -1), (after, 1)):
+                if facets is None or not facets.is_active:
+                    continue
+                for key, tag in _folded_tags(facets.tags).items():
+                    self._counters["tags"][key] += delta
+                    self._tag_labels.setdefault(key, tag)
+                if facets.category:
+                    self._counters["categories"][facets.category] += delta
+            for counter in self._counters.values():
+                for name in [name for name, count in counter.items() if count <= 0]:
+                    del counter[name]
+                    self._tag_labels.pop(name, None)
+            self._views.clear()
+            self.incremental_updates += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._counters = None
+            self._views.clear()
+
+    def _rebuild(self, db: Session) -> None:
+        tags, self._tag_labels = _count_tags(self._recipe_tags(db))
+        category_rows = (
+            db.query(PremiumRecipe.category, func.count(PremiumRecipe.id))
+            .filter(PremiumRecipe.is_active == True)
+            .filter(PremiumRecipe.category.isnot(None))
+            .group_by(PremiumRecipe.category)
+            .all()
+        )
+        self._counters = {
+            "tags": tags,
+            "categories": Counter({name: count for name, count in category_rows if name}),
+        }
+        self._views.clear()
+        self._loaded_at = time.monotonic()
+        self.rebuilds += 1
+
+    @staticmethod
+    def _recipe_tags(db: Session) -> Iterable[Tuple[int, str]]:
+        """上架食谱的 (食谱 ID, 标签名)"""
+        rows = (
+            db.query(PremiumRecipeTag.recipe_id, Tag.name)
+            .join(Tag, Tag.id == PremiumRecipeTag.tag_id)
+            .join(PremiumRecipe, PremiumRecipe.id == PremiumRecipeTag.recipe_id)
+            .filter(PremiumRecipe.is_active == True)
+            .all()
+        )
+        if rows or db.query(PremiumRecipeTag.recipe_id).first() is not None:
+            return rows
+        # 关联表为空：尚未执行 scripts/migrate_tags.py，按 tags 列统计
+        recipes = (
+            db.query(PremiumRecipe.id, PremiumRecipe.tags)
+            .filter(PremiumRecipe.is_active == True)
+            .filter(PremiumRecipe.tags.isnot(None))
+        )
+        return [(recipe_id, tag) for recipe_id, raw in recipes for tag in parse_recipe_tags(raw)]
+
+    def stats(self) -> Dict[str, Any]:
+        counters = self._counters or {}
+        return {
+            "loaded": self._counters is not None,
+            "tags": len(counters.get("tags", ())),
+            "categories": len(counters.get("categories", ())),
+            "rebuilds": self.rebuilds,
+            "incremental_updates": self.incremental_updates,
+        }
+
+
+def _count_tags(recipe_tags: Iterable[Tuple[int, str]]) -> Tuple[Counter, Dict[str, str]]:
+    """按食谱去重后计数：(折叠名 -> 食谱数, 折叠名 -> 显示名)"""
+    by_recipe: Dict[int, List[str]] = {}
+    for recipe_id, tag in recipe_tags:
+        by_recipe.setdefault(recipe_id, []).append(tag)
+    counts: Counter = Counter()
+    labels: Dict[str, str] = {}
+    for recipe_id in sorted(by_recipe):
+        for key, tag in _folded_tags(by_recipe[recipe_id]).items():
+            counts[key] += 1
+            labels.setdefault(key, tag)
+    return counts, labels
+
+
+def _build_view(counter: Counter, labels: Dict[str, str]) -> CatalogView:
+    counts = {labels.get(key, key): count for key, count in counter.items()}
+    names = sorted(counts)
+    counts = {name: counts[name] for name in names}
+    digest = hashlib.sha1(json.dumps(counts, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+    return CatalogView(etag=f'"{digest}"', names=names, counts=counts)
+
+
+# 全局单例
+recipe_catalog = RecipeCatalog(ttl_seconds=settings.recipe_catalog_ttl_seconds)
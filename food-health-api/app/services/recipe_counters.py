@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+精品食谱浏览数 / 收藏数写缓冲
+
+以前每次打开食谱详情都会 UPDATE view_count + COMMIT，热门食谱在 MySQL 上
+反复争抢同一行的行锁。这里改为写回（write-behind）：
+
+- 请求内只在内存中累加每个食谱的增量，不访问数据库
+- 按间隔（RECIPE_COUNTER_FLUSH_SECONDS）或累计增量达到阈值时，
+  用一条批量 UPDATE（executemany）+ 一次 COMMIT 写回
+- 写回失败时增量合并回缓冲，下次重试；服务关闭时再写回一次，失败有限次重试
+- 写回只在后台任务中进行，后台任务启动前只缓冲，不在请求内访问数据库
+
+计数是冗余展示字段，进程异常退出时最多丢失一个刷新周期内的增量；
+多 worker 各自缓冲、各自累加写回，互不覆盖。
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import bindparam, case, update
+
+from app.config import get_settings
+from app.database.connection import SessionLocal
+from app.models.food import PremiumRecipe
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+COUNTER_FIELDS = ("view_count", "favorite_count")
+
+# 关闭时最终写回的重试次数与间隔（秒，按次数递增）
+SHUTDOWN_FLUSH_ATTEMPTS = 3
+SHUTDOWN_RETRY_SECONDS = 0.5
+
+_recipes = PremiumRecipe.__table__
+_favorite_after = _recipes.c.favorite_count + bindparam("d_favorite_count")
+
+# 按主键批量累加；收藏数与原逻辑一致不减到 0 以下
+_FLUSH_STATEMENT = (
+    update(_recipes)
+    .where(_recipes.c.id == bindparam("recipe_id"))
+    .values(
+        view_count=_recipes.c.view_count + bindparam("d_view_count"),
+        favorite_count=case((_favorite_after < 0, 0), else_=_favorite_after),
+    )
+)
+
+
+class RecipeCounterBuffer:
+    """按食谱累加计数增量，定期批量写回（线程安全）"""
+
+    def __init__(self, session_factory=SessionLocal, flush_seconds: float = 5, flush_threshold: int = 1000):
+        self._session_factory = session_factory
+        self.flush_seconds = flush_seconds
+        self.flush_threshold = flush_threshold
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[int, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+        self._pending_total = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.failures = 0
+        self.last_flush_ms = 0.0
+
+    def add(self, recipe_id: int, field: str, delta: int = 1) -> None:
+        """累加一次增量；达到阈值时唤醒后台写回（未启动时继续缓冲，等 start() 后写回）"""
+        if field not in COUNTER_FIELDS:
+            raise ValueError(f"不支持的计数字段: {field}")
+        with self._lock:
+            self._pending[recipe_id][field] += delta
+            self._pending_total += abs(delta)
+            reached = self._pending_total >= self.flush_threshold
+        if reached and self._wakeup is not None:
+            self._wakeup.set()
+
+    def pending(self, recipe_id: int) -> Dict[str, int]:
+        """尚未写回的增量，详情页等需要即时计数的地方叠加到数据库值上"""
+        with self._lock:
+            deltas = self._pending.get(recipe_id)
+            return dict(deltas) if deltas else dict.fromkeys(COUNTER_FIELDS, 0)
+
+    def flush(self) -> int:
+        """把当前缓冲写回数据库，返回更新的食谱数"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+                self._pending_total = 0
+
+            params: List[Dict[str, int]] = [
+                {"recipe_id": recipe_id, **{f"d_{field}": deltas[field] for field in COUNTER_FIELDS}}
+                for recipe_id, deltas in sorted(batch.items())  # 固定加锁顺序，避免多 worker 死锁
+                if any(deltas.values())
+            ]
+            if not params:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                with self._session_factory() as db:
+                    db.execute(_FLUSH_STATEMENT, params)
+                    db.commit()
+            except Exception as e:
+                self._merge_back(batch)
+                self.failures += 1
+                metrics.incr("recipe_counters.flush_failed")
+                logger.warning(f"⚠️ 食谱计数写回失败，{len(params)} 条增量留待下次: {type(e).__name__}: {e}")
+                return 0
+
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.rows_flushed += len(params)
+            metrics.incr("recipe_counters.flushes")
+            metrics.observe("recipe_counters.flush_ms", self.last_flush_ms)
+            return len(params)
+
+    def _merge_back(self, batch: Dict[int, Dict[str, int]]) -> None:
+        with self._lock:
+            for recipe_id, deltas in batch.items():
+                for field, delta in deltas.items():
+                    self._pending[recipe_id][field] += delta
+                    self._pending_total += abs(delta)
+
+    # ------ 后台写回 ------
+
+    def start(self) -> None:
+        """启动后台定时写回"""
+        if self._loop_task is not None and not self._loop_task.done():
+            return
+        self._wakeup = asyncio.Event()
+        with self._lock:
+            if self._pending_total >= self.flush_threshold:
+                # 启动前已积累到阈值的增量立即写回
+                self._wakeup.set()
+        self._loop_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """停止后台任务并写回剩余增量（失败时有限次重试）"""
+        task, self._loop_task = self._loop_task, None
+        self._wakeup = None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        for attempt in range(1, SHUTDOWN_FLUSH_ATTEMPTS + 1):
+            await asyncio.to_thread(self.flush)
+            with self._lock:
+                remaining = len(self._pending)
+            if not remaining:
+                return
+            if attempt < SHUTDOWN_FLUSH_ATTEMPTS:
+                await asyncio.sleep(SHUTDOWN_RETRY_SECONDS * attempt)
+        logger.error(
+            f"❌ 关闭前食谱计数写回重试 {SHUTDOWN_FLUSH_ATTEMPTS} 次仍失败，丢弃 {remaining} 个食谱的增量"
+        )
+
+    async def _flush_loop(self) -> None:
+        wakeup = self._wakeup
+        while True:
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
+            await asyncio.to_thread(self.flush)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending_recipes = len(self._pending)
+            pending_total = self._pending_total
+        return {
+            "pending_recipes": pending_recipes,
+            "pending_increments": pending_total,
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+            "failures": self.failures,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
+
+
+# 全局单例
+recipe_counters = RecipeCounterBuffer(
+    flush_seconds=settings.recipe_counter_flush_seconds,
+    flush_threshold=settings.recipe_counter_flush_threshold,
+)
@@ -8,9 +8,8 @@ import re
 import logging
 from typing import List, Dict, Any, Optional
 
-import httpx
-
 from app.config import get_settings
+from app.services.http_client import http_clients
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -122,22 +121,22 @@ class RecipeGenerator:
         logger.info(f"调用豆包文本API: {api_url}, 模型: {self.model}")
 
         try:
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                response = await client.post(api_url, headers=headers, json=payload)
-
-                if response.status_code != 200:
-                    logger.error(f"豆包API错误: {response.status_code} - {response.text[:500]}")
-                    return None
-
-                result = response.json()
-                choices = result.get("choices", [])
-                if not choices:
-                    logger.warning("豆包返回的 choices 为空")
-                    return None
-
-                text = choices[0].get("message", {}).get("content", "")
-                logger.info(f"豆包返回文本长度: {len(text)}")
-                return text
+            client = http_clients.get("recipe")
+            response = await client.post(api_url, headers=headers, json=payload)
+
+            if response.status_code != 200:
+                logger.error(f"豆包API错误: {response.status_code} - {response.text[:500]}")
+                return None
+
+            result = response.json()
+            choices = result.get("choices", [])
+            if not choices:
+                logger.warning("豆包返回的 choices 为空")
+                return None
+
+            text = choices[0].get("message", {}).get("content", "")
+            logger.info(f"豆包返回文本长度: {len(text)}")
+            return text
 
         except Exception as e:
             logger.error(f"调用豆包API失败: {type(e).__name__}: {e}")
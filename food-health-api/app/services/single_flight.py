@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+请求合并（single-flight）
+
+热门菜品被大量用户同时识别时，每个请求都会各自调用一次 AI。
+相同 key 的并发调用只执行一次，其余调用方等待同一个结果：
+- 调用结果 / 异常由所有等待者共享
+- 某个调用方被取消不影响其他等待者（底层任务独立运行）
+- 调用结束即释放，不缓存结果
+"""
+import asyncio
+import logging
+import re
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 每个合并器最多统计的 key 数，超出时淘汰合并次数最少的一半
+MAX_TRACKED_KEYS = 200
+
+
+def normalize_key(text: str) -> str:
+    """规范化菜名等文本 key：去除空白与常见标点，统一小写"""
+    return re.sub(r"[\s·,，.。、()（）]+", "", text or "").lower()
+
+
+class SingleFlight:
+    """按 key 合并并发的异步调用"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self._coalesced_by_key: Dict[Hashable, int] = {}
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """执行 func，相同 key 已有调用在进行时等待其结果"""
+        task = self._flights.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._flights[key] = task
+            task.add_done_callback(lambda _t, k=key: self._flights.pop(k, None))
+        else:
+            self.coalesced += 1
+            self._coalesced_by_key[key] = self._coalesced_by_key.get(key, 0) + 1
+            self._trim()
+            logger.info(f"🔗 合并请求 [{self.name}] {key}（等待中的调用方 {self._coalesced_by_key[key]} 个）")
+        # shield：调用方被取消时不取消共享任务
+        return await asyncio.shield(task)
+
+    async def wait(self, key: Hashable) -> bool:
+        """等待 key 上进行中的调用结束（不发起新调用，忽略其结果与异常）；没有进行中的调用时返回 False"""
+        task = self._flights.get(key)
+        if task is None:
+            return False
+        await asyncio.wait([task])
+        return True
+
+    def _trim(self) -> None:
+        if len(self._coalesced_by_key) <= MAX_TRACKED_KEYS:
+            return
+        keep = sorted(self._coalesced_by_key.items(), key=lambda item: item[1], reverse=True)
+        self._coalesced_by_key = dict(keep[: MAX_TRACKED_KEYS // 2])
+
+    def stats(self, top: int = 10) -> Dict[str, Any]:
+        top_keys = sorted(self._coalesced_by_key.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {
+            "in_flight": len(self._flights),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesced_by_key": {str(key): count for key, count in top_keys},
+        }
+
+
+class SingleFlightRegistry:
+    """按用途管理请求合并器"""
+
+    def __init__(self):
+        self._groups: Dict[str, SingleFlight] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> SingleFlight:
+        group = self._groups.get(name)
+        if group is not None:
+            return group
+        with self._lock:
+            return self._groups.setdefault(name, SingleFlight(name))
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: group.stats() for name, group in sorted(self._groups.items())}
+
+
+# 全局单例
+single_flights = SingleFlightRegistry()
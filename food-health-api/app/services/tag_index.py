@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+标签索引服务
+
+维护标签字典与关联表（diet_plan_tag / premium_recipe_tag）：
+- 写入食谱计划、精品食谱时同步关联
+- 按标签筛选时走关联表，替代对 tags 文本列的 LIKE 扫描
+- backfill_tags 从已有的 tags 文本列回填（scripts/migrate_tags.py）
+"""
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.diet_plan import DietPlan
+from app.models.food import PremiumRecipe
+from app.models.tag import DietPlanTag, PremiumRecipeTag, Tag
+
+logger = logging.getLogger(__name__)
+
+TAG_NAME_MAX_LENGTH = 50
+
+
+def _normalize(names: Iterable) -> List[str]:
+    """去空白、去重（保持顺序），截断到列长度"""
+    result = []
+    for name in names:
+        name = str(name).strip()[:TAG_NAME_MAX_LENGTH]
+        if name and name not in result:
+            result.append(name)
+    return result
+
+
+def split_plan_tags(tags: Optional[str]) -> List[str]:
+    """食谱计划的 tags：逗号分隔"""
+    return _normalize(tags.split(",")) if tags else []
+
+
+def parse_recipe_tags(tags: Optional[str]) -> List[str]:
+    """精品食谱的 tags：JSON 数组"""
+    if not tags:
+        return []
+    try:
+        values = json.loads(tags)
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return _normalize(values) if isinstance(values, list) else []
+
+
+def resolve_tag_ids(db: Session, names: List[str]) -> Dict[str, int]:
+    """标签名 -> ID，不存在的标签自动创建（不开启额外事务）"""
+    if not names:
+        return {}
+    ids = _query_tag_ids(db, names)
+    missing = [name for name in names if name not in ids]
+    if missing:
+        # 并发请求可能同时创建同名标签，忽略唯一键冲突后重新查询
+        prefix = "OR IGNORE" if db.get_bind().dialect.name == "sqlite" else "IGNORE"
+        db.execute(insert(Tag).prefix_with(prefix), [{"name": name} for name in missing])
+        ids.update(_query_tag_ids(db, missing))
+    return ids
+
+
+def _query_tag_ids(db: Session, names: List[str]) -> Dict[str, int]:
+    rows = db.query(Tag.id, Tag.name).filter(Tag.name.in_(names)).all()
+    ids = {name: tag_id for tag_id, name in rows}
+    # MySQL 默认排序规则不区分大小写，"AI" 与 "ai" 对应同一标签
+    folded = {name.lower(): tag_id for tag_id, name in rows}
+    return {name: ids.get(name, folded.get(name.lower())) for name in names if name in ids or name.lower() in folded}
+
+
+def find_tag_id(db: Session, name: str) -> Optional[int]:
+    """按名称查找标签，不存在时返回 None"""
+    name = name.strip()
+    if not name:
+        return None
+    return db.query(Tag.id).filter(Tag.name == name).scalar()
+
+
+def set_plan_tags(db: Session, plans: Dict[int, Tuple[Optional[datetime], List[str]]]) -> None:
+    """覆盖写入食谱计划的标签关联（不提交），plans: plan_id -> (created_at, 标签)"""
+    _replace_links(
+        db, DietPlanTag, DietPlanTag.plan_id, "plan_id",
+        {plan_id: names for plan_id, (_, names) in plans.items()},
+        {plan_id: {"plan_created_at": created_at} for plan_id, (created_at, _) in plans.items()},
+    )
+
+
+def set_recipe_tags(db: Session, recipe_ids_to_tags: Dict[int, List[str]]) -> None:
+    """覆盖写入精品食谱的标签关联（不提交）"""
+    _replace_links(db, PremiumRecipeTag, PremiumRecipeTag.recipe_id, "recipe_id", recipe_ids_to_tags)
+
+
+def delete_recipe_tags(db: Session, recipe_id: int) -> None:
+    """删除精品食谱前清理关联（SQLite 默认不执行外键级联）"""
+    db.execute(delete(PremiumRecipeTag).where(PremiumRecipeTag.recipe_id == recipe_id))
+
+
+def _replace_links(
+    db: Session,
+    model,
+    owner_column,
+    owner_key: str,
+    owners: Dict[int, List[str]],
+    extra: Optional[Dict[int, Dict[str, Any]]] = None,
+) -> None:
+    if not owners:
+        return
+    tag_ids = resolve_tag_ids(db, _normalize(name for names in owners.values() for name in names))
+    db.execute(delete(model).where(owner_column.in_(list(owners))))
+    # 大小写不同的标签可能映射到同一 tag_id，按 (主体, 标签) 去重
+    links = dict.fromkeys(
+        (owner_id, tag_ids[name])
+        for owner_id, names in owners.items()
+        for name in _normalize(names)
+    )
+    if links:
+        db.execute(insert(model), [
+            {owner_key: owner_id, "tag_id": tag_id, **(extra or {}).get(owner_id, {})}
+            for owner_id, tag_id in links
+        ])
+
+
+def recipes_with_tag(tag_id: int):
+    """带指定标签的精品食谱 ID 子查询"""
+    return select(PremiumRecipeTag.recipe_id).where(PremiumRecipeTag.tag_id == tag_id)
+
+
+def backfill_tags(db: Session, batch_size: int = 1000) -> Dict[str, int]:
+    """
+    从 tags 文本列回填关联表（可重复执行，按批提交）
+
+    Returns:
+        {"plans": 处理的食谱计划数, "recipes": 处理的精品食谱数, "tags": 标签总数}
+    """
+    counts = {
+        "plans": _backfill(
+            db, "plans", batch_size,
+            db.query(DietPlan.id, DietPlan.created_at, DietPlan.tags), DietPlan.id,
+            lambda rows: set_plan_tags(db, {row.id: (row.created_at, split_plan_tags(row.tags)) for row in rows}),
+        ),
+        "recipes": _backfill(
+            db, "recipes", batch_size,
+            db.query(PremiumRecipe.id, PremiumRecipe.tags), PremiumRecipe.id,
+            lambda rows: set_recipe_tags(db, {row.id: parse_recipe_tags(row.tags) for row in rows}),
+        ),
+    }
+    counts["tags"] = db.query(Tag).count()
+    return counts
+
+
+def _backfill(db: Session, key: str, batch_size: int, query, id_column, apply) -> int:
+    """按主键分批处理，每批提交一次"""
+    processed = 0
+    last_id = 0
+    while True:
+        rows = query.filter(id_column > last_id).order_by(id_column).limit(batch_size).all()
+        if not rows:
+            return processed
+        apply(rows)
+        db.commit()
+        processed += len(rows)
+        last_id = rows[-1].id
+        logger.info(f"🏷️ 已回填 {key}: {processed}")
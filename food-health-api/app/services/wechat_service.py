@@ -3,13 +3,17 @@
 微信小程序服务
 处理登录凭证校验 (code2Session) 和内容安全检测
 """
-import httpx
 import logging
 from typing import Optional, Dict, Any, Tuple
 from app.config import get_settings
+from app.services.credential_store import credential_store
+from app.services.http_client import http_clients
 
 logger = logging.getLogger(__name__)
 
+# access_token 无效 / 过期的错误码
+INVALID_TOKEN_ERRCODES = {40001, 40014, 42001}
+
 class WeChatService:
     def __init__(self):
         self.settings = get_settings()
@@ -19,6 +23,7 @@ class WeChatService:
         
         if not self.app_id or not self.app_secret:
             logger.warning("⚠️ 微信 AppID 或 Secret 未配置，微信相关功能将不可用")
+        credential_store.register("wechat", self._fetch_access_token)
 
     async def code_to_session(self, code: str) -> Optional[Dict[str, Any]]:
         """
@@ -37,15 +42,15 @@ class WeChatService:
         }
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params, timeout=10.0)
-                data = response.json()
+            client = http_clients.get("wechat")
+            response = await client.get(url, params=params, timeout=10.0)
+            data = response.json()
                 
-                if data.get("errcode", 0) != 0:
-                    logger.error(f"微信登录失败: {data}")
-                    return None
+            if data.get("errcode", 0) != 0:
+                logger.error(f"微信登录失败: {data}")
+                return None
                 
-                return data
+            return data
         except Exception as e:
             logger.error(f"微信 API 请求异常: {e}")
             return None
@@ -53,12 +58,19 @@ class WeChatService:
     async def get_access_token(self) -> Optional[str]:
         """
         获取接口调用凭证 access_token (client_credential)
-        注意：生产环境应缓存 token (有效期 2小时)
-        这里简化为每次请求（实际项目中请务必添加 Redis 缓存）
+        有效期 2 小时，由 credential_store 缓存（多 worker 共享）并在过期前刷新
         """
         if not self.app_id or not self.app_secret:
             return None
-            
+        
+        try:
+            return await credential_store.get("wechat")
+        except Exception as e:
+            logger.error(f"AccessToken 请求异常: {e}")
+            return None
+
+    async def _fetch_access_token(self) -> Tuple[str, float]:
+        """向微信申请新的 access_token，返回 (access_token, expires_in)"""
         url = f"{self.base_url}/cgi-bin/token"
         params = {
             "grant_type": "client_credential",
@@ -66,21 +78,16 @@ class WeChatService:
             "secret": self.app_secret
         }
         
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params, timeout=5.0)
-                data = response.json()
+        client = http_clients.get("wechat")
+        response = await client.get(url, params=params, timeout=5.0)
+        data = response.json()
+            
+        if data.get("errcode", 0) != 0:
+            raise ValueError(f"获取 AccessToken 失败: {data}")
                 
-                if data.get("errcode", 0) != 0:
-                    logger.error(f"获取 AccessToken 失败: {data}")
-                    return None
-                    
-                return data.get("access_token")
-        except Exception as e:
-            logger.error(f"AccessToken 请求异常: {e}")
-            return None
+        return data["access_token"], data.get("expires_in", 7200)
 
-    async def msg_sec_check(self, content: str, openid: str) -> bool:
+    async def msg_sec_check(self, content: str, openid: str, retry_on_invalid_token: bool = True) -> bool:
         """
         文本内容安全识别 (msg_sec_check)
         https://developers.weixin.qq.com/miniprogram/dev/OpenApiDoc/sec-center/sec-check/msgSecCheck.html
@@ -115,23 +122,27 @@ class WeChatService:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload, timeout=5.0)
-                data = response.json()
+            client = http_clients.get("wechat")
+            response = await client.post(url, json=payload, timeout=5.0)
+            data = response.json()
                 
-                logger.info(f"微信内容安全响应: {data}")
+            logger.info(f"微信内容安全响应: {data}")
                 
-                # result.suggest: 'pass' | 'risky' | 'review'
-                if data.get("errcode", 0) == 0:
-                    if data.get("result", {}).get("suggest") == "pass":
-                        return True
-                    else:
-                        logger.warning(f"内容安全拦截: {content[:10]}... -> {data}")
-                        return False
+            # result.suggest: 'pass' | 'risky' | 'review'
+            if data.get("errcode", 0) == 0:
+                if data.get("result", {}).get("suggest") == "pass":
+                    return True
                 else:
-                    logger.error(f"内容安全接口报错: {data}")
-                    # 接口报错时，是否放行视业务紧迫性而定，这里暂定为不通过
+                    logger.warning(f"内容安全拦截: {content[:10]}... -> {data}")
                     return False
+            elif data.get("errcode") in INVALID_TOKEN_ERRCODES and retry_on_invalid_token:
+                # 令牌失效（被其他服务刷新或已过期）：作废缓存后重试一次
+                await credential_store.invalidate("wechat", token)
+                return await self.msg_sec_check(content, openid, retry_on_invalid_token=False)
+            else:
+                logger.error(f"内容安全接口报错: {data}")
+                # 接口报错时，是否放行视业务紧迫性而定，这里暂定为不通过
+                return False
         except Exception as e:
             logger.error(f"内容安全请求异常: {e}")
             return False
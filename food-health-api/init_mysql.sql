@@ -92,6 +92,7 @@ CREATE TABLE IF NOT EXISTS `food_temp` (
     carbohydrate FLOAT NOT NULL COMMENT '碳水化合物 g/100g',
 
     source VARCHAR(50) COMMENT '数据来源：deepseek_ai/baidu_ai/user_custom',
+    detail TEXT COMMENT 'AI 补充详情(JSON)',
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
 
@@ -260,7 +261,9 @@ CREATE TABLE IF NOT EXISTS `diet_plan` (
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
 
-    INDEX idx_plan_source (source)
+    INDEX idx_plan_created (created_at),
+    INDEX idx_plan_source_created (source, created_at),
+    INDEX idx_plan_author_source_created (author_id, source, created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='食谱计划表';
 
 
@@ -375,6 +378,57 @@ CREATE TABLE IF NOT EXISTS `user_favorite` (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='用户收藏关系表';
 
 
+-- =====================================================
+-- 15. 标签字典表
+-- =====================================================
+CREATE TABLE IF NOT EXISTS `tag` (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(50) NOT NULL UNIQUE COMMENT '标签名'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='标签字典表';
+
+
+-- =====================================================
+-- 16. 食谱计划-标签关联表
+-- =====================================================
+CREATE TABLE IF NOT EXISTS `diet_plan_tag` (
+    plan_id INT NOT NULL COMMENT '食谱计划ID',
+    tag_id INT NOT NULL COMMENT '标签ID',
+    plan_created_at DATETIME COMMENT '食谱创建时间（冗余，创建后不变）',
+
+    PRIMARY KEY (plan_id, tag_id),
+    FOREIGN KEY (plan_id) REFERENCES diet_plan(id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES tag(id) ON DELETE CASCADE,
+    INDEX idx_plan_tag_tag_created (tag_id, plan_created_at, plan_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='食谱计划-标签关联表';
+
+
+-- =====================================================
+-- 17. 精品食谱-标签关联表
+-- =====================================================
+CREATE TABLE IF NOT EXISTS `premium_recipe_tag` (
+    recipe_id INT NOT NULL COMMENT '精品食谱ID',
+    tag_id INT NOT NULL COMMENT '标签ID',
+
+    PRIMARY KEY (recipe_id, tag_id),
+    FOREIGN KEY (recipe_id) REFERENCES premium_recipes(id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES tag(id) ON DELETE CASCADE,
+    INDEX idx_recipe_tag_tag (tag_id, recipe_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='精品食谱-标签关联表';
+
+
+-- =====================================================
+-- 18. 第三方服务凭证表（access_token 多进程共享）
+-- =====================================================
+CREATE TABLE IF NOT EXISTS `service_credential` (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(50) NOT NULL UNIQUE COMMENT '服务名：baidu/fatsecret/wechat',
+    token TEXT NOT NULL COMMENT 'access_token',
+    expires_at DATETIME NOT NULL COMMENT '过期时间',
+    lease_until DATETIME NULL COMMENT '刷新租约到期时间（多 worker 只由持有者刷新）',
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='第三方服务凭证表';
+
+
 -- =====================================================
 -- 插入初始数据
 -- =====================================================
@@ -395,7 +449,7 @@ INSERT IGNORE INTO food_portion (category, portion_name, calorie_factor, is_defa
 
 
 -- =====================================================
--- 完成！共 14 张表
+-- 完成！共 18 张表
 -- =====================================================
 -- 表清单:
 --   1.  user               - 用户表
@@ -412,4 +466,8 @@ INSERT IGNORE INTO food_portion (category, portion_name, calorie_factor, is_defa
 --  12.  diet_plan_meal     - 食谱具体餐单表
 --  13.  premium_recipes    - 精品食谱表
 --  14.  user_favorite      - 用户收藏关系表
+--  15.  tag                - 标签字典表
+--  16.  diet_plan_tag      - 食谱计划-标签关联表
+--  17.  premium_recipe_tag - 精品食谱-标签关联表
+--  18.  service_credential - 第三方服务凭证表
 -- =====================================================
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+食物搜索基准测试：LIKE 全表扫描 vs n-gram 倒排索引
+在临时 SQLite 文件中生成合成食物（默认 10 万条，带别名）与临时食物（默认 2 万条），
+对常见单字、常见词、长词、冷门词、无结果词分别测试 search_foods 耗时，并校验两种方式结果一致。
+
+使用方法：
+    cd food-health-api
+    python scripts/bench_food_search.py [--foods 100000] [--temps 20000] [--limit 10]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database.connection import Base
+from app.models.food import Food, FoodTemp
+from app.services.food_search_index import food_search_index
+from app.services.food_service import FoodService, settings
+
+METHODS = ["清蒸", "红烧", "爆炒", "凉拌", "水煮", "干煸", "糖醋", "香煎", "卤", "炖"]
+INGREDIENTS = [
+    "鸡胸肉", "牛腩", "排骨", "鲈鱼", "虾仁", "豆腐", "茄子", "土豆", "西兰花", "西红柿",
+    "鸡蛋", "青椒", "五花肉", "羊肉", "香菇", "木耳", "南瓜", "山药", "莲藕", "冬瓜",
+]
+SUFFIXES = ["", "", "饭", "面", "汤", "煲", "盖饭", "套餐"]
+KEYWORDS = [
+    ("常见单字", "鸡"),
+    ("常见词", "西红柿"),
+    ("长词", "红烧牛腩"),
+    ("冷门词", "秘制干煸"),
+    ("无结果", "榴莲披萨"),
+]
+
+
+def populate(engine, foods: int, temps: int, batch: int = 20000):
+    rng = random.Random(11)
+
+    def dish(i):
+        name = rng.choice(METHODS) + rng.choice(INGREDIENTS) + rng.choice(SUFFIXES)
+        if rng.random() < 0.01:
+            name = "秘制" + name
+        return f"{name}{i}"
+
+    with engine.begin() as conn:
+        for offset in range(0, foods, batch):
+            conn.execute(insert(Food), [
+                {
+                    "name": dish(i),
+                    "alias": ",".join(rng.sample(INGREDIENTS, 2)) if rng.random() < 0.3 else None,
+                    "category": "荤菜",
+                    "calories": 100, "protein": 10, "fat": 5, "carbohydrate": 8,
+                }
+                for i in range(offset, min(offset + batch, foods))
+            ])
+        for offset in range(0, temps, batch):
+            conn.execute(insert(FoodTemp), [
+                {"name": f"临时{dish(i)}", "calories": 100, "protein": 10, "fat": 5, "carbohydrate": 8, "source": "fatsecret"}
+                for i in range(offset, min(offset + batch, temps))
+            ])
+
+
+def timed(func, repeat=5):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="食物搜索基准测试")
+    parser.add_argument("--foods", type=int, default=100_000, help="合成食物条数")
+    parser.add_argument("--temps", type=int, default=20_000, help="合成临时食物条数")
+    parser.add_argument("--limit", type=int, default=10, help="返回数量")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_food_search.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    service = FoodService(db)
+
+    started = time.perf_counter()
+    populate(engine, args.foods, args.temps)
+    print(f"📦 已生成 {args.foods} 条食物、{args.temps} 条临时食物（{time.perf_counter() - started:.1f}s）")
+
+    food_search_index.invalidate()
+    food_search_index.search_foods(db, "预热", 1)
+    stats = food_search_index.stats()
+    # 再构建一次统计内存（tracemalloc 会明显拖慢构建，不计入耗时）
+    tracemalloc.start()
+    food_search_index.invalidate()
+    food_search_index.search_foods(db, "预热", 1)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"🔍 构建索引 {stats['last_rebuild_ms']:.0f}ms，{stats['grams']} 个 n-gram，常驻内存约 {current / 1024 / 1024:.0f}MB")
+
+    def search(keyword):
+        names = [item.name for item in service.search_foods(keyword, args.limit)]
+        db.expunge_all()
+        return names
+
+    def lookup(keyword):
+        return (
+            food_search_index.search_foods(db, keyword, args.limit),
+            food_search_index.search_temps(db, keyword, args.limit),
+        )
+
+    rows = []
+    mismatches = 0
+    for label, keyword in KEYWORDS:
+        settings.food_search_backend = "like"
+        like_ms, like_names = timed(lambda: search(keyword))
+        settings.food_search_backend = "ngram"
+        ngram_ms, ngram_names = timed(lambda: search(keyword))
+        lookup_ms, _ = timed(lambda: lookup(keyword))
+        mismatches += like_names != ngram_names
+        rows.append((f"{label}「{keyword}」", like_ms, ngram_ms, lookup_ms, len(ngram_names), like_names == ngram_names))
+
+    print(f"\n{'关键词':<22}{'LIKE(ms)':>12}{'n-gram(ms)':>12}{'索引查找(ms)':>14}{'结果数':>8}{'一致':>6}")
+    for name, like_ms, ngram_ms, lookup_ms, count, same in rows:
+        print(f"{name:<22}{like_ms:>12.1f}{ngram_ms:>12.1f}{lookup_ms:>14.2f}{count:>8}{'✅' if same else '❌':>6}")
+    print("\n说明：前两列为 search_foods 端到端耗时，含回表与逐条组装响应（get_food_response，两种方式相同）；")
+    print("      索引查找列只含 n-gram 索引取 id 的耗时")
+    if mismatches:
+        print(f"❌ {mismatches} 个关键词结果不一致")
+
+    db.close()
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+搜索联想基准测试：模拟逐字输入，统计 /food/suggest 每次按键的耗时分布
+在临时 SQLite 文件中生成合成食物（默认 10 万条）与临时食物（默认 2 万条），
+随机挑选食物，按汉字、全拼、拼音首字母逐字符输入，与每次按键调用 search_foods
+（仅本地查询，不含 FatSecret / Open Food Facts 网络请求）对比。
+
+使用方法：
+    cd food-health-api
+    python scripts/bench_food_suggest.py [--foods 100000] [--temps 20000] [--targets 300]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database.connection import Base
+from app.models.food import Food, FoodTemp
+from app.services.food_service import FoodService
+from app.services.food_suggest import food_suggest_index, lazy_pinyin, Style
+
+METHODS = ["清蒸", "红烧", "爆炒", "凉拌", "水煮", "干煸", "糖醋", "香煎", "卤", "炖", "蒜蓉", "椒盐"]
+INGREDIENTS = [
+    "鸡胸肉", "牛腩", "排骨", "鲈鱼", "虾仁", "豆腐", "茄子", "土豆", "西兰花", "西红柿",
+    "鸡蛋", "青椒", "五花肉", "羊肉", "香菇", "木耳", "南瓜", "山药", "莲藕", "冬瓜",
+]
+SUFFIXES = ["", "饭", "面", "汤", "煲", "盖饭", "套餐", "粥", "饼", "卷"]
+REGIONS = ["川味", "粤式", "湘味", "东北", "江南", "西北", "台式", "港式", "家常", "农家", "老北京", "潮汕"]
+
+
+def make_names(count: int, rng: random.Random, taken: set):
+    names = []
+    while len(names) < count:
+        name = rng.choice(REGIONS) + rng.choice(METHODS) + rng.choice(INGREDIENTS) + rng.choice(SUFFIXES)
+        if rng.random() < 0.5:
+            name += str(rng.randint(1, 99)) + "号"
+        if name not in taken:
+            taken.add(name)
+            names.append(name)
+    return names
+
+
+def populate(engine, foods: int, temps: int, batch: int = 20000):
+    rng = random.Random(17)
+    taken = set()
+    food_names = make_names(foods, rng, taken)
+    temp_names = make_names(temps, rng, taken)
+    with engine.begin() as conn:
+        for offset in range(0, foods, batch):
+            conn.execute(insert(Food), [
+                {
+                    "name": name,
+                    "alias": ",".join(rng.sample(INGREDIENTS, 2)) if rng.random() < 0.3 else None,
+                    "calories": 100, "protein": 10, "fat": 5, "carbohydrate": 8,
+                }
+                for name in food_names[offset:offset + batch]
+            ])
+        for offset in range(0, temps, batch):
+            conn.execute(insert(FoodTemp), [
+                {"name": name, "calories": 100, "protein": 10, "fat": 5, "carbohydrate": 8, "source": "fatsecret"}
+                for name in temp_names[offset:offset + batch]
+            ])
+    return food_names + temp_names
+
+
+def keystrokes(names, targets: int):
+    """每个目标食物按三种方式逐字符输入，返回所有中间输入"""
+    rng = random.Random(23)
+    typed = []
+    for name in rng.sample(names, targets):
+        inputs = [name]
+        if lazy_pinyin is not None:
+            inputs.append("".join(lazy_pinyin(name)))
+            inputs.append("".join(lazy_pinyin(name, style=Style.FIRST_LETTER)))
+        for text in inputs:
+            typed.extend(text[:end] for end in range(1, min(len(text), 12) + 1))
+    return typed
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+
+    def pick(q):
+        return samples[min(int(len(samples) * q), len(samples) - 1)]
+
+    return pick(0.5), pick(0.95), pick(0.99), samples[-1]
+
+
+def measure(func, inputs):
+    samples = []
+    for text in inputs:
+        started = time.perf_counter()
+        func(text)
+        samples.append((time.perf_counter() - started) * 1000)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="搜索联想基准测试")
+    parser.add_argument("--foods", type=int, default=100_000, help="合成食物条数")
+    parser.add_argument("--temps", type=int, default=20_000, help="合成临时食物条数")
+    parser.add_argument("--targets", type=int, default=300, help="模拟输入的目标食物数")
+    parser.add_argument("--limit", type=int, default=10, help="返回数量")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_food_suggest.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    started = time.perf_counter()
+    names = populate(engine, args.foods, args.temps)
+    print(f"📦 已生成 {args.foods} 条食物、{args.temps} 条临时食物（{time.perf_counter() - started:.1f}s）")
+    if lazy_pinyin is None:
+        print("⚠️ 未安装 pypinyin，只测试汉字输入")
+
+    food_suggest_index.invalidate()
+    food_suggest_index.suggest(db, "预热")
+    stats = food_suggest_index.stats()
+    # 再构建一次统计内存（tracemalloc 会明显拖慢构建，不计入耗时）
+    tracemalloc.start()
+    food_suggest_index.invalidate()
+    food_suggest_index.suggest(db, "预热")
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"🔤 构建联想索引 {stats['last_rebuild_ms']:.0f}ms，{stats['keys']} 个检索键，"
+          f"{stats['hot_prefixes']} 个热门前缀，常驻内存约 {current / 1024 / 1024:.0f}MB")
+
+    inputs = keystrokes(names, args.targets)
+    service = FoodService(db)
+
+    def search(text):
+        service.search_foods(text, args.limit)
+        db.expunge_all()
+
+    search("预热")  # 构建 n-gram 搜索索引，不计入按键耗时
+
+    rows = [("/food/suggest", measure(lambda text: food_suggest_index.suggest(db, text, args.limit), inputs))]
+    # search_foods 较慢，只取部分输入
+    rows.append(("search_foods（仅本地）", measure(search, inputs[:: max(len(inputs) // 500, 1)])))
+
+    print(f"\n模拟按键 {len(inputs)} 次")
+    print(f"{'方式':<24}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}")
+    for name, (p50, p95, p99, worst) in rows:
+        print(f"{name:<24}{p50:>10.3f}{p95:>10.3f}{p99:>10.3f}{worst:>10.3f}")
+    p99 = rows[0][1][2]
+    print(f"\n{'✅' if p99 < 5 else '❌'} /food/suggest p99 {p99:.3f}ms（目标 < 5ms）")
+
+    db.close()
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
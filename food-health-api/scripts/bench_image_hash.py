@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+感知哈希近似图片索引基准测试
+测量 dHash 计算耗时，以及 10 万条索引规模下的写入与查找耗时。
+
+使用方法：
+    cd food-health-api
+    python scripts/bench_image_hash.py [--entries 100000] [--distance 6]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.image_hash import PerceptualHashIndex, compute_dhash, Image, HASH_BITS
+
+
+def make_jpeg(width: int, height: int, seed: int, quality: int = 90) -> bytes:
+    """生成带渐变和色块的测试图片（模拟手机拍摄尺寸）"""
+    rnd = random.Random(seed)
+    img = Image.new("RGB", (width, height))
+    pixels = img.load()
+    cr, cg, cb = rnd.randint(0, 255), rnd.randint(0, 255), rnd.randint(0, 255)
+    for y in range(0, height, 4):
+        for x in range(0, width, 4):
+            color = ((x * cr // width) % 256, (y * cg // height) % 256, ((x + y) * cb // (width + height)) % 256)
+            for dy in range(4):
+                for dx in range(4):
+                    if x + dx < width and y + dy < height:
+                        pixels[x + dx, y + dy] = color
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def flip_bits(value: int, count: int, rnd: random.Random) -> int:
+    for bit in rnd.sample(range(HASH_BITS), count):
+        value ^= 1 << bit
+    return value
+
+
+def bench_hash(rounds: int) -> None:
+    if Image is None:
+        print("[SKIP] 未安装 Pillow，跳过哈希计算测试")
+        return
+
+    for width, height in [(1280, 960), (4032, 3024)]:
+        original = make_jpeg(width, height, seed=1)
+        recompressed = make_jpeg(width, height, seed=1, quality=60)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            h1 = compute_dhash(original)
+        elapsed = (time.perf_counter() - start) / rounds * 1000
+        h2 = compute_dhash(recompressed)
+        print(
+            f"dHash {width}x{height} ({len(original) // 1024} KB): "
+            f"{elapsed:.2f} ms/张，重新压缩后距离 {(h1 ^ h2).bit_count()}"
+        )
+
+
+def bench_index(entries: int, distance: int, queries: int) -> None:
+    rnd = random.Random(42)
+    index = PerceptualHashIndex(max_distance=distance, max_entries=entries, ttl_seconds=None)
+    hashes = [rnd.getrandbits(HASH_BITS) for _ in range(entries)]
+
+    start = time.perf_counter()
+    for i, value in enumerate(hashes):
+        index.add(value, i)
+    build = time.perf_counter() - start
+    print(f"\n写入 {entries} 条: {build:.2f} s（{build / entries * 1e6:.1f} µs/条）")
+
+    near = [flip_bits(rnd.choice(hashes), rnd.randint(1, distance), rnd) for _ in range(queries)]
+    far = [rnd.getrandbits(HASH_BITS) for _ in range(queries)]
+
+    for label, batch in [("近似命中", near), ("随机未命中", far)]:
+        latencies = []
+        found = 0
+        for value in batch:
+            t0 = time.perf_counter()
+            if index.find(value):
+                found += 1
+            latencies.append((time.perf_counter() - t0) * 1e6)
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(f"{label}: 命中 {found}/{len(batch)}，p50 {p50:.1f} µs，p99 {p99:.1f} µs")
+
+    # 对照：线性扫描
+    value = near[0]
+    t0 = time.perf_counter()
+    min((h ^ value).bit_count() for h in hashes)
+    print(f"线性扫描对照: {(time.perf_counter() - t0) * 1000:.2f} ms/次")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="感知哈希索引基准测试")
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--distance", type=int, default=6)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    bench_hash(args.rounds)
+    bench_index(args.entries, args.distance, args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+食谱生成策略基准测试：单次生成 vs 周大纲 + 按天并发生成
+比较两种策略生成 7 天食谱的总耗时。
+
+默认使用模拟的 DeepSeek 接口：耗时 = 首字延迟 + 输出 token 数 / 生成速度，
+与真实接口一样随输出长度线性增长；--time-scale 按比例压缩实际等待时间，
+输出中的耗时已换算回模拟时间。
+加 --live 时直接调用 .env 中配置的 DeepSeek（会产生费用）。
+
+使用方法：
+    cd food-health-api
+    python scripts/bench_plan_generation.py [--tokens-per-second 30] [--concurrency 3 5 7]
+    python scripts/bench_plan_generation.py --live --rounds 1
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from app.services import deepseek_service as deepseek_module
+from app.services.deepseek_service import DeepSeekService
+
+MEALS = [
+    ("breakfast", "全麦面包配水煮蛋和无糖豆浆", "2片+1个+1杯", 380),
+    ("lunch", "香煎鸡胸肉配西兰花糙米饭", "150g+100g+1碗", 520),
+    ("dinner", "清蒸鲈鱼配凉拌菠菜", "120g+1盘", 420),
+    ("snack", "原味酸奶配蓝莓", "1杯+50g", 150),
+]
+
+
+def make_day(index: int) -> dict:
+    return {
+        "day_index": index,
+        "title": f"第{index}天 均衡控卡日",
+        "meals": [
+            {"meal_type": t, "food_name": name, "amount_desc": amount, "calories": cal}
+            for t, name, amount, cal in MEALS
+        ],
+    }
+
+
+OUTLINE = {
+    "name": "高效减脂7日计划",
+    "description": "高蛋白低脂肪，三餐定时定量，循序渐进控制热量摄入",
+    "tags": ["减脂", "高蛋白"],
+    "days": [
+        {"day_index": i, "title": f"第{i}天 均衡控卡日", "focus": "鸡胸肉、鲈鱼与深色蔬菜"}
+        for i in range(1, 8)
+    ],
+}
+FULL_PLAN = dict(OUTLINE, days=[make_day(i) for i in range(1, 8)])
+
+
+class SimulatedDeepSeek:
+    """按输出长度模拟生成耗时的 DeepSeek 接口"""
+
+    def __init__(self, tokens_per_second: float, first_token_ms: float, chars_per_token: float, time_scale: float):
+        self.tokens_per_second = tokens_per_second
+        self.first_token_ms = first_token_ms
+        self.chars_per_token = chars_per_token
+        self.time_scale = time_scale
+        self.calls = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        prompt = json.loads(request.content)["messages"][0]["content"]
+        if "一周大纲" in prompt:
+            content = json.dumps(OUTLINE, ensure_ascii=False)
+        else:
+            match = re.search(r"请只生成第(\d+)天", prompt)
+            payload = make_day(int(match.group(1))) if match else FULL_PLAN
+            content = json.dumps(payload, ensure_ascii=False, indent=2)
+
+        tokens = len(content) / self.chars_per_token
+        seconds = self.first_token_ms / 1000 + tokens / self.tokens_per_second
+        self.calls += 1
+        await asyncio.sleep(seconds * self.time_scale)
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+async def run_once(service: DeepSeekService, strategy: str, concurrency: int) -> tuple:
+    deepseek_module.settings.plan_generation_strategy = strategy
+    deepseek_module.settings.plan_parallel_concurrency = concurrency
+    start = time.perf_counter()
+    plan = await service.generate_diet_plan("女性, 28岁, 60kg", "减脂", "无特殊偏好")
+    elapsed = time.perf_counter() - start
+    return elapsed, len(plan["days"]) if plan else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="食谱生成策略基准测试")
+    parser.add_argument("--tokens-per-second", type=float, default=30, help="模拟输出速度")
+    parser.add_argument("--first-token-ms", type=float, default=800, help="模拟首字延迟")
+    parser.add_argument("--chars-per-token", type=float, default=1.5, help="JSON 文本字符数 / token")
+    parser.add_argument("--time-scale", type=float, default=0.02, help="实际等待时间 = 模拟时间 × 该系数")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[3, 5, 7], help="并发生成的天数上限")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--live", action="store_true", help="调用真实 DeepSeek 接口")
+    args = parser.parse_args()
+
+    service = DeepSeekService()
+    scale = 1.0
+    if args.live:
+        if not service.is_configured:
+            print("[SKIP] 未配置 DEEPSEEK_API_KEY")
+            return
+        print("模式: 真实 DeepSeek 接口")
+    else:
+        service.api_key = service.api_key or "bench"
+        fake = SimulatedDeepSeek(args.tokens_per_second, args.first_token_ms, args.chars_per_token, args.time_scale)
+        deepseek_module.http_clients = fake
+        scale = args.time_scale
+        print(
+            f"模式: 模拟接口（{args.tokens_per_second:.0f} tok/s，首字 {args.first_token_ms:.0f}ms，"
+            f"耗时按 ×{1 / scale:.0f} 换算）"
+        )
+
+    cases = [("single", 1)] + [("parallel", c) for c in args.concurrency]
+    baseline = None
+    print(f"{'策略':<10}{'并发':>6}{'平均耗时(s)':>14}{'天数':>6}{'加速比':>8}")
+    for strategy, concurrency in cases:
+        timings = []
+        days = 0
+        for _ in range(args.rounds):
+            elapsed, days = asyncio.run(run_once(service, strategy, concurrency))
+            timings.append(elapsed / scale)
+        avg = sum(timings) / len(timings)
+        baseline = baseline or avg
+        print(f"{strategy:<10}{concurrency:>6}{avg:>14.1f}{days:>6}{baseline / avg:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+食谱列表基准测试：全量返回 vs OFFSET 分页 vs (created_at, id) 游标分页
+在临时 SQLite 文件中生成合成食谱表（默认 100 万条），统计各方式的耗时与响应体积。
+
+使用方法：
+    cd food-health-api
+    python scripts/bench_plan_list.py [--rows 1000000] [--limit 20] [--skip-full]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, desc, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1 import plan
+from app.database.connection import Base
+from app.models.diet_plan import DietPlan
+
+SOURCES = ["ai_generated"] * 7 + ["mock_data"] * 2 + ["preset"]
+TAGS = ["减脂,高蛋白", "增肌,高蛋白", "控糖,低GI", "素食", "均衡"]
+
+
+def populate(engine, rows: int, batch: int = 20000):
+    """批量写入合成数据：多数为 AI 生成，按用户分布，创建时间覆盖约一年"""
+    rng = random.Random(42)
+    start = datetime.now() - timedelta(days=365)
+    step = 365 * 86400 / rows
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch):
+            conn.execute(insert(DietPlan), [
+                {
+                    "name": f"合成食谱{i}",
+                    "description": "高蛋白低脂肪，适合上班族的7日减脂食谱。" * 4,
+                    "cover_image": "/static/ai_plan.png",
+                    "duration_days": 7,
+                    "target_user": "目标: 减脂, BMI: 24.1",
+                    "difficulty": "medium",
+                    "tags": rng.choice(TAGS),
+                    "source": rng.choice(SOURCES),
+                    "author_id": rng.randint(1, 50000),
+                    "created_at": start + timedelta(seconds=i * step),
+                    "updated_at": start + timedelta(seconds=i * step),
+                }
+                for i in range(offset, min(offset + batch, rows))
+            ])
+
+
+def timed(func, repeat=5):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def payload_size(data) -> int:
+    return len(json.dumps(data, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="食谱列表分页基准测试")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="合成食谱条数")
+    parser.add_argument("--limit", type=int, default=20, help="每页数量")
+    parser.add_argument("--skip-full", action="store_true", help="跳过改造前的全量返回（百万行时耗时较长）")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_plan_list.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    started = time.perf_counter()
+    populate(engine, args.rows)
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+    print(f"📦 已生成 {args.rows} 条食谱（{time.perf_counter() - started:.1f}s），数据库: {path}")
+
+    def call(**kwargs):
+        params = {"tag": None, "source": None, "cursor": None, "limit": args.limit, "fields": None, "compact": False}
+        params.update(kwargs)
+        return asyncio.run(plan.list_plans(db=db, **params))["data"]
+
+    results = []
+    if not args.skip_full:
+        def legacy_full():
+            plans = db.query(DietPlan).filter(DietPlan.source == "ai_generated").order_by(desc(DietPlan.created_at)).all()
+            data = [{name: getattr(p, name) for name in plan.PLAN_LIST_FIELDS} for p in plans]
+            db.expunge_all()
+            return data
+        ms, data = timed(legacy_full, repeat=1)
+        results.append(("改造前：全量返回 (source=ai_generated)", ms, payload_size(data)))
+
+    # 翻到约第 N/2 条的位置，比较深分页
+    deep_offset = (args.rows // 2) // args.limit * args.limit
+    deep_row = db.query(DietPlan.id, DietPlan.created_at).order_by(
+        desc(DietPlan.created_at), desc(DietPlan.id)
+    ).offset(deep_offset - 1).first()
+    deep_cursor = plan._encode_plan_cursor(deep_row)
+
+    def offset_page():
+        return [
+            {name: getattr(p, name) for name in plan.PLAN_LIST_FIELDS}
+            for p in db.query(DietPlan).order_by(desc(DietPlan.created_at), desc(DietPlan.id))
+            .offset(deep_offset).limit(args.limit).all()
+        ]
+
+    ms, data = timed(lambda: call())
+    results.append(("游标分页：第一页", ms, payload_size(data)))
+    ms, data = timed(offset_page)
+    results.append((f"OFFSET 分页：offset={deep_offset}", ms, payload_size(data)))
+    ms, data = timed(lambda: call(cursor=deep_cursor))
+    results.append(("游标分页：同一位置", ms, payload_size(data)))
+    ms, data = timed(lambda: call(source="ai_generated", cursor=deep_cursor))
+    results.append(("游标分页 + source 筛选", ms, payload_size(data)))
+    ms, data = timed(lambda: call(fields="name,tags"))
+    results.append(("游标分页 + fields=name,tags", ms, payload_size(data)))
+    ms, data = timed(lambda: call(fields="name,tags", compact=True))
+    results.append(("游标分页 + fields + compact", ms, payload_size(data)))
+
+    print(f"\n{'方式':<40}{'耗时(ms)':>12}{'响应体积(B)':>16}")
+    for name, ms, size in results:
+        print(f"{name:<40}{ms:>12.1f}{size:>16,}")
+
+    db.close()
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
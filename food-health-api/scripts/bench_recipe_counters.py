@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+精品食谱计数压测：逐次 UPDATE + COMMIT vs 写缓冲批量写回
+在临时 SQLite 文件中生成精品食谱，多线程模拟详情页浏览（少数热门食谱占大部分流量），
+统计两种方式的吞吐、数据库提交次数 / 秒，并校验最终计数一致。
+
+SQLite 整库一把写锁，对应 MySQL 上热门行的行锁争用。
+
+使用方法：
+    cd food-health-api
+    python scripts/bench_recipe_counters.py [--views 20000] [--threads 8] [--recipes 1000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, func, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database.connection import Base
+from app.models.food import PremiumRecipe
+from app.services.recipe_counters import RecipeCounterBuffer
+
+
+def make_workload(views: int, recipes: int):
+    """约 80% 的浏览集中在前 1% 的热门食谱"""
+    rng = random.Random(3)
+    hot = max(recipes // 100, 1)
+    return [rng.randint(1, hot) if rng.random() < 0.8 else rng.randint(1, recipes) for _ in range(views)]
+
+
+def run_threads(workload, threads: int, handle):
+    chunks = [workload[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=lambda chunk=chunk: [handle(recipe_id) for recipe_id in chunk]) for chunk in chunks]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="精品食谱计数压测")
+    parser.add_argument("--views", type=int, default=20_000, help="模拟浏览次数")
+    parser.add_argument("--threads", type=int, default=8, help="并发线程数")
+    parser.add_argument("--recipes", type=int, default=1000, help="精品食谱数")
+    parser.add_argument("--flush-seconds", type=float, default=0.5, help="写缓冲刷新间隔")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_recipe_counters.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 60}, pool_size=args.threads + 2)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(PremiumRecipe), [{"name": f"合成精品食谱{i}"} for i in range(args.recipes)])
+
+    commits = [0]
+
+    def count_commit(conn):
+        commits[0] += 1
+
+    event.listen(engine, "commit", count_commit)
+    workload = make_workload(args.views, args.recipes)
+
+    def total_views():
+        with Session() as db:
+            return db.query(func.sum(PremiumRecipe.view_count)).scalar() or 0
+
+    # 改造前：每次浏览一条 UPDATE + 一次 COMMIT
+    def direct(recipe_id):
+        with Session() as db:
+            db.query(PremiumRecipe).filter(PremiumRecipe.id == recipe_id).update(
+                {"view_count": PremiumRecipe.view_count + 1}
+            )
+            db.commit()
+
+    commits[0] = 0
+    direct_seconds = run_threads(workload, args.threads, direct)
+    direct_commits = commits[0]
+    direct_total = total_views()
+
+    # 改造后：内存累加，后台线程按间隔批量写回，结束时再写回一次（对应服务关闭）
+    buffer = RecipeCounterBuffer(session_factory=Session, flush_seconds=args.flush_seconds, flush_threshold=10_000)
+    stopped = threading.Event()
+
+    def flusher():
+        while not stopped.wait(buffer.flush_seconds):
+            buffer.flush()
+
+    commits[0] = 0
+    flush_thread = threading.Thread(target=flusher)
+    flush_thread.start()
+    buffered_seconds = run_threads(workload, args.threads, lambda recipe_id: buffer.add(recipe_id, "view_count"))
+    stopped.set()
+    flush_thread.join()
+    buffer.flush()
+    buffered_commits = commits[0]
+    buffered_total = total_views() - direct_total
+
+    print(f"📦 {args.recipes} 条精品食谱，{args.views} 次浏览，{args.threads} 个线程")
+    print(f"\n{'方式':<16}{'耗时(s)':>10}{'浏览/秒':>12}{'提交次数':>10}{'提交/秒':>10}{'写入浏览数':>12}")
+    for name, seconds, commit_count, total in (
+        ("逐次提交", direct_seconds, direct_commits, direct_total),
+        ("写缓冲", buffered_seconds, buffered_commits, buffered_total),
+    ):
+        print(f"{name:<16}{seconds:>10.2f}{args.views / seconds:>12,.0f}{commit_count:>10,}"
+              f"{commit_count / seconds:>10,.0f}{total:>12,}")
+    print(f"\n写缓冲批量写回 {buffer.flushes} 次，共更新 {buffer.rows_flushed} 行，最近一次 {buffer.last_flush_ms:.1f}ms")
+    print("✅ 计数一致" if direct_total == buffered_total == args.views else "❌ 计数不一致")
+
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+按标签筛选基准测试：tags 文本列 LIKE vs 标签关联表
+在临时 SQLite 文件中生成精品食谱（默认 10 万条）与食谱计划（默认 100 万条），
+回填关联表后分别测试常见标签与冷门标签的筛选耗时，并统计 LIKE 子串误匹配条数。
+
+使用方法：
+    cd food-health-api
+    python scripts/bench_tag_filter.py [--recipes 100000] [--plans 1000000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, desc, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1 import plan
+from app.database.connection import Base
+from app.models.diet_plan import DietPlan
+from app.models.food import PremiumRecipe
+from app.services.premium_recipe_service import PremiumRecipeService
+from app.services.tag_index import backfill_tags
+
+PLAN_BASE_TAGS = ["DeepSeek", "AI定制"]
+PLAN_GOAL_TAGS = ["减脂", "增肌", "维持"]
+PLAN_EXTRA_TAGS = ["高蛋白", "低GI", "素食", "控糖", "减脂餐", "轻断食"]
+RECIPE_TAGS = ["高蛋白", "低脂", "减脂餐", "减脂", "沙拉", "快手", "家常", "清淡", "低卡", "素食", "开胃", "经典菜"]
+RARE_TAG = "冷门主题7"
+
+
+def populate(engine, recipes: int, plans: int, batch: int = 20000):
+    rng = random.Random(7)
+    start = datetime.now() - timedelta(days=365)
+    with engine.begin() as conn:
+        for offset in range(0, recipes, batch):
+            conn.execute(insert(PremiumRecipe), [
+                {
+                    "name": f"合成精品食谱{i}",
+                    "description": "合成数据",
+                    "category": rng.choice(["早餐", "午餐", "晚餐", "加餐"]),
+                    "tags": json.dumps(
+                        rng.sample(RECIPE_TAGS, 3) + ([f"冷门主题{rng.randint(0, 999)}"] if rng.random() < 0.05 else []),
+                        ensure_ascii=False,
+                    ),
+                    "is_active": True,
+                    "is_featured": rng.random() < 0.05,
+                    "sort_order": rng.randint(0, 100),
+                    "created_at": start + timedelta(seconds=i * 30),
+                }
+                for i in range(offset, min(offset + batch, recipes))
+            ])
+        step = 365 * 86400 / max(plans, 1)
+        for offset in range(0, plans, batch):
+            conn.execute(insert(DietPlan), [
+                {
+                    "name": f"合成食谱{i}",
+                    "tags": ",".join(
+                        PLAN_BASE_TAGS + [rng.choice(PLAN_GOAL_TAGS)] + rng.sample(PLAN_EXTRA_TAGS, 2)
+                        + ([f"冷门主题{rng.randint(0, 999)}"] if rng.random() < 0.01 else [])
+                    ),
+                    "source": "ai_generated",
+                    "author_id": rng.randint(1, 50000),
+                    "created_at": start + timedelta(seconds=i * step),
+                    "updated_at": start + timedelta(seconds=i * step),
+                }
+                for i in range(offset, min(offset + batch, plans))
+            ])
+
+
+def timed(func, repeat=5):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按标签筛选基准测试")
+    parser.add_argument("--recipes", type=int, default=100_000, help="合成精品食谱条数")
+    parser.add_argument("--plans", type=int, default=1_000_000, help="合成食谱计划条数")
+    parser.add_argument("--page-size", type=int, default=20, help="每页数量")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_tag_filter.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    started = time.perf_counter()
+    populate(engine, args.recipes, args.plans)
+    print(f"📦 已生成 {args.recipes} 条精品食谱、{args.plans} 条食谱计划（{time.perf_counter() - started:.1f}s）")
+    started = time.perf_counter()
+    counts = backfill_tags(db, batch_size=5000)
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+    print(f"🏷️ 回填关联表：{counts}（{time.perf_counter() - started:.1f}s）")
+
+    service = PremiumRecipeService(db)
+    size = args.page_size
+
+    def legacy_recipes(tag):
+        query = db.query(PremiumRecipe).filter(PremiumRecipe.is_active == True, PremiumRecipe.tags.like(f'%"{tag}"%'))
+        total = query.count()
+        items = (
+            query.order_by(PremiumRecipe.is_featured.desc(), PremiumRecipe.sort_order.desc(), PremiumRecipe.created_at.desc())
+            .limit(size).all()
+        )
+        db.expunge_all()
+        return items, total
+
+    def indexed_recipes(tag):
+        items, total = service.get_list(page=1, page_size=size, tag=tag)
+        db.expunge_all()
+        return items, total
+
+    def legacy_plans(tag):
+        return db.query(DietPlan.id, DietPlan.name).filter(DietPlan.tags.like(f"%{tag}%")).order_by(
+            desc(DietPlan.created_at), desc(DietPlan.id)
+        ).limit(size).all()
+
+    def legacy_plan_count(tag):
+        return db.query(DietPlan.id).filter(DietPlan.tags.like(f"%{tag}%")).count()
+
+    def indexed_plans(tag):
+        params = {"tag": tag, "source": None, "cursor": None, "limit": size, "fields": "name", "compact": False}
+        return asyncio.run(plan.list_plans(db=db, **params))["data"]["items"]
+
+    rows = []
+    for label, tag in (("常见标签", "减脂"), ("冷门标签", RARE_TAG)):
+        legacy_ms, (_, legacy_total) = timed(lambda: legacy_recipes(tag))
+        indexed_ms, (_, indexed_total) = timed(lambda: indexed_recipes(tag))
+        rows.append((f"精品食谱 {label}「{tag}」", legacy_ms, indexed_ms, legacy_total, indexed_total))
+
+        legacy_ms, _ = timed(lambda: legacy_plans(tag))
+        indexed_ms, _ = timed(lambda: indexed_plans(tag))
+        legacy_total = legacy_plan_count(tag)
+        indexed_total = db.execute(text(
+            "SELECT COUNT(*) FROM diet_plan_tag JOIN tag ON tag.id = diet_plan_tag.tag_id WHERE tag.name = :name"
+        ), {"name": tag}).scalar()
+        rows.append((f"食谱计划 {label}「{tag}」", legacy_ms, indexed_ms, legacy_total, indexed_total))
+
+    print(f"\n{'场景':<30}{'LIKE(ms)':>12}{'关联表(ms)':>12}{'LIKE匹配':>12}{'精确匹配':>12}")
+    for name, legacy_ms, indexed_ms, legacy_total, indexed_total in rows:
+        print(f"{name:<30}{legacy_ms:>12.1f}{indexed_ms:>12.1f}{legacy_total:>12,}{indexed_total:>12,}")
+    print("\n说明：LIKE 匹配数多于精确匹配数的部分为子串误匹配（如「减脂」匹配到「减脂餐」、「冷门主题7」匹配到「冷门主题70」）")
+
+    db.close()
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
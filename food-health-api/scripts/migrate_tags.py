@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+标签关联表迁移：创建 tag / diet_plan_tag / premium_recipe_tag，
+并从 diet_plan.tags（逗号分隔）与 premium_recipes.tags（JSON 数组）回填。
+
+可重复执行（按主体覆盖写入），上线新版本后、开放按标签筛选前执行一次。
+
+使用方法：
+    cd food-health-api
+    python scripts/migrate_tags.py [--batch-size 1000]
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.connection import Base, SessionLocal, engine
+from app.models.tag import DietPlanTag, PremiumRecipeTag, Tag
+from app.services.tag_index import backfill_tags
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回填标签关联表")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每批处理的行数（每批提交一次）")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine, tables=[Tag.__table__, DietPlanTag.__table__, PremiumRecipeTag.__table__])
+    logger.info("标签表已就绪，开始回填...")
+
+    with SessionLocal() as db:
+        counts = backfill_tags(db, batch_size=args.batch_size)
+    logger.info(f"迁移完成: 食谱计划 {counts['plans']} 条，精品食谱 {counts['recipes']} 条，标签 {counts['tags']} 个")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import asyncio
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from app.api.v1 import recognition
+from app.schemas.recognition import RecognitionResult
+from app.services import baidu_ai
+from app.services.baidu_ai import BaiduAIService
+from app.services.circuit_breaker import circuit_breakers
+from app.services.credential_store import credential_store
+
+
+def make_service(delays, answers):
+    service = BaiduAIService()
+    service.api_key = "test-key"
+    service.secret_key = "test-secret"
+    credential_store.set("baidu", "token", 3600, persist=False)
+    calls = []
+
+    async def fake_request(url, image_base64, top_num, category_label, extra_data=None):
+        calls.append(category_label)
+        await asyncio.sleep(delays[category_label])
+        name, confidence = answers[category_label]
+        return [RecognitionResult(name=name, confidence=confidence, category=category_label)]
+
+    service._request_recognition = fake_request
+    return service, calls
+
+
+class BaiduConcurrencyTests(unittest.TestCase):
+    def setUp(self):
+        self._deadline = baidu_ai.settings.baidu_recognition_deadline_seconds
+        self._threshold = baidu_ai.settings.baidu_dish_early_exit_confidence
+
+    def tearDown(self):
+        baidu_ai.settings.baidu_recognition_deadline_seconds = self._deadline
+        baidu_ai.settings.baidu_dish_early_exit_confidence = self._threshold
+
+    def test_endpoints_run_concurrently(self):
+        delays = {"菜品识别": 0.1, "果蔬识别": 0.1, "植物识别": 0.1}
+        answers = {"菜品识别": ("韭菜", 0.21), "果蔬识别": ("番茄", 0.96), "植物识别": ("茄科植物", 0.33)}
+        service, calls = make_service(delays, answers)
+
+        started = time.perf_counter()
+        results = asyncio.run(service._recognize_with_fallback("base64", 5))
+        elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, 0.25)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(results[0].name, "番茄")
+
+    def test_confident_dish_cancels_others(self):
+        baidu_ai.settings.baidu_dish_early_exit_confidence = 0.9
+        delays = {"菜品识别": 0.01, "果蔬识别": 1.0, "植物识别": 1.0}
+        answers = {"菜品识别": ("宫保鸡丁", 0.95), "果蔬识别": ("番茄", 0.96), "植物识别": ("茄科植物", 0.33)}
+        service, _ = make_service(delays, answers)
+
+        started = time.perf_counter()
+        results = asyncio.run(service._recognize_with_fallback("base64", 5))
+
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual([r.name for r in results], ["宫保鸡丁"])
+
+    def test_deadline_keeps_finished_results(self):
+        baidu_ai.settings.baidu_recognition_deadline_seconds = 0.2
+        delays = {"菜品识别": 0.01, "果蔬识别": 0.02, "植物识别": 2.0}
+        answers = {"菜品识别": ("清炒时蔬", 0.5), "果蔬识别": ("非果蔬食材", 0.9), "植物识别": ("茄科植物", 0.33)}
+        service, _ = make_service(delays, answers)
+
+        started = time.perf_counter()
+        results = asyncio.run(service._recognize_with_fallback("base64", 5))
+
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual([r.name for r in results], ["清炒时蔬"])
+
+    def test_deadline_without_results_is_a_failure(self):
+        baidu_ai.settings.baidu_recognition_deadline_seconds = 0.05
+        delays = {"菜品识别": 1.0, "果蔬识别": 1.0, "植物识别": 1.0}
+        answers = {"菜品识别": ("清炒时蔬", 0.5), "果蔬识别": ("番茄", 0.9), "植物识别": ("茄科植物", 0.33)}
+        service, _ = make_service(delays, answers)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(service._recognize_with_fallback("base64", 5))
+
+
+class BaiduDeadlineRecognitionTests(unittest.TestCase):
+    """超时无结果不能变成模拟数据被缓存"""
+
+    SETTING_NAMES = ("doubao_api_key", "baidu_api_key", "baidu_secret_key", "baidu_recognition_deadline_seconds")
+
+    def setUp(self):
+        settings = recognition.settings
+        self._saved = {name: getattr(settings, name) for name in self.SETTING_NAMES}
+        self._recognize_dish = recognition.baidu_ai_service.recognize_dish
+        self._upload_dir = recognition.UPLOAD_DIR
+        self._tmp = tempfile.TemporaryDirectory()
+        recognition.UPLOAD_DIR = Path(self._tmp.name)
+        settings.doubao_api_key = ""
+        settings.baidu_api_key = "baidu"
+        settings.baidu_secret_key = "secret"
+        settings.baidu_recognition_deadline_seconds = 0.05
+        recognition.recognition_cache.clear()
+        circuit_breakers.get("baidu").reset()
+
+    def tearDown(self):
+        for name, value in self._saved.items():
+            setattr(recognition.settings, name, value)
+        recognition.baidu_ai_service.recognize_dish = self._recognize_dish
+        recognition.UPLOAD_DIR = self._upload_dir
+        recognition.recognition_cache.clear()
+        circuit_breakers.get("baidu").reset()
+        self._tmp.cleanup()
+
+    def test_timeout_is_not_returned_or_cached_as_mock(self):
+        delays = {"菜品识别": 1.0, "果蔬识别": 1.0, "植物识别": 1.0}
+        answers = {"菜品识别": ("清炒时蔬", 0.5), "果蔬识别": ("番茄", 0.9), "植物识别": ("茄科植物", 0.33)}
+        service, _ = make_service(delays, answers)
+        recognition.baidu_ai_service.recognize_dish = service.recognize_dish
+
+        response = asyncio.run(recognition._recognize_with_cache(b"slow-photo", "image/jpeg", db=None))
+
+        self.assertEqual(response.results, [])
+        self.assertEqual(len(recognition.recognition_cache), 0)
+        self.assertEqual(circuit_breakers.get("baidu").stats()["failure_rate"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import asyncio
+import time
+import unittest
+
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+async def succeed(delay=0):
+    await asyncio.sleep(delay)
+    return "ok"
+
+
+async def fail():
+    raise RuntimeError("boom")
+
+
+async def respond(status_code):
+    return FakeResponse(status_code)
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def make_breaker(self, **kwargs):
+        options = dict(window_size=4, min_calls=4, failure_rate_threshold=0.5, open_seconds=0.05)
+        options.update(kwargs)
+        return CircuitBreaker("test", **options)
+
+    def call_many(self, breaker, *funcs):
+        async def run():
+            outcomes = []
+            for func in funcs:
+                try:
+                    outcomes.append(await breaker.call(func))
+                except Exception as e:
+                    outcomes.append(type(e).__name__)
+            return outcomes
+        return asyncio.run(run())
+
+    def test_opens_on_failure_rate_and_rejects(self):
+        breaker = self.make_breaker()
+        outcomes = self.call_many(breaker, succeed, succeed, fail, fail, succeed)
+        self.assertEqual(outcomes[-1], "CircuitOpenError")
+        self.assertEqual(breaker.state, OPEN)
+        self.assertEqual(breaker.stats()["rejected"], 1)
+
+    def test_half_open_probe_closes_breaker(self):
+        breaker = self.make_breaker()
+        self.call_many(breaker, fail, fail, fail, fail)
+        self.assertEqual(breaker.state, OPEN)
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertEqual(self.call_many(breaker, succeed), ["ok"])
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_failed_probe_reopens(self):
+        breaker = self.make_breaker()
+        self.call_many(breaker, fail, fail, fail, fail)
+        time.sleep(0.06)
+        self.call_many(breaker, fail)
+        self.assertEqual(breaker.state, OPEN)
+        self.assertEqual(breaker.stats()["times_opened"], 2)
+
+    def test_half_open_allows_single_probe(self):
+        breaker = self.make_breaker()
+        self.call_many(breaker, fail, fail, fail, fail)
+        time.sleep(0.06)
+
+        async def run():
+            probe = asyncio.create_task(breaker.call(succeed, 0.02))
+            await asyncio.sleep(0)
+            with self.assertRaises(CircuitOpenError):
+                await breaker.call(succeed)
+            return await probe
+
+        self.assertEqual(asyncio.run(run()), "ok")
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_slow_calls_open_breaker(self):
+        breaker = self.make_breaker(slow_call_ms=5, slow_call_rate_threshold=0.75)
+        slow = lambda: succeed(0.01)
+        self.call_many(breaker, slow, slow, slow, succeed)
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_http_server_errors_count_as_failures(self):
+        breaker = self.make_breaker()
+
+        async def run():
+            for status in (500, 503, 429, 200):
+                response = await breaker.call_http(respond, status)
+                self.assertEqual(response.status_code, status)
+
+        asyncio.run(run())
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_cancelled_call_is_not_counted(self):
+        breaker = self.make_breaker()
+
+        async def run():
+            task = asyncio.create_task(breaker.call(succeed, 1))
+            await asyncio.sleep(0)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(run())
+        self.assertEqual(breaker.stats()["calls"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
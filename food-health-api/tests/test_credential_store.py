@@ -0,0 +1,179 @@
+import asyncio
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.connection import Base
+from app.models.credential import ServiceCredential
+from app.services import credential_store as credential_module
+from app.services.credential_store import CredentialStore
+
+
+class CredentialStoreTests(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(bind=engine)
+        self.session_factory = sessionmaker(bind=engine)
+        self.fetches = []
+        self._ahead = credential_module.settings.credential_refresh_ahead_seconds
+        self._check = credential_module.settings.credential_refresh_check_seconds
+        self._poll = credential_module.PEER_POLL_SECONDS
+        credential_module.PEER_POLL_SECONDS = 0.01
+
+    def tearDown(self):
+        credential_module.settings.credential_refresh_ahead_seconds = self._ahead
+        credential_module.settings.credential_refresh_check_seconds = self._check
+        credential_module.PEER_POLL_SECONDS = self._poll
+
+    def make_store(self, expires_in=3600, delay=0.0):
+        store = CredentialStore(session_factory=self.session_factory)
+
+        async def fetcher():
+            self.fetches.append(1)
+            await asyncio.sleep(delay)
+            return f"token-{len(self.fetches)}", expires_in
+
+        store.register("baidu", fetcher)
+        return store
+
+    def test_token_cached_until_expiry(self):
+        store = self.make_store()
+
+        async def run():
+            return [await store.get("baidu") for _ in range(5)]
+
+        self.assertEqual(asyncio.run(run()), ["token-1"] * 5)
+        self.assertEqual(len(self.fetches), 1)
+        self.assertEqual(store.stats()["baidu"]["memory_hits"], 4)
+
+    def test_concurrent_callers_share_one_fetch(self):
+        store = self.make_store(delay=0.05)
+
+        async def run():
+            return await asyncio.gather(*(store.get("baidu") for _ in range(10)))
+
+        self.assertEqual(set(asyncio.run(run())), {"token-1"})
+        self.assertEqual(len(self.fetches), 1)
+
+    def test_token_shared_across_instances_via_database(self):
+        first = self.make_store()
+        asyncio.run(first.get("baidu"))
+
+        # 模拟重启 / 另一个 worker：内存为空，从数据库读取
+        second = self.make_store()
+        self.assertEqual(asyncio.run(second.get("baidu")), "token-1")
+        self.assertEqual(len(self.fetches), 1)
+        self.assertEqual(second.stats()["baidu"]["db_hits"], 1)
+
+    def test_expired_token_is_refetched(self):
+        store = self.make_store(expires_in=0)
+
+        async def run():
+            await store.get("baidu")
+            return await store.get("baidu")
+
+        self.assertEqual(asyncio.run(run()), "token-2")
+        with self.session_factory() as db:
+            row = db.query(ServiceCredential).filter_by(name="baidu").one()
+            self.assertEqual(row.token, "token-2")
+
+    def test_refresh_ahead_runs_in_background(self):
+        credential_module.settings.credential_refresh_ahead_seconds = 600
+        store = self.make_store(expires_in=300)
+
+        async def run():
+            first = await store.get("baidu")
+            # 剩余有效期低于提前量：仍返回当前令牌，后台刷新
+            second = await store.get("baidu")
+            await asyncio.sleep(0.01)
+            third = await store.get("baidu")
+            await store.stop()
+            return first, second, third
+
+        self.assertEqual(asyncio.run(run()), ("token-1", "token-1", "token-2"))
+
+    def test_refresh_loop_renews_expiring_tokens(self):
+        credential_module.settings.credential_refresh_ahead_seconds = 600
+        credential_module.settings.credential_refresh_check_seconds = 0.01
+        store = self.make_store(expires_in=300)
+
+        async def run():
+            await store.get("baidu")
+            self.fetches.clear()
+            store.start()
+            await asyncio.sleep(0.05)
+            await store.stop()
+
+        asyncio.run(run())
+        self.assertGreaterEqual(len(self.fetches), 1)
+
+    def test_invalidate_only_drops_rejected_token(self):
+        store = self.make_store()
+
+        async def run():
+            await store.get("baidu")
+            # 其他 worker 已刷新出新令牌，旧令牌失效不应删除新令牌
+            await store.invalidate("baidu", "stale-token")
+            kept = await store.get("baidu")
+            await store.invalidate("baidu", kept)
+            return kept, await store.get("baidu")
+
+        self.assertEqual(asyncio.run(run()), ("token-1", "token-2"))
+
+    def test_workers_share_one_fetch_through_lease(self):
+        # 两个实例共享数据库，模拟两个 worker：只有抢到租约的一方去申请新令牌
+        first = self.make_store(delay=0.05)
+        second = self.make_store(delay=0.05)
+
+        async def run():
+            return await asyncio.gather(first.get("baidu"), second.get("baidu"))
+
+        self.assertEqual(asyncio.run(run()), ["token-1", "token-1"])
+        self.assertEqual(len(self.fetches), 1)
+        # 谁先抢到租约取决于线程调度，另一方等待一次
+        waits = first.stats()["baidu"]["peer_waits"] + second.stats()["baidu"]["peer_waits"]
+        self.assertEqual(waits, 1)
+
+    def test_expired_lease_is_taken_over(self):
+        from datetime import datetime, timedelta
+
+        store = self.make_store()
+        with self.session_factory() as db:
+            # 持有者崩溃：租约已过期但从未写回令牌
+            db.add(ServiceCredential(
+                name="baidu", token="", expires_at=datetime.fromtimestamp(0),
+                lease_until=datetime.now() - timedelta(seconds=1),
+            ))
+            db.commit()
+
+        self.assertEqual(asyncio.run(store.get("baidu")), "token-1")
+        self.assertEqual(store.stats()["baidu"]["peer_waits"], 0)
+        with self.session_factory() as db:
+            row = db.query(ServiceCredential).filter_by(name="baidu").one()
+            self.assertEqual(row.token, "token-1")
+            self.assertIsNone(row.lease_until)
+
+    def test_fetch_failure_propagates(self):
+        store = CredentialStore(session_factory=self.session_factory)
+
+        async def failing():
+            raise ValueError("bad credentials")
+
+        store.register("wechat", failing)
+        with self.assertRaises(ValueError):
+            asyncio.run(store.get("wechat"))
+        self.assertEqual(store.stats()["wechat"]["failures"], 1)
+        with self.session_factory() as db:
+            # 失败后释放租约，其他 worker 可以立即重试
+            row = db.query(ServiceCredential).filter_by(name="wechat").one()
+            self.assertIsNone(row.lease_until)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1 import recognition
+from app.database.connection import Base
+from app.models.food import FoodTemp
+from app.schemas.recognition import RecognitionResult
+from app.services.food_service import FoodService
+from app.services.metrics import metrics
+
+DEEPSEEK_RESULT = {
+    "calories": 210,
+    "protein": 12,
+    "fat": 15,
+    "carbohydrate": 6,
+    "gi": 30,
+    "health_rating": "适量",
+    "health_tips": "少油少盐",
+    "contraindications": [{"condition_type": "高血压患者", "severity": "慎食", "reason": "偏咸"}],
+}
+
+
+class EnrichmentReuseTests(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        self.db = session_factory()
+        self.service = FoodService(self.db)
+        self.calls = []
+        self.flight_sessions = []
+        self._original = recognition.deepseek_service.get_nutrition_info
+        self._session_local = recognition.SessionLocal
+
+        def tracked_session():
+            session = session_factory()
+            self.flight_sessions.append(session)
+            return session
+
+        recognition.SessionLocal = tracked_session
+
+        async def fake_nutrition(name, baidu_calorie=None):
+            self.calls.append(name)
+            return DEEPSEEK_RESULT
+
+        recognition.deepseek_service.get_nutrition_info = fake_nutrition
+        metrics.reset()
+
+    def tearDown(self):
+        recognition.deepseek_service.get_nutrition_info = self._original
+        recognition.SessionLocal = self._session_local
+        self.db.close()
+        metrics.reset()
+
+    def enrich(self, name="小炒肉"):
+        top = RecognitionResult(name=name, confidence=0.8, baidu_calorie="200")
+        return asyncio.run(recognition._build_top_result_detail(top, self.service, "baidu", self.db))
+
+    def test_second_recognition_reuses_food_temp(self):
+        first = self.enrich()
+        second = self.enrich()
+
+        self.assertEqual(self.calls, ["小炒肉"])
+        self.assertEqual(second.nutrition.calories, 210)
+        self.assertEqual(second.health_tips, "少油少盐")
+        self.assertEqual(second.contraindications, first.contraindications)
+        self.assertEqual(recognition.enrichment_stats()["hits"], 1)
+        self.assertEqual(recognition.enrichment_stats()["misses"], 1)
+
+    def test_concurrent_enrichment_coalesced(self):
+        async def run():
+            tops = [RecognitionResult(name=name, confidence=0.8) for name in ("宫保鸡丁", "宫保鸡丁 ", "宫保鸡丁")]
+            return await asyncio.gather(*(
+                recognition._build_top_result_detail(top, self.service, "baidu", self.db) for top in tops
+            ))
+
+        results = asyncio.run(run())
+        self.assertEqual(len(self.calls), 1)
+        self.assertTrue(all(r.nutrition.calories == 210 for r in results))
+        self.assertEqual(self.db.query(FoodTemp).count(), 1)
+
+    def test_coalesced_write_uses_its_own_session(self):
+        def fail(*args, **kwargs):
+            raise AssertionError("合并任务不应通过发起方的 Session 写入")
+
+        self.service.upsert_temp_food = fail
+        result = self.enrich("鱼香肉丝")
+
+        self.assertEqual(result.nutrition.calories, 210)
+        self.assertEqual(len(self.flight_sessions), 1)
+        # 独立 Session 用完即关闭，不再持有任何对象
+        self.assertEqual(len(self.flight_sessions[0].identity_map), 0)
+        self.assertEqual(self.db.query(FoodTemp).filter(FoodTemp.name == "鱼香肉丝").count(), 1)
+
+    def test_stale_row_is_refreshed(self):
+        self.enrich()
+        temp = self.db.query(FoodTemp).filter(FoodTemp.name == "小炒肉").one()
+        temp.updated_at = datetime.now() - timedelta(days=recognition.settings.food_temp_max_age_days + 1)
+        self.db.commit()
+
+        self.enrich()
+        self.assertEqual(len(self.calls), 2)
+
+    def test_low_quality_source_not_reused_nor_overwriting(self):
+        self.service.upsert_temp_food("清炒时蔬", {"calories": 50}, source="baidu_ai", detail={"health_tips": "x"})
+        self.enrich("清炒时蔬")
+        self.assertEqual(self.calls, ["清炒时蔬"])
+
+        # 百度只有热量的数据不会覆盖刚写入的 DeepSeek 数据
+        self.service.upsert_temp_food("清炒时蔬", {"calories": 80}, source="baidu_ai")
+        temp = self.db.query(FoodTemp).filter(FoodTemp.name == "清炒时蔬").one()
+        self.assertEqual((temp.source, temp.calories), ("deepseek_ai", 210))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import random
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.connection import Base
+from app.models.food import Food, FoodTemp
+from app.services.food_search_index import food_search_index
+from app.services.food_service import FoodService, settings
+
+
+class FoodSearchIndexTests(unittest.TestCase):
+    def setUp(self):
+        # 后台重建在其他线程执行，内存库需共享同一连接
+        engine = create_engine(
+            "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.service = FoodService(self.db)
+        food_search_index.invalidate()
+
+    def tearDown(self):
+        self.db.close()
+        food_search_index.invalidate()
+        food_search_index.check_seconds = settings.food_search_check_seconds
+
+    def add_foods(self, *rows):
+        for name, alias in rows:
+            self.db.add(Food(name=name, alias=alias, calories=100, protein=1, fat=1, carbohydrate=1))
+        self.db.commit()
+
+    def names(self, keyword, limit=10):
+        return [item.name for item in self.service.search_foods(keyword, limit)]
+
+    def test_ranking_exact_prefix_alias_contains(self):
+        self.add_foods(
+            ("炒西红柿", None),
+            ("番茄炒蛋", "西红柿炒鸡蛋"),
+            ("西红柿蛋汤", None),
+            ("西红柿", "番茄"),
+        )
+        self.assertEqual(self.names("西红柿"), ["西红柿", "西红柿蛋汤", "番茄炒蛋", "炒西红柿"])
+        self.assertEqual(self.names("番茄"), ["番茄炒蛋", "西红柿"])
+        self.assertEqual(self.names("西红柿", limit=2), ["西红柿", "西红柿蛋汤"])
+        # 单字：别名匹配优先，其余同级按 id
+        self.assertEqual(self.names("柿"), ["番茄炒蛋", "炒西红柿", "西红柿蛋汤", "西红柿"])
+        self.assertEqual(self.names("红柿汤"), [])
+
+    def test_latin_keyword_is_case_insensitive(self):
+        self.add_foods(("Coca Cola", "可口可乐"), ("百事可乐", "Pepsi"))
+        self.assertEqual(self.names("cola"), ["Coca Cola"])
+        self.assertEqual(self.names("PEPSI"), ["百事可乐"])
+
+    def test_temp_upsert_is_visible_without_rebuild(self):
+        self.add_foods(("咖喱鸡", None))
+        self.assertEqual(self.names("咖喱"), ["咖喱鸡"])
+        rebuilds = food_search_index.rebuilds
+        updates = food_search_index.incremental_updates
+
+        self.service.upsert_temp_food("咖喱牛腩", {"calories": 150}, "deepseek_ai")
+        self.assertEqual(self.names("咖喱"), ["咖喱鸡", "咖喱牛腩"])
+        self.assertEqual(food_search_index.rebuilds, rebuilds)
+        self.assertEqual(food_search_index.incremental_updates, updates + 1)
+
+    def test_external_writes_rebuild_after_check(self):
+        self.assertEqual(self.names("燕麦"), [])
+        refreshes = food_search_index.background_refreshes
+        # 模拟导入脚本直接写表
+        self.add_foods(("燕麦粥", None))
+        self.assertEqual(self.names("燕麦"), [])
+
+        food_search_index.check_seconds = 0
+        # 发现外部写入后在后台重建，本次搜索仍使用旧索引
+        self.assertEqual(self.names("燕麦"), [])
+        food_search_index.wait_refresh(5)
+        self.assertEqual(self.names("燕麦"), ["燕麦粥"])
+        self.assertEqual(food_search_index.background_refreshes, refreshes + 1)
+
+    def test_own_upsert_does_not_hide_external_writes(self):
+        self.assertEqual(self.names("燕麦"), [])
+        # 其他 worker 写入后，本进程又写入一条临时食物
+        self.db.add(FoodTemp(name="燕麦牛奶", calories=1, protein=0, fat=0, carbohydrate=0))
+        self.db.commit()
+        self.service.upsert_temp_food("燕麦饼干", {"calories": 400}, "fatsecret")
+        self.assertEqual(self.names("燕麦"), ["燕麦饼干"])
+
+        food_search_index.check_seconds = 0
+        self.names("燕麦")
+        food_search_index.wait_refresh(5)
+        self.assertEqual(self.names("燕麦"), ["燕麦牛奶", "燕麦饼干"])
+
+    def test_own_upsert_alone_does_not_trigger_rebuild(self):
+        self.add_foods(("咖喱鸡", None))
+        self.assertEqual(self.names("咖喱"), ["咖喱鸡"])
+        self.service.upsert_temp_food("咖喱牛腩", {"calories": 150}, "deepseek_ai")
+        self.service.upsert_temp_food("咖喱牛腩", {"calories": 160}, "deepseek_ai")
+
+        food_search_index.check_seconds = 0
+        rebuilds = food_search_index.rebuilds
+        self.assertEqual(self.names("咖喱"), ["咖喱鸡", "咖喱牛腩"])
+        food_search_index.wait_refresh(5)
+        self.assertEqual(food_search_index.rebuilds, rebuilds)
+
+    def test_matches_like_backend(self):
+        rng = random.Random(5)
+        chars = "鸡蛋牛肉炒饭面汤番茄西红柿豆腐青菜"
+        names = {"".join(rng.choice(chars) for _ in range(rng.randint(2, 5))) for _ in range(300)}
+        self.add_foods(*[(name, rng.choice([None, "".join(rng.sample(chars, 3))])) for name in sorted(names)])
+        for name in sorted(names)[:40]:
+            self.db.add(FoodTemp(name=name[::-1] + "临时", calories=1, protein=0, fat=0, carbohydrate=0))
+        self.db.commit()
+
+        keywords = ["鸡", "番茄", "牛肉炒", "临时", "汤面", "西红柿炒饭", "无"]
+        original = settings.food_search_backend
+        try:
+            settings.food_search_backend = "like"
+            expected = {keyword: self.names(keyword, 20) for keyword in keywords}
+        finally:
+            settings.food_search_backend = original
+        for keyword in keywords:
+            self.assertEqual(self.names(keyword, 20), expected[keyword], keyword)
+
+
+if __name__ == "__main__":
+    unittest.main()
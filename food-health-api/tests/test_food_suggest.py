@@ -0,0 +1,151 @@
+import asyncio
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.v1 import food
+from app.database.connection import Base
+from app.models.food import Food, FoodTemp
+from app.services import food_suggest
+from app.services.food_service import FoodService
+from app.services.food_suggest import DELTA_MAX, SCAN_THRESHOLD, food_suggest_index
+
+
+class FoodSuggestTests(unittest.TestCase):
+    def setUp(self):
+        # 后台重建在其他线程执行，内存库需共享同一连接
+        engine = create_engine(
+            "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.add_foods(
+            ("西红柿炒鸡蛋", "番茄炒蛋"),
+            ("西红柿", "番茄,洋柿子"),
+            ("西兰花", None),
+            ("Coca Cola", "可口可乐"),
+        )
+        self.db.add(FoodTemp(name="西红柿牛腩", calories=1, protein=0, fat=0, carbohydrate=0, source="fatsecret"))
+        self.db.commit()
+        food_suggest_index.invalidate()
+
+    def tearDown(self):
+        self.db.close()
+        food_suggest_index.invalidate()
+        food_suggest_index.check_seconds = food_suggest.settings.food_search_check_seconds
+
+    def add_foods(self, *rows):
+        for name, alias in rows:
+            self.db.add(Food(name=name, alias=alias, calories=100, protein=1, fat=1, carbohydrate=1))
+        self.db.commit()
+
+    def suggest(self, keyword, limit=10):
+        return [item["name"] for item in food_suggest_index.suggest(self.db, keyword, limit)]
+
+    def test_prefix_on_name_and_alias(self):
+        # 标准库食物优先于临时食物，名称短的优先
+        self.assertEqual(self.suggest("西红"), ["西红柿", "西红柿炒鸡蛋", "西红柿牛腩"])
+        self.assertEqual(self.suggest("番茄"), ["西红柿", "西红柿炒鸡蛋"])
+        self.assertEqual(self.suggest("洋柿"), ["西红柿"])
+        self.assertEqual(self.suggest("coca c"), ["Coca Cola"])
+        self.assertEqual(self.suggest("西红", limit=1), ["西红柿"])
+        self.assertEqual(self.suggest("红柿"), [])
+
+    def test_exact_key_first(self):
+        self.add_foods(("鸡蛋", None), ("鸡", None), ("鸡蛋羹", None))
+        food_suggest_index.invalidate()
+        self.assertEqual(self.suggest("鸡蛋"), ["鸡蛋", "鸡蛋羹"])
+        self.assertEqual(self.suggest("鸡")[0], "鸡")
+
+    @unittest.skipIf(food_suggest.lazy_pinyin is None, "pypinyin 未安装")
+    def test_pinyin_and_initials(self):
+        self.assertEqual(self.suggest("xhs"), ["西红柿", "西红柿炒鸡蛋", "西红柿牛腩"])
+        self.assertEqual(self.suggest("xihong"), ["西红柿", "西红柿炒鸡蛋", "西红柿牛腩"])
+        self.assertEqual(self.suggest("XL"), ["西兰花"])
+        # 别名的拼音
+        self.assertEqual(self.suggest("fanqie"), ["西红柿", "西红柿炒鸡蛋"])
+
+    def test_temp_upsert_is_added_incrementally(self):
+        self.assertEqual(self.suggest("咖喱"), [])
+        rebuilds = food_suggest_index.rebuilds
+        FoodService(self.db).upsert_temp_food("咖喱鱼丸", {"calories": 120}, "deepseek_ai")
+        self.assertEqual(food_suggest_index.suggest(self.db, "咖喱"), [{"name": "咖喱鱼丸", "data_source": "deepseek_ai"}])
+        self.assertEqual(food_suggest_index.rebuilds, rebuilds)
+
+    def test_hot_prefix_cache_is_updated(self):
+        for i in range(SCAN_THRESHOLD + 50):
+            self.db.add(FoodTemp(name=f"测试临时食物名称很长{i}", calories=1, protein=0, fat=0, carbohydrate=0))
+        self.db.commit()
+        food_suggest_index.invalidate()
+        self.assertEqual(len(self.suggest("测试", limit=20)), 20)
+        self.assertIn("测试", food_suggest_index._hot)
+
+        FoodService(self.db).upsert_temp_food("测试短名", {"calories": 1}, "fatsecret")
+        self.assertEqual(self.suggest("测试")[0], "测试短名")
+
+    @unittest.skipIf(food_suggest.lazy_pinyin is None, "pypinyin 未安装")
+    def test_overlapping_keys_inserted_once_per_hot_prefix(self):
+        for i in range(SCAN_THRESHOLD + 50):
+            self.db.add(FoodTemp(name=f"测试临时食物名称很长{i}", calories=1, protein=0, fat=0, carbohydrate=0))
+        self.db.commit()
+        food_suggest_index.invalidate()
+        self.assertEqual(len(self.suggest("c", limit=20)), 20)
+        self.assertIn("c", food_suggest_index._hot)
+
+        # 全拼 ceshiduanming 与首字母 csdm 共享前缀 c
+        FoodService(self.db).upsert_temp_food("测试短名", {"calories": 1}, "fatsecret")
+        hot = food_suggest_index._hot["c"]
+        self.assertEqual(len(hot), len(set(hot)))
+        names = self.suggest("c", limit=20)
+        self.assertEqual(names[:2], ["Coca Cola", "测试短名"])
+        self.assertEqual(len(names), 20)
+
+    def test_external_writes_visible_after_check(self):
+        self.assertEqual(self.suggest("西红"), ["西红柿", "西红柿炒鸡蛋", "西红柿牛腩"])
+        # 其他 worker / 导入脚本：新增、改名、删除
+        self.add_foods(("西红柿鸡蛋面", None))
+        self.db.query(FoodTemp).filter(FoodTemp.name == "西红柿牛腩").delete()
+        self.db.commit()
+        # 本进程自己的写入不能掩盖上面的外部写入
+        FoodService(self.db).upsert_temp_food("西红柿汤", {"calories": 20}, "fatsecret")
+        self.assertEqual(self.suggest("西红"), ["西红柿", "西红柿炒鸡蛋", "西红柿汤", "西红柿牛腩"])
+
+        food_suggest_index.check_seconds = 0
+        self.suggest("西红")
+        food_suggest_index.wait_refresh(5)
+        self.assertEqual(self.suggest("西红"), ["西红柿", "西红柿炒鸡蛋", "西红柿鸡蛋面", "西红柿汤"])
+
+    def test_own_writes_alone_do_not_trigger_rebuild(self):
+        self.suggest("西红")
+        FoodService(self.db).upsert_temp_food("西红柿汤", {"calories": 20}, "fatsecret")
+        FoodService(self.db).upsert_temp_food("西红柿汤", {"calories": 25}, "fatsecret")
+        rebuilds = food_suggest_index.rebuilds
+
+        food_suggest_index.check_seconds = 0
+        self.suggest("西红")
+        food_suggest_index.wait_refresh(5)
+        self.assertEqual(food_suggest_index.rebuilds, rebuilds)
+
+    def test_delta_keys_merged_into_main_list(self):
+        self.suggest("西红")
+        keys = len(food_suggest_index._keys)
+        for i in range(DELTA_MAX + 10):
+            food_suggest_index.add_temp(self.db, FoodTemp(id=1000 + i, name=f"增量食物{i}", source="fatsecret"))
+
+        self.assertLess(len(food_suggest_index._delta), DELTA_MAX)
+        self.assertGreater(len(food_suggest_index._keys), keys + DELTA_MAX)
+        self.assertEqual(self.suggest("增量食物12")[0], "增量食物12")
+        self.assertEqual(self.suggest("增量", limit=3), ["增量食物0", "增量食物1", "增量食物2"])
+
+    def test_endpoint_registered_before_detail_route(self):
+        paths = [route.path for route in food.router.routes]
+        self.assertLess(paths.index("/food/suggest"), paths.index("/food/{name}"))
+
+        response = asyncio.run(food.suggest_foods(keyword="西兰", limit=5, db=self.db))
+        self.assertEqual(response["data"], [{"name": "西兰花", "data_source": "database"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.services.http_client import HTTPClientRegistry
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HTTPClientRegistryTests(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        registry = HTTPClientRegistry()
+
+        async def run():
+            client = registry.get("wechat")
+            self.assertIs(client, registry.get("wechat"))
+            for _ in range(3):
+                response = await client.get(self.url)
+                self.assertEqual(response.status_code, 200)
+            stats = registry.stats()["clients"]["wechat"]
+            await registry.aclose()
+            return stats
+
+        stats = asyncio.run(run())
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["new_connections"], 1)
+        self.assertAlmostEqual(stats["reuse_rate"], 2 / 3, places=3)
+        self.assertEqual(stats["connect_failures"], 0)
+
+    def test_client_recreated_after_close(self):
+        registry = HTTPClientRegistry()
+
+        async def run():
+            first = registry.get("baidu")
+            await registry.aclose()
+            second = registry.get("baidu")
+            await registry.aclose()
+            return first, second
+
+        first, second = asyncio.run(run())
+        self.assertIsNot(first, second)
+        self.assertTrue(first.is_closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
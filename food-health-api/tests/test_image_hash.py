@@ -0,0 +1,46 @@
+import io
+import unittest
+
+from app.services.image_hash import Image, PerceptualHashIndex, compute_dhash
+
+
+class PerceptualHashIndexTests(unittest.TestCase):
+    def test_find_within_distance(self):
+        index = PerceptualHashIndex(max_distance=4, max_entries=10, ttl_seconds=None)
+        base = 0x0F0F_F0F0_1234_ABCD
+        index.add(base, "番茄炒蛋")
+
+        payload, distance = index.find(base ^ 0b1011)
+        self.assertEqual(payload, "番茄炒蛋")
+        self.assertEqual(distance, 3)
+        self.assertIsNone(index.find(base ^ 0b11111))
+
+    def test_eviction_cleans_buckets(self):
+        index = PerceptualHashIndex(max_distance=2, max_entries=1, ttl_seconds=None)
+        index.add(1, "a")
+        index.add((1 << 64) - 2, "b")
+        self.assertEqual(len(index), 1)
+        self.assertIsNone(index.find(1))
+        self.assertEqual(index.find((1 << 64) - 2)[0], "b")
+
+
+@unittest.skipIf(Image is None, "Pillow not installed")
+class DHashTests(unittest.TestCase):
+    def _jpeg(self, quality):
+        img = Image.linear_gradient("L").resize((320, 240)).convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=quality)
+        return buf.getvalue()
+
+    def test_recompressed_image_is_close(self):
+        h1 = compute_dhash(self._jpeg(95))
+        h2 = compute_dhash(self._jpeg(40))
+        self.assertIsNotNone(h1)
+        self.assertLessEqual((h1 ^ h2).bit_count(), 6)
+
+    def test_invalid_image_returns_none(self):
+        self.assertIsNone(compute_dhash(b"not an image"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import io
+import unittest
+
+from app.services.image_preprocess import Image, preprocess_image
+
+
+@unittest.skipIf(Image is None, "Pillow not installed")
+class ImagePreprocessTests(unittest.TestCase):
+    def _encode(self, img, fmt, **kwargs):
+        buf = io.BytesIO()
+        img.save(buf, format=fmt, **kwargs)
+        return buf.getvalue()
+
+    def _open(self, data):
+        return Image.open(io.BytesIO(data))
+
+    def test_large_photo_is_downscaled(self):
+        img = Image.effect_noise((3000, 2000), 40).convert("RGB")
+        data = self._encode(img, "JPEG", quality=95)
+
+        result = preprocess_image(data, "image/jpeg", max_edge=1280, quality=80)
+
+        self.assertTrue(result.transformed)
+        self.assertEqual(max(result.width, result.height), 1280)
+        self.assertGreater(result.bytes_saved, 0)
+        self.assertEqual(result.mime_type, "image/jpeg")
+        self.assertEqual(self._open(result.data).size, (1280, 853))
+
+    def test_exif_orientation_is_applied(self):
+        img = Image.new("RGB", (400, 200), (200, 80, 40))
+        exif = img.getexif()
+        exif[0x0112] = 6  # 顺时针旋转 90°
+        data = self._encode(img, "JPEG", exif=exif.tobytes())
+
+        result = preprocess_image(data, "image/jpeg", max_edge=1280)
+
+        self.assertTrue(result.transformed)
+        self.assertEqual(self._open(result.data).size, (200, 400))
+
+    def test_png_with_alpha_becomes_jpeg(self):
+        img = Image.new("RGBA", (64, 64), (0, 0, 0, 0))
+        data = self._encode(img, "PNG")
+
+        result = preprocess_image(data, "image/png", max_edge=1280)
+
+        self.assertEqual(result.mime_type, "image/jpeg")
+        self.assertEqual(self._open(result.data).getpixel((10, 10)), (255, 255, 255))
+
+    def test_small_jpeg_kept_as_is(self):
+        data = self._encode(Image.effect_noise((128, 128), 60).convert("RGB"), "JPEG", quality=30)
+
+        result = preprocess_image(data, "image/jpeg", max_edge=1280, quality=95)
+
+        self.assertFalse(result.transformed)
+        self.assertEqual(result.data, data)
+
+    def test_invalid_image_returns_original(self):
+        result = preprocess_image(b"not an image", "image/jpeg")
+        self.assertFalse(result.transformed)
+        self.assertEqual(result.data, b"not an image")
+
+
+if __name__ == "__main__":
+    unittest.main()
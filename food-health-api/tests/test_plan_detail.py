@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1 import plan
+from app.database.connection import Base
+from app.models.diet_plan import DietPlan
+from app.services.plan_persistence import save_ai_plan
+
+PLAN_DATA = {
+    "name": "增肌计划",
+    "days": [
+        {
+            "day_index": index,
+            "title": f"第{index}天",
+            "meals": [
+                {"meal_type": "dinner", "food_name": "牛肉", "amount_desc": "150g", "calories": 300},
+                {"meal_type": "breakfast", "food_name": "鸡蛋", "amount_desc": "2个", "calories": 140},
+            ],
+        }
+        # 乱序写入，详情仍按 day_index 排序
+        for index in (3, 1, 2, 7, 5, 4, 6)
+    ],
+}
+
+
+class PlanDetailTests(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.plan = save_ai_plan(self.db, PLAN_DATA, "gain_muscle", "增肌", "无", "画像", 1)
+        self.plan_id = self.plan.id
+        self.db.expunge_all()
+        plan.plan_detail_cache.clear()
+
+        self.queries = 0
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def count(conn, cursor, statement, parameters, context, executemany):
+            self.queries += 1
+
+    def tearDown(self):
+        self.db.close()
+        plan.plan_detail_cache.clear()
+
+    def test_detail_loaded_without_n_plus_one(self):
+        data = plan._get_plan_detail_payload(self.plan_id, self.db)
+
+        # updated_at + 计划 + 全部天 + 全部餐，与天数无关
+        self.assertEqual(self.queries, 4)
+        self.assertEqual([day["day_index"] for day in data["days"]], list(range(1, 8)))
+        self.assertEqual([meal["food_name"] for meal in data["days"][0]["meals"]], ["牛肉", "鸡蛋"])
+
+    def test_cached_detail_costs_one_query(self):
+        first = plan._get_plan_detail_payload(self.plan_id, self.db)
+        self.queries = 0
+        second = plan._get_plan_detail_payload(self.plan_id, self.db)
+
+        self.assertIs(first, second)
+        self.assertEqual(self.queries, 1)
+
+    def test_updated_plan_is_reloaded(self):
+        plan._get_plan_detail_payload(self.plan_id, self.db)
+        row = self.db.get(DietPlan, self.plan_id)
+        row.name = "增肌计划（修订）"
+        row.updated_at = datetime.now() + timedelta(seconds=1)
+        self.db.commit()
+
+        data = plan._get_plan_detail_payload(self.plan_id, self.db)
+        self.assertEqual(data["name"], "增肌计划（修订）")
+
+    def test_endpoints_serve_cached_payload(self):
+        async def run():
+            detail = await plan.get_plan_detail(self.plan_id, db=self.db)
+            self.queries = 0
+            recommended = await plan.get_recommended_plan(user_id=1, db=self.db)
+            return detail, recommended
+
+        detail, recommended = asyncio.run(run())
+        self.assertEqual(recommended["data"], detail["data"])
+        # 推荐只查候选列表，详情直接命中缓存
+        self.assertEqual(self.queries, 1)
+
+    def test_missing_plan_returns_404(self):
+        with self.assertRaises(plan.HTTPException) as ctx:
+            plan._get_plan_detail_payload(9999, self.db)
+        self.assertEqual(ctx.exception.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.v1 import plan
+from app.database.connection import Base
+from app.models.diet_plan import DietPlan
+from app.services.single_flight import single_flights
+
+PLAN_DATA = {
+    "name": "增肌计划",
+    "days": [
+        {"day_index": 1, "title": "第1天", "meals": [{"meal_type": "lunch", "food_name": "牛肉", "calories": 300}]},
+    ],
+}
+
+
+class PlanGenerateDedupTests(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        self.db = session_factory()
+        self._session_local = plan.SessionLocal
+        self._generate = plan.deepseek_service.generate_diet_plan
+        plan.SessionLocal = session_factory
+        plan.plan_template_cache.clear()
+        self.calls = 0
+
+        async def slow_generate(*args, **kwargs):
+            self.calls += 1
+            await asyncio.sleep(0.05)
+            return PLAN_DATA
+
+        plan.deepseek_service.generate_diet_plan = slow_generate
+        self.flight = single_flights.get("plan_generate")
+
+    def tearDown(self):
+        plan.SessionLocal = self._session_local
+        plan.deepseek_service.generate_diet_plan = self._generate
+        plan.plan_template_cache.clear()
+        self.db.close()
+
+    def run_concurrently(self, requests):
+        async def run():
+            return await asyncio.gather(*(
+                plan.generate_plan(force_new=True, payload=payload, user_id=user_id, db=self.db)
+                for user_id, payload in requests
+            ))
+
+        return [response["data"] for response in asyncio.run(run())]
+
+    def test_double_tap_shares_one_generation(self):
+        coalesced = self.flight.coalesced
+        results = self.run_concurrently([(5, None), (5, None), (5, None)])
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual({data["id"] for data in results}, {results[0]["id"]})
+        self.assertEqual(self.db.query(DietPlan).count(), 1)
+        self.assertEqual(self.flight.coalesced - coalesced, 2)
+
+    def test_different_users_generate_separately(self):
+        results = self.run_concurrently([(5, None), (6, None)])
+
+        self.assertEqual(self.calls, 2)
+        self.assertNotEqual(results[0]["id"], results[1]["id"])
+
+    def test_guests_coalesced_by_payload(self):
+        same = plan.PlanGenerateRequest(health_goal="gain_muscle")
+        other = plan.PlanGenerateRequest(health_goal="lose_weight")
+        results = self.run_concurrently([(None, same), (None, same), (None, other)])
+
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(results[0]["id"], results[1]["id"])
+        self.assertNotEqual(results[0]["id"], results[2]["id"])
+
+    def test_cancelled_caller_does_not_abort_generation(self):
+        async def run():
+            first = asyncio.create_task(plan.generate_plan(force_new=True, payload=None, user_id=9, db=self.db))
+            await asyncio.sleep(0.01)
+            second = asyncio.create_task(plan.generate_plan(force_new=True, payload=None, user_id=9, db=self.db))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second
+
+        data = asyncio.run(run())["data"]
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(data["name"], "增肌计划")
+
+
+if __name__ == "__main__":
+    unittest.main()
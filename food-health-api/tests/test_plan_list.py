@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1 import plan
+from app.database.connection import Base
+from app.models.diet_plan import DietPlan
+
+BASE_TIME = datetime(2026, 3, 1, 8, 0)
+
+
+class PlanListTests(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        for index in range(25):
+            self.db.add(DietPlan(
+                name=f"计划{index}",
+                description="很长的简介" * 50,
+                tags="减脂,高蛋白" if index % 2 else "增肌",
+                source="ai_generated" if index % 3 else "preset",
+                author_id=index % 4,
+                # 每 5 条共用同一创建时间，翻页时按 id 区分
+                created_at=BASE_TIME + timedelta(minutes=index // 5),
+            ))
+        self.db.commit()
+
+        self.statements = []
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.statements.append(statement)
+
+    def tearDown(self):
+        self.db.close()
+
+    def list_plans(self, **kwargs):
+        params = {"tag": None, "source": None, "cursor": None, "limit": 20, "fields": None, "compact": False}
+        params.update(kwargs)
+        return asyncio.run(plan.list_plans(db=self.db, **params))["data"]
+
+    def test_cursor_pages_cover_all_rows_once(self):
+        ids = []
+        cursor = None
+        pages = 0
+        while True:
+            data = self.list_plans(cursor=cursor, limit=7)
+            ids.extend(item["id"] for item in data["items"])
+            pages += 1
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(pages, 4)
+        self.assertEqual(len(ids), 25)
+        self.assertEqual(len(set(ids)), 25)
+        expected = [row.id for row in self.db.query(DietPlan).order_by(DietPlan.created_at.desc(), DietPlan.id.desc())]
+        self.assertEqual(ids, expected)
+
+    def test_filters_apply_across_pages(self):
+        first = self.list_plans(source="preset", limit=5)
+        second = self.list_plans(source="preset", limit=5, cursor=first["next_cursor"])
+
+        self.assertEqual(len(first["items"]) + len(second["items"]), 9)
+        self.assertIsNone(second["next_cursor"])
+        self.assertTrue(all(item["source"] == "preset" for item in first["items"] + second["items"]))
+
+    def test_fields_projection_queries_only_selected_columns(self):
+        data = self.list_plans(fields="name, created_at,name", limit=3)
+
+        self.assertEqual(list(data["items"][0]), ["id", "name", "created_at"])
+        self.assertNotIn("description", self.statements[-1])
+        datetime.fromisoformat(data["items"][0]["created_at"])
+
+    def test_compact_mode(self):
+        data = self.list_plans(fields="name,source", compact=True, limit=2)
+
+        self.assertEqual(data["fields"], ["id", "name", "source"])
+        self.assertEqual(len(data["rows"]), 2)
+        self.assertEqual(len(data["rows"][0]), 3)
+        self.assertIsNotNone(data["next_cursor"])
+
+    def test_invalid_parameters_rejected(self):
+        for kwargs in ({"fields": "password"}, {"cursor": "not-a-cursor"}):
+            with self.assertRaises(plan.HTTPException) as ctx:
+                self.list_plans(**kwargs)
+            self.assertEqual(ctx.exception.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import re
+import unittest
+
+import httpx
+
+from app.services import deepseek_service as deepseek_module
+from app.services.deepseek_service import DeepSeekService
+from app.services.metrics import metrics
+
+OUTLINE = {
+    "name": "高效减脂7日计划",
+    "description": "低脂高蛋白",
+    "tags": ["减脂"],
+    "days": [{"day_index": i, "title": f"主题{i}", "focus": f"食材{i}"} for i in range(1, 8)],
+}
+
+
+def make_day(index):
+    return {
+        "day_index": index,
+        "title": f"主题{index}",
+        "meals": [
+            {"meal_type": "breakfast", "food_name": "燕麦", "amount_desc": "1碗", "calories": 300},
+            {"meal_type": "lunch", "food_name": f"食材{index}", "amount_desc": "150g", "calories": "400kcal"},
+            {"meal_type": "dinner", "food_name": "蔬菜", "amount_desc": "1盘", "calories": 200},
+        ],
+    }
+
+
+def completion(content):
+    return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+
+class FakeDeepSeek:
+    """按 prompt 内容返回大纲 / 单日餐单，记录并发数"""
+
+    def __init__(self, delay=0.02, bad_days=None, outline=OUTLINE):
+        self.delay = delay
+        self.bad_days = dict(bad_days or {})  # day_index -> 返回无效数据的次数
+        self.outline = outline
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def handler(self, request):
+        prompt = json.loads(request.content)["messages"][0]["content"]
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+
+        if "一周大纲" in prompt:
+            self.calls.append("outline")
+            if self.outline is None:
+                return completion("抱歉，无法生成")
+            return completion(json.dumps(self.outline, ensure_ascii=False))
+
+        match = re.search(r"请只生成第(\d+)天", prompt)
+        if match:
+            index = int(match.group(1))
+            self.calls.append(index)
+            if self.bad_days.get(index):
+                self.bad_days[index] -= 1
+                return completion('{"day_index": %d, "title": "缺少餐单"}' % index)
+            return completion(json.dumps(make_day(index), ensure_ascii=False))
+
+        self.calls.append("single")
+        plan = dict(OUTLINE, days=[make_day(i) for i in range(1, 8)])
+        return completion(json.dumps(plan, ensure_ascii=False))
+
+    def get(self, name):
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+class ParallelPlanGenerationTests(unittest.TestCase):
+    def setUp(self):
+        self.settings = deepseek_module.settings
+        self._saved = (
+            deepseek_module.http_clients,
+            self.settings.plan_generation_strategy,
+            self.settings.plan_parallel_concurrency,
+            self.settings.plan_day_max_retries,
+        )
+        self.settings.plan_generation_strategy = "parallel"
+        self.settings.plan_parallel_concurrency = 3
+        self.settings.plan_day_max_retries = 1
+        self.service = DeepSeekService()
+        self.service.api_key = "test-key"
+        metrics.reset()
+
+    def tearDown(self):
+        (
+            deepseek_module.http_clients,
+            self.settings.plan_generation_strategy,
+            self.settings.plan_parallel_concurrency,
+            self.settings.plan_day_max_retries,
+        ) = self._saved
+
+    def generate(self, fake):
+        deepseek_module.http_clients = fake
+        return asyncio.run(self.service.generate_diet_plan("画像", "减脂", "无"))
+
+    def test_days_generated_concurrently_with_cap(self):
+        fake = FakeDeepSeek()
+        plan = self.generate(fake)
+
+        self.assertEqual(plan["name"], "高效减脂7日计划")
+        self.assertEqual([day["day_index"] for day in plan["days"]], list(range(1, 8)))
+        self.assertEqual(plan["days"][0]["meals"][1]["calories"], 400)
+        self.assertEqual(fake.calls[0], "outline")
+        self.assertEqual(fake.peak, 3)
+
+    def test_invalid_day_is_retried_alone(self):
+        fake = FakeDeepSeek(bad_days={3: 1})
+        plan = self.generate(fake)
+
+        self.assertEqual(len(plan["days"]), 7)
+        self.assertEqual(fake.calls.count(3), 2)
+        self.assertEqual(len(fake.calls), 1 + 7 + 1)
+        self.assertEqual(metrics.counter("plan.parallel.day_retries"), 1)
+
+    def test_day_failing_every_attempt_falls_back_to_single_call(self):
+        fake = FakeDeepSeek(bad_days={5: 2})
+        plan = self.generate(fake)
+
+        # 不保存缺天的食谱
+        self.assertEqual([day["day_index"] for day in plan["days"]], list(range(1, 8)))
+        self.assertEqual(fake.calls[-1], "single")
+        self.assertEqual(metrics.counter("plan.parallel.day_failed"), 1)
+        self.assertEqual(metrics.counter("plan.parallel.incomplete"), 1)
+
+    def test_short_outline_falls_back_to_single_call(self):
+        fake = FakeDeepSeek(outline=dict(OUTLINE, days=OUTLINE["days"][:5]))
+        plan = self.generate(fake)
+
+        self.assertEqual(fake.calls, ["outline", "single"])
+        self.assertEqual(len(plan["days"]), 7)
+
+    def test_outline_failure_falls_back_to_single_call(self):
+        fake = FakeDeepSeek(outline=None)
+        plan = self.generate(fake)
+
+        self.assertEqual(fake.calls, ["outline", "single"])
+        self.assertEqual(len(plan["days"]), 7)
+
+    def test_single_strategy_makes_one_call(self):
+        self.settings.plan_generation_strategy = "single"
+        fake = FakeDeepSeek()
+        plan = self.generate(fake)
+
+        self.assertEqual(fake.calls, ["single"])
+        self.assertEqual(len(plan["days"]), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
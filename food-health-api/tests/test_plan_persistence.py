@@ -0,0 +1,74 @@
+import unittest
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database.connection import Base
+from app.models.diet_plan import DietPlan, DietPlanDay, DietPlanMeal
+from app.services.plan_persistence import persist_generated_plan
+
+PLAN_DATA = {
+    "name": "素食减脂计划",
+    "tags": ["减脂"],
+    "days": [
+        {
+            "day_index": index,
+            "title": f"第{index}天",
+            "meals": [
+                {"meal_type": "breakfast", "food_name": "燕麦", "amount_desc": "1碗", "calories": "300kcal"},
+                {"meal_type": "lunch", "food_name": "豆腐", "amount_desc": "200g", "calories": 250},
+                {"meal_type": "dinner", "food_name": "青菜", "amount_desc": "1盘", "calories": 120},
+            ],
+        }
+        for index in range(1, 8)
+    ],
+}
+
+
+class PlanPersistenceTests(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.commits = 0
+
+        @event.listens_for(self.db, "after_commit")
+        def count_commit(session):
+            self.commits += 1
+
+    def tearDown(self):
+        self.db.close()
+
+    def persist(self, plan_data):
+        return persist_generated_plan(self.db, plan_data, "lose_weight", "减脂", "素食", "画像", 7)
+
+    def test_ai_plan_saved_in_one_commit(self):
+        plan = self.persist(PLAN_DATA)
+
+        self.assertEqual(self.commits, 1)
+        self.assertEqual(plan.source, "ai_generated")
+        self.assertIn("素食", plan.tags.split(","))
+        self.assertEqual([day.day_index for day in plan.days], list(range(1, 8)))
+        self.assertEqual(plan.days[0].total_calories, 670)
+        self.assertEqual([meal.sort_order for meal in plan.days[0].meals], [1, 2, 3])
+        self.assertEqual(self.db.query(DietPlanMeal).count(), 21)
+
+    def test_mock_plan_saved_in_one_commit(self):
+        plan = self.persist(None)
+
+        self.assertEqual(self.commits, 1)
+        self.assertEqual(plan.source, "mock_data")
+        self.assertEqual(len(plan.days[0].meals), 4)
+
+    def test_failed_ai_plan_leaves_no_partial_rows(self):
+        broken = dict(PLAN_DATA, days=PLAN_DATA["days"][:2] + [{"day_index": None, "meals": []}])
+        plan = self.persist(broken)
+
+        # 第三天违反非空约束：整份 AI 食谱回滚，只留下 Mock 食谱
+        self.assertEqual(plan.source, "mock_data")
+        self.assertEqual(self.db.query(DietPlan).count(), 1)
+        self.assertEqual(self.db.query(DietPlanDay).count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,235 @@
+import asyncio
+import unittest
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.v1 import plan
+from app.database.connection import Base
+from app.models.diet_plan import DietPlan
+from app.models.user import User
+from app.models.user_meal import MealRecord
+from app.services import plan_pregeneration as pregen_module
+from app.services.plan_pregeneration import PlanPregenerator, in_quiet_hours
+
+NOW = datetime(2026, 3, 10, 3, 0)
+
+PLAN_DATA = {
+    "name": "减脂计划",
+    "days": [
+        {"day_index": 1, "title": "第1天", "meals": [{"meal_type": "lunch", "food_name": "鸡胸肉", "calories": 250}]},
+    ],
+}
+
+
+class QuietHoursTests(unittest.TestCase):
+    def test_window_within_day(self):
+        self.assertTrue(in_quiet_hours(datetime(2026, 3, 10, 2, 0), 2, 6))
+        self.assertFalse(in_quiet_hours(datetime(2026, 3, 10, 6, 0), 2, 6))
+
+    def test_window_across_midnight(self):
+        self.assertTrue(in_quiet_hours(datetime(2026, 3, 10, 23, 30), 23, 5))
+        self.assertTrue(in_quiet_hours(datetime(2026, 3, 10, 1, 0), 23, 5))
+        self.assertFalse(in_quiet_hours(datetime(2026, 3, 10, 12, 0), 23, 5))
+
+
+class PlanPregenerationTests(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(bind=engine)
+        self.session_factory = sessionmaker(bind=engine)
+        self.db = self.session_factory()
+        self.pregenerator = PlanPregenerator(session_factory=self.session_factory)
+        self.settings = pregen_module.settings
+        self._overrides = {
+            name: getattr(self.settings, name)
+            for name in ("plan_pregen_concurrency", "plan_pregen_max_per_run", "plan_pregen_min_interval_seconds")
+        }
+        self.settings.plan_pregen_min_interval_seconds = 0
+
+    def tearDown(self):
+        for name, value in self._overrides.items():
+            setattr(self.settings, name, value)
+        self.db.close()
+
+    def add_user(self, user_id, updated_at=NOW - timedelta(days=30), last_plan_at=None, last_meal_at=None):
+        self.db.add(User(
+            id=user_id,
+            username=f"user{user_id}",
+            password_hash="x",
+            weight=60,
+            height=165,
+            age=28,
+            gender="female",
+            health_goal="lose_weight",
+            created_at=NOW - timedelta(days=60),
+            updated_at=updated_at,
+        ))
+        if last_plan_at:
+            self.db.add(DietPlan(name="旧计划", source="ai_generated", author_id=user_id, created_at=last_plan_at))
+        if last_meal_at:
+            self.db.add(MealRecord(
+                user_id=user_id,
+                meal_date=last_meal_at.date(),
+                meal_type="lunch",
+                food_name="米饭",
+                per_100g_calories=116,
+                per_100g_protein=2.6,
+                per_100g_fat=0.3,
+                per_100g_carb=25.9,
+                unit_weight=150,
+                calories=174,
+                protein=3.9,
+                fat=0.5,
+                carb=38.9,
+            ))
+        self.db.commit()
+
+    def test_candidates_selected_by_activity_and_staleness(self):
+        # 活跃且从未生成
+        self.add_user(1, last_meal_at=NOW - timedelta(days=1))
+        # 活跃且上次生成已过期
+        self.add_user(2, last_plan_at=NOW - timedelta(days=5), last_meal_at=NOW - timedelta(days=1))
+        # 生成后修改了资料
+        self.add_user(3, last_plan_at=NOW - timedelta(days=1), updated_at=NOW - timedelta(hours=12))
+        # 最近生成过且资料未变
+        self.add_user(4, last_plan_at=NOW - timedelta(days=1), last_meal_at=NOW - timedelta(days=1))
+        # 今天已有食谱
+        self.add_user(5, last_plan_at=NOW - timedelta(hours=1), updated_at=NOW - timedelta(hours=2))
+        # 不活跃
+        self.add_user(6, last_plan_at=NOW - timedelta(days=20), last_meal_at=NOW - timedelta(days=20))
+
+        # 最久未更新的优先
+        self.assertEqual(self.pregenerator.find_candidates(NOW), [1, 2, 3])
+
+    def test_run_respects_concurrency_and_budget(self):
+        for user_id in range(1, 7):
+            self.add_user(user_id, last_meal_at=NOW - timedelta(days=1))
+        self.settings.plan_pregen_concurrency = 2
+        self.settings.plan_pregen_max_per_run = 4
+        active = []
+        peak = []
+        generated = []
+
+        async def fake_generate(user_id):
+            active.append(user_id)
+            peak.append(len(active))
+            await asyncio.sleep(0.02)
+            active.remove(user_id)
+            if user_id == 2:
+                raise RuntimeError("AI 生成食谱失败")
+            generated.append(user_id)
+
+        self.pregenerator._generate = fake_generate
+        result = asyncio.run(self.pregenerator.run_once(NOW))
+
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(sorted(generated), [1, 3, 4])
+        self.assertEqual(result["candidates"], 6)
+        self.assertEqual(result["generated"], 3)
+        self.assertEqual(result["failed"], 1)
+        self.assertEqual(result["skipped_budget"], 2)
+        self.assertEqual(self.pregenerator.stats()["last_run"], result)
+
+
+class PregeneratePlanTests(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        self.db = session_factory()
+        self._session_local = plan.SessionLocal
+        self._generate = plan.deepseek_service.generate_diet_plan
+        plan.SessionLocal = session_factory
+        plan.plan_template_cache.clear()
+        self.db.add(User(id=7, username="user7", password_hash="x", weight=80, height=175, age=35, health_goal="lose_weight"))
+        self.db.commit()
+
+    def tearDown(self):
+        plan.SessionLocal = self._session_local
+        plan.deepseek_service.generate_diet_plan = self._generate
+        plan.plan_template_cache.clear()
+        self.db.close()
+
+    def test_pregenerated_plan_served_by_generate_today(self):
+        profiles = []
+
+        async def fake_generate(user_profile, goal, preferences, disliked_tags=None):
+            profiles.append(user_profile)
+            return PLAN_DATA
+
+        plan.deepseek_service.generate_diet_plan = fake_generate
+        plan_id = asyncio.run(plan.pregenerate_plan(7))
+
+        # 使用用户资料中的身体数据
+        self.assertIn("80", profiles[0])
+        data = asyncio.run(plan.generate_plan(force_new=False, payload=None, user_id=7, db=self.db))["data"]
+        self.assertEqual(data["id"], plan_id)
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(self.db.query(DietPlan).filter(DietPlan.created_at >= datetime.combine(date.today(), datetime.min.time())).count(), 1)
+
+    def test_failed_ai_does_not_save_mock(self):
+        async def failing(*args, **kwargs):
+            return None
+
+        plan.deepseek_service.generate_diet_plan = failing
+        with self.assertRaises(RuntimeError):
+            asyncio.run(plan.pregenerate_plan(7))
+        self.assertEqual(self.db.query(DietPlan).count(), 0)
+
+    def test_request_during_failed_pregeneration_gets_mock(self):
+        calls = []
+
+        async def slow_failing(*args, **kwargs):
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return None
+
+        plan.deepseek_service.generate_diet_plan = slow_failing
+
+        async def run():
+            pregen = asyncio.ensure_future(plan.pregenerate_plan(7))
+            await asyncio.sleep(0.01)
+            response = await plan.generate_plan(force_new=False, payload=None, user_id=7, db=self.db)
+            return response, await asyncio.gather(pregen, return_exceptions=True)
+
+        response, (pregen_error,) = asyncio.run(run())
+        self.assertIsInstance(pregen_error, RuntimeError)
+        # 用户请求不共享预生成的异常，自行生成并回退到 Mock 食谱
+        self.assertTrue(response["data"]["id"])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.db.query(DietPlan).count(), 1)
+
+    def test_request_during_pregeneration_reuses_its_plan(self):
+        calls = []
+
+        async def slow_generate(*args, **kwargs):
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return PLAN_DATA
+
+        plan.deepseek_service.generate_diet_plan = slow_generate
+
+        async def run():
+            pregen = asyncio.ensure_future(plan.pregenerate_plan(7))
+            await asyncio.sleep(0.01)
+            response = await plan.generate_plan(force_new=False, payload=None, user_id=7, db=self.db)
+            return response, await pregen
+
+        response, plan_id = asyncio.run(run())
+        self.assertEqual(response["data"]["id"], plan_id)
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
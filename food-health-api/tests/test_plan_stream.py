@@ -0,0 +1,226 @@
+import asyncio
+import json
+import unittest
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.v1 import plan
+from app.database.connection import Base
+from app.models.diet_plan import DietPlan
+from app.services import deepseek_service as deepseek_module
+from app.services.metrics import metrics
+from app.services.plan_stream_parser import PlanStreamParser
+
+PLAN = {
+    "name": "减脂 {七日} 计划",
+    "description": "含 \"引号\" 与 [括号] 的描述",
+    "tags": ["减脂"],
+    "days": [
+        {
+            "day_index": index,
+            "title": f"第{index}天 {{主题}}",
+            "meals": [
+                {"meal_type": "breakfast", "food_name": "燕麦粥", "amount_desc": "1碗", "calories": "300kcal"},
+                {"meal_type": "lunch", "food_name": "鸡胸肉", "amount_desc": "150g", "calories": 250},
+            ],
+        }
+        for index in range(1, 8)
+    ],
+}
+
+
+def chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def parse_sse(raw):
+    events = []
+    for block in raw.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class PlanStreamParserTests(unittest.TestCase):
+    def test_days_emitted_as_soon_as_they_close(self):
+        text = "```json\n" + json.dumps(PLAN, ensure_ascii=False) + "\n```"
+        parser = PlanStreamParser()
+        days = []
+        first_complete_at = None
+        for i, piece in enumerate(chunks(text, 7)):
+            completed = parser.feed(piece)
+            if completed and first_complete_at is None:
+                first_complete_at = i
+            days.extend(completed)
+
+        self.assertEqual([day["day_index"] for day in days], list(range(1, 8)))
+        self.assertEqual(days[0]["title"], "第1天 {主题}")
+        # 第一天在整份食谱输出完之前就已解析
+        self.assertLess(first_complete_at, len(text) // 7 // 2)
+
+    def test_truncated_output_keeps_completed_days(self):
+        text = json.dumps(PLAN, ensure_ascii=False)
+        cut = text.index('"day_index": 4')
+        parser = PlanStreamParser()
+        days = parser.feed(text[:cut])
+        self.assertEqual([day["day_index"] for day in days], [1, 2, 3])
+
+    def test_nested_arrays_outside_days_are_ignored(self):
+        parser = PlanStreamParser()
+        days = parser.feed('{"tags": [{"x": 1}], "days": [{"day_index": 1, "meals": []}]}')
+        self.assertEqual(days, [{"day_index": 1, "meals": []}])
+
+
+class DeepSeekStreamTests(unittest.TestCase):
+    def setUp(self):
+        self._http_clients = deepseek_module.http_clients
+        self._api_key = deepseek_module.deepseek_service.api_key
+        deepseek_module.deepseek_service.api_key = "test-key"
+
+    def tearDown(self):
+        deepseek_module.http_clients = self._http_clients
+        deepseek_module.deepseek_service.api_key = self._api_key
+
+    def test_stream_yields_days_then_plan(self):
+        content = json.dumps(PLAN, ensure_ascii=False)
+        lines = [
+            "data: " + json.dumps({"choices": [{"delta": {"content": piece}}]}, ensure_ascii=False)
+            for piece in chunks(content, 20)
+        ]
+        body = "\n\n".join(lines + ["data: [DONE]"]) + "\n\n"
+
+        def handler(request):
+            self.assertTrue(json.loads(request.content)["stream"])
+            return httpx.Response(200, text=body, headers={"Content-Type": "text/event-stream"})
+
+        class FakeClients:
+            def get(self, name):
+                return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        deepseek_module.http_clients = FakeClients()
+
+        async def run():
+            return [item async for item in deepseek_module.deepseek_service.stream_diet_plan("画像", "减脂", "无")]
+
+        events = asyncio.run(run())
+        self.assertEqual([kind for kind, _ in events], ["day"] * 7 + ["plan"])
+        self.assertEqual(events[0][1]["meals"][0]["calories"], 300)
+        self.assertEqual(len(events[-1][1]["days"]), 7)
+
+
+class PlanStreamEndpointTests(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(bind=engine)
+        self.session_factory = sessionmaker(bind=engine)
+        self.db = self.session_factory()
+        self._session_local = plan.SessionLocal
+        self._stream = plan.deepseek_service.stream_diet_plan
+        plan.SessionLocal = self.session_factory
+        plan.plan_template_cache.clear()
+        metrics.reset()
+
+    def tearDown(self):
+        self.db.close()
+        plan.SessionLocal = self._session_local
+        plan.plan_template_cache.clear()
+        plan.deepseek_service.stream_diet_plan = self._stream
+
+    def run_stream(self):
+        async def run():
+            response = await plan.generate_plan_stream(force_new=True, payload=None, user_id=None, db=self.db)
+            return "".join([chunk async for chunk in response.body_iterator])
+
+        return parse_sse(asyncio.run(run()))
+
+    def test_days_streamed_then_plan_persisted(self):
+        async def fake_stream(*args, **kwargs):
+            for day in PLAN["days"]:
+                await asyncio.sleep(0)
+                yield "day", day
+            yield "plan", PLAN
+
+        plan.deepseek_service.stream_diet_plan = fake_stream
+        events = self.run_stream()
+
+        self.assertEqual([kind for kind, _ in events], ["day"] * 7 + ["plan"])
+        self.assertEqual(events[0][1]["total_calories"], 550)
+        detail = events[-1][1]
+        self.assertEqual(detail["source"], "ai_generated")
+        self.assertEqual(len(detail["days"]), 7)
+        self.assertEqual(self.db.query(DietPlan).count(), 1)
+        self.assertEqual(metrics.summary("plan.stream.first_day_ms")["count"], 1)
+
+    def test_truncated_stream_persists_streamed_days(self):
+        async def fake_stream(*args, **kwargs):
+            yield "day", PLAN["days"][0]
+            yield "day", PLAN["days"][1]
+            raise httpx.ReadTimeout("timeout")
+
+        plan.deepseek_service.stream_diet_plan = fake_stream
+        events = self.run_stream()
+
+        self.assertEqual([kind for kind, _ in events], ["day", "day", "plan"])
+        self.assertEqual([day["day_index"] for day in events[-1][1]["days"]], [1, 2])
+
+    def test_invalid_day_not_streamed_or_persisted(self):
+        async def fake_stream(*args, **kwargs):
+            yield "day", PLAN["days"][0]
+            yield "day", {"day_index": 2, "title": "缺少餐单"}
+            yield "day", PLAN["days"][2]
+            raise httpx.ReadTimeout("timeout")
+
+        plan.deepseek_service.stream_diet_plan = fake_stream
+        events = self.run_stream()
+
+        self.assertEqual([kind for kind, _ in events], ["day", "day", "plan"])
+        self.assertEqual([day["title"] for day in events[-1][1]["days"]], ["第1天 {主题}", "第3天 {主题}"])
+        self.assertEqual(metrics.counter("plan.stream.invalid_days"), 1)
+
+    def test_concurrent_streams_share_one_generation(self):
+        calls = []
+
+        async def fake_stream(*args, **kwargs):
+            calls.append(1)
+            for day in PLAN["days"]:
+                await asyncio.sleep(0.005)
+                yield "day", day
+            yield "plan", PLAN
+
+        plan.deepseek_service.stream_diet_plan = fake_stream
+
+        async def consume():
+            response = await plan.generate_plan_stream(force_new=False, payload=None, user_id=5, db=self.db)
+            return parse_sse("".join([chunk async for chunk in response.body_iterator]))
+
+        async def run():
+            return await asyncio.gather(consume(), consume())
+
+        first, second = asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.db.query(DietPlan).count(), 1)
+        for events in (first, second):
+            self.assertEqual([kind for kind, _ in events], ["day"] * 7 + ["plan"])
+        self.assertEqual(first[-1][1]["id"], second[-1][1]["id"])
+
+    def test_unavailable_ai_falls_back_to_mock(self):
+        async def fake_stream(*args, **kwargs):
+            raise ValueError("DeepSeek 未配置")
+            yield
+
+        plan.deepseek_service.stream_diet_plan = fake_stream
+        events = self.run_stream()
+
+        self.assertEqual([kind for kind, _ in events], ["day", "plan"])
+        self.assertEqual(events[-1][1]["source"], "mock_data")
+
+
+if __name__ == "__main__":
+    unittest.main()
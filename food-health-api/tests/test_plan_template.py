@@ -0,0 +1,140 @@
+import asyncio
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.v1 import plan
+from app.database.connection import Base
+from app.models.diet_plan import DietPlan
+from app.models.user import User
+from app.services.plan_profile import bucket_health_profile, build_plan_template_key
+
+PLAN_DATA = {
+    "name": "减脂7日计划",
+    "tags": ["减脂"],
+    "days": [
+        {
+            "day_index": index,
+            "title": f"第{index}天",
+            "meals": [{"meal_type": "lunch", "food_name": "鸡胸肉", "amount_desc": "150g", "calories": 250}],
+        }
+        for index in range(1, 8)
+    ],
+}
+
+
+class PlanTemplateKeyTests(unittest.TestCase):
+    def test_profiles_in_same_band_share_bucket(self):
+        a = {"weight": 70, "height": 175, "age": 26, "gender": "male", "activity": "medium"}
+        b = {"weight": 72.5, "height": 178, "age": 29, "gender": "male", "activity": "medium"}
+        self.assertEqual(bucket_health_profile(a), ("normal", "18-29", "male", "medium"))
+        self.assertEqual(bucket_health_profile(a), bucket_health_profile(b))
+
+    def test_band_boundaries(self):
+        self.assertEqual(bucket_health_profile({"weight": 90, "height": 175})[0], "obese")
+        self.assertEqual(bucket_health_profile({"weight": 50, "height": 175})[0], "underweight")
+        self.assertEqual(bucket_health_profile({"age": 65})[1], "60+")
+        self.assertEqual(bucket_health_profile(None), (None, None, None, None))
+        self.assertEqual(bucket_health_profile({"weight": "abc", "activity": "extreme"}), (None, None, None, None))
+
+    def test_equivalent_inputs_build_same_key(self):
+        a = build_plan_template_key("lose_weight", "vegetarian,no_spicy", ["芹菜", "海鲜"], {})
+        b = build_plan_template_key("loss_weight", "no_spicy,vegetarian", [" 海鲜", "芹菜", "芹菜"], None)
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, build_plan_template_key("lose_weight", "vegetarian", ["芹菜", "海鲜"], {}))
+        self.assertNotEqual(a, build_plan_template_key("gain_muscle", "vegetarian,no_spicy", ["芹菜", "海鲜"], {}))
+
+
+class PlanTemplateCacheTests(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        self.db = session_factory()
+        self._session_local = plan.SessionLocal
+        plan.SessionLocal = session_factory
+        self.calls = []
+        self._generate = plan.deepseek_service.generate_diet_plan
+
+        async def fake_generate(user_profile, goal, preferences, disliked_tags=None):
+            self.calls.append(user_profile)
+            return PLAN_DATA
+
+        plan.deepseek_service.generate_diet_plan = fake_generate
+        plan.plan_template_cache.clear()
+
+    def tearDown(self):
+        plan.SessionLocal = self._session_local
+        plan.deepseek_service.generate_diet_plan = self._generate
+        plan.plan_template_cache.clear()
+        self.db.close()
+
+    def generate(self, weight, force_new=False, user_id=None):
+        payload = plan.PlanGenerateRequest(
+            health_goal="lose_weight",
+            health_profile=plan.PlanGenerateProfile(weight=weight, height=170, age=30, gender="female"),
+        )
+        return asyncio.run(plan.generate_plan(force_new=force_new, payload=payload, user_id=user_id, db=self.db))["data"]
+
+    def test_equivalent_guests_get_cloned_plan(self):
+        before = plan.plan_template_cache.stats()
+        first = self.generate(60)
+        second = self.generate(62)
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertNotEqual(first["id"], second["id"])
+        self.assertEqual(second["days"], first["days"])
+        self.assertEqual(self.db.query(DietPlan).count(), 2)
+        # 克隆的计划记录的是当前用户的画像
+        target_users = {row.target_user for row in self.db.query(DietPlan)}
+        self.assertEqual(len(target_users), 2)
+        stats = plan.plan_template_cache.stats()
+        self.assertEqual(stats["hits"] - before["hits"], 1)
+        self.assertEqual(stats["misses"] - before["misses"], 1)
+
+    def test_nickname_not_sent_to_shared_generation(self):
+        self.db.add_all([
+            User(id=1, username="alice", nickname="小红", password_hash="x"),
+            User(id=2, username="bob", nickname="小明", password_hash="x"),
+        ])
+        self.db.commit()
+
+        self.generate(60, user_id=1)
+        second = self.generate(61, user_id=2)
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertNotIn("小红", self.calls[0])
+        self.assertTrue(self.calls[0].startswith("默认用户"))
+        # 本人食谱仍记录自己的画像
+        self.assertIn("小明", self.db.get(DietPlan, second["id"]).target_user)
+
+    def test_different_bucket_calls_ai(self):
+        self.generate(60)
+        self.generate(85)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_force_new_bypasses_template(self):
+        self.generate(60)
+        self.generate(60, force_new=True)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_failed_generation_not_cached(self):
+        async def failing(*args, **kwargs):
+            self.calls.append("failed")
+            return None
+
+        plan.deepseek_service.generate_diet_plan = failing
+        data = self.generate(60)
+
+        self.assertEqual(data["source"], "mock_data")
+        self.assertEqual(len(plan.plan_template_cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
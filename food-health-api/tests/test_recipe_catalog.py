@@ -0,0 +1,122 @@
+import asyncio
+import unittest
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.api.v1 import premium_recipe
+from app.database.connection import Base
+from app.models.tag import PremiumRecipeTag
+from app.schemas.premium_recipe import PremiumRecipeCreate, PremiumRecipeUpdate
+from app.services.premium_recipe_service import PremiumRecipeService
+from app.services.recipe_catalog import recipe_catalog
+
+
+def make_request(etag=None):
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": b""})
+
+
+class RecipeCatalogTests(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        self.service = PremiumRecipeService(self.db)
+        recipe_catalog.invalidate()
+
+        self.queries = 0
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def count(conn, cursor, statement, parameters, context, executemany):
+            self.queries += 1
+
+    def tearDown(self):
+        self.db.close()
+        recipe_catalog.invalidate()
+
+    def create(self, name, tags, category="午餐"):
+        return self.service.create(PremiumRecipeCreate(
+            name=name,
+            category=category,
+            tags=tags,
+            ingredients=[{"name": "鸡蛋", "amount": "2个"}],
+            steps=[{"step": 1, "content": "水煮"}],
+        ))
+
+    def counts(self, kind):
+        return recipe_catalog.view(self.db, kind).counts
+
+    def test_incremental_updates_match_rebuild(self):
+        first = self.create("鸡胸沙拉", ["高蛋白", "低脂"])
+        self.assertEqual(self.counts("tags"), {"低脂": 1, "高蛋白": 1})
+
+        self.create("番茄炒蛋", ["快手", "高蛋白"], category="晚餐")
+        self.service.update(first.id, PremiumRecipeUpdate(tags=["低脂", "沙拉"], category="早餐"))
+        second = self.create("蒸鱼", ["清淡"])
+        self.service.update(second.id, PremiumRecipeUpdate(is_active=False))
+        self.service.delete(first.id)
+
+        incremental = (self.counts("tags"), self.counts("categories"))
+        recipe_catalog.invalidate()
+        self.assertEqual(incremental, (self.counts("tags"), self.counts("categories")))
+        self.assertEqual(incremental, ({"快手": 1, "高蛋白": 1}, {"晚餐": 1}))
+
+    def test_reads_served_from_memory(self):
+        self.create("鸡胸沙拉", ["高蛋白"])
+        self.service.get_tags()
+        self.queries = 0
+
+        self.assertEqual(self.service.get_tags(), ["高蛋白"])
+        self.assertEqual(self.service.get_categories(), ["午餐"])
+        self.assertEqual(self.queries, 0)
+
+    def test_etag_returns_304_until_catalog_changes(self):
+        self.create("鸡胸沙拉", ["高蛋白"])
+
+        async def get_tags(etag=None, with_counts=False):
+            response = Response()
+            result = await premium_recipe.get_tags(make_request(etag), response, with_counts=with_counts, db=self.db)
+            return result, response
+
+        data, response = asyncio.run(get_tags())
+        etag = response.headers["etag"]
+        self.assertEqual(data["data"], ["高蛋白"])
+
+        not_modified, _ = asyncio.run(get_tags(etag))
+        self.assertEqual(not_modified.status_code, 304)
+
+        counted, counted_response = asyncio.run(get_tags(etag, with_counts=True))
+        self.assertEqual(counted["data"], [{"name": "高蛋白", "count": 1}])
+        self.assertNotEqual(counted_response.headers["etag"], etag)
+
+        self.create("牛肉饭", ["增肌"])
+        changed, _ = asyncio.run(get_tags(etag))
+        self.assertEqual(changed["data"], ["增肌", "高蛋白"])
+
+    def test_unmigrated_link_table_falls_back_to_tags_column(self):
+        self.create("鸡胸沙拉", ["高蛋白", "低脂"])
+        self.create("番茄炒蛋", ["高蛋白"])
+        # 模拟尚未执行 scripts/migrate_tags.py 的旧库
+        self.db.query(PremiumRecipeTag).delete()
+        self.db.commit()
+        recipe_catalog.invalidate()
+
+        self.assertEqual(self.counts("tags"), {"低脂": 1, "高蛋白": 2})
+
+    def test_tags_differing_in_case_counted_once_in_both_paths(self):
+        self.create("鸡胸沙拉", ["AI", "高蛋白"])
+        self.create("番茄炒蛋", ["ai"])
+        incremental = recipe_catalog.view(self.db, "tags")
+
+        recipe_catalog.invalidate()
+        rebuilt = recipe_catalog.view(self.db, "tags")
+        self.assertEqual(incremental.counts, {"AI": 2, "高蛋白": 1})
+        self.assertEqual(rebuilt.counts, incremental.counts)
+        self.assertEqual(rebuilt.etag, incremental.etag)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import asyncio
+import unittest
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.v1 import premium_recipe
+from app.database.connection import Base
+from app.models.food import PremiumRecipe
+from app.models.user_favorite import UserFavorite
+from app.services import favorite_service, premium_recipe_service
+from app.services.favorite_service import FavoriteService
+from app.services import recipe_counters as recipe_counters_module
+from app.services.recipe_counters import RecipeCounterBuffer
+
+
+class RecipeCounterBufferTests(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            db.add_all([PremiumRecipe(id=1, name="热门", favorite_count=1), PremiumRecipe(id=2, name="冷门")])
+            db.commit()
+
+        self.commits = 0
+
+        def count_commit(conn):
+            self.commits += 1
+
+        event.listen(self.engine, "commit", count_commit)
+        self.buffer = RecipeCounterBuffer(session_factory=self.Session, flush_seconds=60, flush_threshold=1000)
+        self.patched_modules = (premium_recipe, premium_recipe_service, favorite_service)
+        self.original_buffer = premium_recipe.recipe_counters
+
+    def tearDown(self):
+        for module in self.patched_modules:
+            module.recipe_counters = self.original_buffer
+        self.engine.dispose()
+
+    def counts(self, recipe_id):
+        with self.Session() as db:
+            recipe = db.get(PremiumRecipe, recipe_id)
+            return recipe.view_count, recipe.favorite_count
+
+    def test_flush_batches_deltas_in_one_commit(self):
+        for _ in range(50):
+            self.buffer.add(1, "view_count")
+        self.buffer.add(2, "view_count")
+        self.buffer.add(1, "favorite_count", 1)
+        self.assertEqual(self.commits, 0)
+        self.assertEqual(self.buffer.pending(1), {"view_count": 50, "favorite_count": 1})
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(self.commits, 1)
+        self.assertEqual(self.counts(1), (50, 2))
+        self.assertEqual(self.counts(2), (1, 0))
+        self.assertEqual(self.buffer.pending(1), {"view_count": 0, "favorite_count": 0})
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_favorite_count_never_negative(self):
+        self.buffer.add(2, "favorite_count", -1)
+        self.buffer.flush()
+        self.assertEqual(self.counts(2), (0, 0))
+
+    def test_threshold_triggers_flush(self):
+        self.buffer.flush_threshold = 10
+
+        async def run():
+            self.buffer.start()
+            for _ in range(10):
+                self.buffer.add(1, "view_count")
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if not self.buffer.stats()["pending_increments"]:
+                    break
+            await self.buffer.stop()
+
+        asyncio.run(run())
+        self.assertEqual(self.counts(1), (10, 1))
+        self.assertEqual(self.buffer.stats()["flushes"], 1)
+
+    def test_threshold_before_start_keeps_buffering(self):
+        # 后台任务未启动时不在请求内写库，start() 后立即写回
+        self.buffer.flush_threshold = 10
+        for _ in range(10):
+            self.buffer.add(1, "view_count")
+        self.assertEqual(self.commits, 0)
+        self.assertEqual(self.buffer.stats()["pending_increments"], 10)
+
+        async def run():
+            self.buffer.start()
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if not self.buffer.stats()["pending_increments"]:
+                    break
+            await self.buffer.stop()
+
+        asyncio.run(run())
+        self.assertEqual(self.counts(1), (10, 1))
+
+    def test_failed_flush_keeps_deltas(self):
+        self.buffer.add(1, "view_count", 3)
+        self.buffer._session_factory = sessionmaker(bind=create_engine("sqlite://"))  # 没有表
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.stats()["failures"], 1)
+
+        self.buffer._session_factory = self.Session
+        self.buffer.add(1, "view_count")
+        self.buffer.flush()
+        self.assertEqual(self.counts(1), (4, 1))
+
+    def test_stop_flushes_remaining(self):
+        async def run():
+            self.buffer.start()
+            self.buffer.add(1, "view_count")
+            await self.buffer.stop()
+
+        asyncio.run(run())
+        self.assertEqual(self.counts(1), (1, 1))
+
+    def test_stop_retries_failed_final_flush(self):
+        broken = sessionmaker(bind=create_engine("sqlite://"))  # 没有表
+        factories = [broken, broken]
+
+        def session_factory():
+            return (factories.pop(0) if factories else self.Session)()
+
+        self.buffer._session_factory = session_factory
+        self.buffer.add(1, "view_count", 2)
+        original_retry = recipe_counters_module.SHUTDOWN_RETRY_SECONDS
+        recipe_counters_module.SHUTDOWN_RETRY_SECONDS = 0.01
+        try:
+            asyncio.run(self.buffer.stop())
+        finally:
+            recipe_counters_module.SHUTDOWN_RETRY_SECONDS = original_retry
+        self.assertEqual(self.buffer.stats()["failures"], 2)
+        self.assertEqual(self.counts(1), (2, 1))
+
+    def test_detail_and_favorite_status_include_pending(self):
+        for module in self.patched_modules:
+            module.recipe_counters = self.buffer
+
+        with self.Session() as db:
+            for _ in range(3):
+                data = asyncio.run(premium_recipe.get_recipe_detail(recipe_id=1, db=db))["data"]
+            self.assertEqual(data["view_count"], 3)
+            self.assertEqual(self.commits, 0)
+
+            service = FavoriteService(db)
+            self.assertTrue(service.toggle(user_id=7, recipe_id=1))
+            self.assertEqual(service.get_favorite_status(7, 1), {"is_favorited": True, "favorite_count": 2})
+            # 只有收藏记录本身的一次提交
+            self.assertEqual(self.commits, 1)
+            self.assertEqual(db.query(UserFavorite).count(), 1)
+
+        self.buffer.flush()
+        self.assertEqual(self.counts(1), (3, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
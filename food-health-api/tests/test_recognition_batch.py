@@ -0,0 +1,103 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.api.v1 import recognition
+from app.schemas.recognition import RecognitionResult, RecognitionTopResult
+
+
+class FakeUpload:
+    def __init__(self, data: bytes, content_type: str = "image/jpeg", filename: str = "dish.jpg"):
+        self._data = data
+        self.content_type = content_type
+        self.filename = filename
+
+    async def read(self):
+        return self._data
+
+
+class FakeFoodService:
+    def __init__(self, db):
+        self.lookups = []
+        FakeFoodService.instances.append(self)
+
+    def get_food_response(self, name):
+        self.lookups.append(name)
+        return None
+
+
+class RecognitionBatchTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._saved = (
+            recognition.UPLOAD_DIR,
+            recognition._identify_image,
+            recognition._build_top_result_detail,
+            recognition.FoodService,
+        )
+        recognition.UPLOAD_DIR = Path(self._tmp.name)
+        recognition.recognition_cache.clear()
+        FakeFoodService.instances = []
+        self.active = 0
+        self.peak = 0
+
+        async def fake_identify(image_bytes, content_type, image_key):
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            await asyncio.sleep(0.02)
+            self.active -= 1
+            if image_bytes == b"boom":
+                raise RuntimeError("provider down")
+            name = image_bytes.decode().split("-")[0]
+            return f"/static/{image_key}.jpg", [RecognitionResult(name=name, confidence=0.9)], "doubao"
+
+        async def fake_detail(top_result, food_service, ai_source, db, food_details=None):
+            self.assertIn(top_result.name, food_details)
+            return RecognitionTopResult(name=top_result.name, confidence=top_result.confidence)
+
+        recognition._identify_image = fake_identify
+        recognition._build_top_result_detail = fake_detail
+        recognition.FoodService = FakeFoodService
+
+    def tearDown(self):
+        (
+            recognition.UPLOAD_DIR,
+            recognition._identify_image,
+            recognition._build_top_result_detail,
+            recognition.FoodService,
+        ) = self._saved
+        recognition.recognition_cache.clear()
+        self._tmp.cleanup()
+
+    def test_results_in_order_and_failures_isolated(self):
+        uploads = [
+            FakeUpload("米饭-1".encode()),
+            FakeUpload(b"boom"),
+            FakeUpload(b"gif", content_type="image/gif"),
+            FakeUpload("米饭-2".encode()),
+            FakeUpload("青菜".encode()),
+        ]
+        response = asyncio.run(recognition.recognize_food_batch(images=uploads, db=None))
+        data = response["data"]
+        items = data["items"]
+
+        self.assertEqual([item["index"] for item in items], [0, 1, 2, 3, 4])
+        self.assertEqual([item["success"] for item in items], [True, False, False, True, True])
+        self.assertEqual(items[0]["data"]["top_result"]["name"], "米饭")
+        self.assertEqual(items[4]["data"]["top_result"]["name"], "青菜")
+        self.assertIn("jpg", items[2]["error"])
+        self.assertEqual((data["succeeded"], data["failed"]), (3, 2))
+        # 一个 FoodService，相同菜名只查一次
+        self.assertEqual(len(FakeFoodService.instances), 1)
+        self.assertEqual(sorted(FakeFoodService.instances[0].lookups), ["米饭", "青菜"])
+        self.assertLessEqual(self.peak, recognition.settings.recognition_batch_concurrency)
+
+    def test_too_many_images_rejected(self):
+        uploads = [FakeUpload(b"x")] * (recognition.settings.recognition_batch_max_images + 1)
+        with self.assertRaises(recognition.HTTPException):
+            asyncio.run(recognition.recognize_food_batch(images=uploads, db=None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import asyncio
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from app.api.v1 import recognition
+from app.schemas.recognition import RecognitionResult, RecognizeResponse
+from app.services.cache import TTLCache
+
+
+class FakeUpload:
+    def __init__(self, data: bytes, content_type: str = "image/jpeg"):
+        self._data = data
+        self.content_type = content_type
+        self.filename = "dish.jpg"
+
+    async def read(self):
+        return self._data
+
+
+class TTLCacheTests(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = TTLCache(max_entries=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        cache = TTLCache(max_entries=2, ttl_seconds=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        stats = cache.stats()
+        self.assertEqual(stats["expirations"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+
+class RecognitionCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._upload_dir = recognition.UPLOAD_DIR
+        self._pipeline = recognition._recognize_image
+        recognition.UPLOAD_DIR = Path(self._tmp.name)
+        recognition.recognition_cache.clear()
+
+    def tearDown(self):
+        recognition.UPLOAD_DIR = self._upload_dir
+        recognition._recognize_image = self._pipeline
+        recognition.recognition_cache.clear()
+        self._tmp.cleanup()
+
+    def test_same_bytes_hit_cache(self):
+        calls = []
+
+        async def fake_pipeline(image_bytes, content_type, image_key, db):
+            calls.append(image_key)
+            return RecognizeResponse(
+                results=[RecognitionResult(name="番茄炒蛋", confidence=0.9)],
+                message="识别成功",
+            )
+
+        recognition._recognize_image = fake_pipeline
+        hits = recognition.recognition_cache.stats()["hits"]
+        first = asyncio.run(recognition.recognize_food(image=FakeUpload(b"photo"), db=None))
+        second = asyncio.run(recognition.recognize_food(image=FakeUpload(b"photo"), db=None))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(first, second)
+        self.assertEqual(recognition.recognition_cache.stats()["hits"] - hits, 1)
+
+    def test_cached_response_is_not_shared(self):
+        async def fake_pipeline(image_bytes, content_type, image_key, db):
+            return RecognizeResponse(
+                results=[RecognitionResult(name="番茄炒蛋", confidence=0.9)],
+                message="识别成功",
+            )
+
+        recognition._recognize_image = fake_pipeline
+
+        async def run():
+            first = await recognition._recognize_with_cache(b"photo", "image/jpeg", None)
+            first.results[0].name = "改掉了"
+            second = await recognition._recognize_with_cache(b"photo", "image/jpeg", None)
+            second.results.clear()
+            return await recognition._recognize_with_cache(b"photo", "image/jpeg", None)
+
+        third = asyncio.run(run())
+        self.assertEqual([r.name for r in third.results], ["番茄炒蛋"])
+
+    def test_image_saved_once_per_content(self):
+        key = recognition.compute_image_key(b"photo")
+        url1 = recognition.save_recognition_image(b"photo", "image/png", key)
+        url2 = recognition.save_recognition_image(b"photo", "image/png", key)
+        self.assertEqual(url1, url2)
+        self.assertTrue(url1.endswith(f"{key}.png"))
+        files = list(Path(self._tmp.name).rglob("*.png"))
+        self.assertEqual(len(files), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import asyncio
+import time
+import unittest
+
+from app.api.v1 import recognition
+from app.schemas.recognition import RecognitionResult
+from app.services.metrics import metrics
+
+SETTING_NAMES = (
+    "doubao_api_key",
+    "baidu_api_key",
+    "baidu_secret_key",
+    "recognition_hedge_enabled",
+    "recognition_hedge_default_delay_seconds",
+    "recognition_hedge_min_delay_seconds",
+    "recognition_hedge_min_samples",
+)
+
+
+def provider(delay, name=None, error=None):
+    async def call(*args, **kwargs):
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return [RecognitionResult(name=name, confidence=0.9)] if name else []
+    return call
+
+
+class HedgedRecognitionTests(unittest.TestCase):
+    def setUp(self):
+        settings = recognition.settings
+        self._saved = {name: getattr(settings, name) for name in SETTING_NAMES}
+        self._doubao = recognition.doubao_ai_service.recognize_food
+        self._baidu = recognition.baidu_ai_service.recognize_dish
+        settings.doubao_api_key = "doubao"
+        settings.baidu_api_key = "baidu"
+        settings.baidu_secret_key = "secret"
+        settings.recognition_hedge_enabled = True
+        settings.recognition_hedge_default_delay_seconds = 0.05
+        settings.recognition_hedge_min_delay_seconds = 0.01
+        settings.recognition_hedge_min_samples = 1000
+        metrics.reset()
+
+    def tearDown(self):
+        for name, value in self._saved.items():
+            setattr(recognition.settings, name, value)
+        recognition.doubao_ai_service.recognize_food = self._doubao
+        recognition.baidu_ai_service.recognize_dish = self._baidu
+        metrics.reset()
+
+    def run_providers(self, doubao, baidu):
+        recognition.doubao_ai_service.recognize_food = doubao
+        recognition.baidu_ai_service.recognize_dish = baidu
+        started = time.perf_counter()
+        result = asyncio.run(recognition._recognize_with_providers("base64"))
+        return result, time.perf_counter() - started
+
+    def test_fast_doubao_does_not_hedge(self):
+        (results, source), _ = self.run_providers(provider(0.01, "番茄炒蛋"), provider(0.01, "番茄"))
+        self.assertEqual(source, "doubao")
+        self.assertEqual(results[0].name, "番茄炒蛋")
+        self.assertEqual(metrics.counter("hedge.fired"), 0)
+
+    def test_slow_doubao_loses_to_baidu(self):
+        (results, source), elapsed = self.run_providers(provider(2.0, "番茄炒蛋"), provider(0.05, "番茄"))
+        self.assertEqual(source, "baidu")
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(metrics.counter("hedge.fired"), 1)
+        self.assertEqual(metrics.counter("hedge.won"), 1)
+
+    def test_doubao_still_wins_after_hedge(self):
+        (results, source), _ = self.run_providers(provider(0.1, "番茄炒蛋"), provider(1.0, "番茄"))
+        self.assertEqual(source, "doubao")
+        self.assertEqual(metrics.counter("hedge.fired"), 1)
+        self.assertEqual(metrics.counter("hedge.won"), 0)
+
+    def test_doubao_error_falls_back_to_baidu(self):
+        (results, source), _ = self.run_providers(
+            provider(0.01, error=RuntimeError("boom")), provider(0.01, "番茄")
+        )
+        self.assertEqual(source, "baidu")
+        self.assertEqual(metrics.counter("hedge.fired"), 0)
+
+    def test_hedge_delay_uses_p95(self):
+        recognition.settings.recognition_hedge_min_samples = 5
+        for value in (100, 120, 140, 160, 900):
+            metrics.observe("doubao.latency_ms", value)
+        self.assertAlmostEqual(recognition._hedge_delay_seconds(), 0.9)
+
+
+if __name__ == "__main__":
+    unittest.main()
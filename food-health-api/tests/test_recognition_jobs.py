@@ -0,0 +1,125 @@
+import asyncio
+import json
+import unittest
+
+from app.api.v1 import recognition
+from app.schemas.recognition import RecognitionResult, RecognizeResponse
+from app.services.job_queue import FAILED, SUCCEEDED, JobError, JobQueue, QueueFullError
+
+
+class FakeUpload:
+    def __init__(self, data: bytes, content_type: str = "image/jpeg"):
+        self._data = data
+        self.content_type = content_type
+        self.filename = "dish.jpg"
+
+    async def read(self):
+        return self._data
+
+
+class FakeRequest:
+    async def is_disconnected(self):
+        return False
+
+
+class JobQueueTests(unittest.TestCase):
+    def test_bounded_workers_and_queue(self):
+        queue = JobQueue("test", workers=2, max_queue=3)
+        running = []
+        peak = []
+
+        async def work():
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.02)
+            running.pop()
+            return "done"
+
+        async def run():
+            jobs = [queue.submit(work) for _ in range(3)]
+            with self.assertRaises(QueueFullError):
+                queue.submit(work)
+            while not all(job.finished for job in jobs):
+                await asyncio.sleep(0.01)
+            stats = queue.stats()
+            await queue.stop()
+            return jobs, stats
+
+        jobs, stats = asyncio.run(run())
+        self.assertEqual([job.status for job in jobs], [SUCCEEDED] * 3)
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertEqual(stats["wait_ms"]["count"], 3)
+
+    def run_failing(self, error):
+        queue = JobQueue("test", workers=1, max_queue=2, failure_message="识别失败，请稍后重试")
+
+        async def boom():
+            raise error
+
+        async def run():
+            job = queue.submit(boom)
+            await job.changed.wait()
+            while not job.finished:
+                await job.changed.wait()
+            await queue.stop()
+            return job
+
+        with self.assertLogs("app.services.job_queue", level="WARNING"):
+            return asyncio.run(run())
+
+    def test_failed_job_keeps_error(self):
+        job = self.run_failing(JobError("未识别到食物"))
+        self.assertEqual(job.status, FAILED)
+        self.assertEqual(job.to_dict()["error"], "未识别到食物")
+
+    def test_internal_error_is_not_exposed(self):
+        job = self.run_failing(RuntimeError("password=secret at db-host:3306"))
+        self.assertEqual(job.status, FAILED)
+        self.assertEqual(job.to_dict()["error"], "识别失败，请稍后重试")
+
+
+class RecognitionJobEndpointTests(unittest.TestCase):
+    def setUp(self):
+        self._pipeline = recognition._recognize_image
+        recognition.recognition_cache.clear()
+
+        async def fake_pipeline(image_bytes, content_type, image_key, db):
+            await asyncio.sleep(0.02)
+            return RecognizeResponse(
+                results=[RecognitionResult(name="番茄炒蛋", confidence=0.9)],
+                message="识别成功",
+            )
+
+        recognition._recognize_image = fake_pipeline
+
+    def tearDown(self):
+        recognition._recognize_image = self._pipeline
+        recognition.recognition_cache.clear()
+
+    def test_submit_then_stream_result(self):
+        async def run():
+            submitted = await recognition.submit_recognition_job(image=FakeUpload(b"job-photo"))
+            job_id = submitted["data"]["job_id"]
+            response = await recognition.stream_recognition_job(job_id, FakeRequest())
+            chunks = [chunk async for chunk in response.body_iterator]
+            polled = await recognition.get_recognition_job(job_id)
+            await recognition.recognition_jobs.stop()
+            return submitted, chunks, polled
+
+        submitted, chunks, polled = asyncio.run(run())
+        self.assertEqual(submitted["data"]["status"], "queued")
+        self.assertTrue(chunks[0].startswith("event: status"))
+        self.assertTrue(chunks[-1].startswith("event: result"))
+        payload = json.loads(chunks[-1].split("data: ", 1)[1])
+        self.assertEqual(payload["result"]["results"][0]["name"], "番茄炒蛋")
+        self.assertEqual(polled["data"]["status"], SUCCEEDED)
+
+    def test_unknown_job_returns_404(self):
+        with self.assertRaises(recognition.HTTPException) as ctx:
+            asyncio.run(recognition.get_recognition_job("missing"))
+        self.assertEqual(ctx.exception.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import asyncio
+import unittest
+
+from app.services.single_flight import SingleFlight, normalize_key
+
+
+class SingleFlightTests(unittest.TestCase):
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight("test")
+        calls = []
+
+        async def fetch(name):
+            calls.append(name)
+            await asyncio.sleep(0.02)
+            return {"name": name}
+
+        async def run():
+            keys = ["小炒肉", " 小炒肉", "小炒肉 ", "番茄炒蛋"]
+            return await asyncio.gather(*(flight.do(normalize_key(k), fetch, k.strip()) for k in keys))
+
+        results = asyncio.run(run())
+        self.assertEqual(sorted(calls), ["小炒肉", "番茄炒蛋"])
+        self.assertIs(results[0], results[1])
+        stats = flight.stats()
+        self.assertEqual((stats["calls"], stats["coalesced"], stats["in_flight"]), (2, 2, 0))
+        self.assertEqual(stats["coalesced_by_key"], {"小炒肉": 2})
+
+    def test_exception_shared_and_key_released(self):
+        flight = SingleFlight("test")
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            await asyncio.sleep(0.01)
+            if len(attempts) == 1:
+                raise RuntimeError("timeout")
+            return "ok"
+
+        async def run():
+            first = await asyncio.gather(flight.do("k", flaky), flight.do("k", flaky), return_exceptions=True)
+            second = await flight.do("k", flaky)
+            return first, second
+
+        first, second = asyncio.run(run())
+        self.assertTrue(all(isinstance(item, RuntimeError) for item in first))
+        self.assertEqual(second, "ok")
+
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        flight = SingleFlight("test")
+
+        async def slow():
+            await asyncio.sleep(0.03)
+            return "done"
+
+        async def run():
+            leader = asyncio.create_task(flight.do("k", slow))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(flight.do("k", slow))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower
+
+        self.assertEqual(asyncio.run(run()), "done")
+
+    def test_wait_does_not_start_or_share_errors(self):
+        flight = SingleFlight("test")
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        async def run():
+            idle = await flight.wait("k")
+            task = asyncio.ensure_future(flight.do("k", failing))
+            await asyncio.sleep(0)
+            waited = await flight.wait("k")
+            await asyncio.gather(task, return_exceptions=True)
+            return idle, waited
+
+        self.assertEqual(asyncio.run(run()), (False, True))
+        self.assertEqual(flight.stats()["calls"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
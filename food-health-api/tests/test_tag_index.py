@@ -0,0 +1,117 @@
+import asyncio
+import json
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1 import plan
+from app.database.connection import Base
+from app.models.diet_plan import DietPlan
+from app.models.food import PremiumRecipe
+from app.models.tag import DietPlanTag, PremiumRecipeTag, Tag
+from app.schemas.premium_recipe import PremiumRecipeCreate, PremiumRecipeUpdate
+from app.services.plan_persistence import save_ai_plan
+from app.services.premium_recipe_service import PremiumRecipeService
+from app.services.recipe_catalog import recipe_catalog
+from app.services.tag_index import backfill_tags, parse_recipe_tags, split_plan_tags
+
+BASE_TIME = datetime(2026, 3, 1, 8, 0)
+
+
+class TagParsingTests(unittest.TestCase):
+    def test_split_and_parse(self):
+        self.assertEqual(split_plan_tags(" 减脂, 高蛋白,,减脂"), ["减脂", "高蛋白"])
+        self.assertEqual(split_plan_tags(None), [])
+        self.assertEqual(parse_recipe_tags('["低脂", " 快手 "]'), ["低脂", "快手"])
+        self.assertEqual(parse_recipe_tags("not json"), [])
+        self.assertEqual(parse_recipe_tags('{"a": 1}'), [])
+
+
+class TagIndexTests(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(bind=engine)
+        self.db = sessionmaker(bind=engine)()
+        recipe_catalog.invalidate()
+
+    def tearDown(self):
+        self.db.close()
+        recipe_catalog.invalidate()
+
+    def list_plans(self, tag, **kwargs):
+        params = {"tag": tag, "source": None, "cursor": None, "limit": 20, "fields": "name", "compact": False}
+        params.update(kwargs)
+        return asyncio.run(plan.list_plans(db=self.db, **params))["data"]
+
+    def add_legacy_rows(self):
+        """迁移前的数据：只有 tags 文本列"""
+        for index, tags in enumerate(["减脂,高蛋白", "减脂餐,低卡", "增肌", "减脂"]):
+            self.db.add(DietPlan(name=f"计划{index}", tags=tags, source="preset", created_at=BASE_TIME + timedelta(hours=index)))
+        for index, tags in enumerate([["减脂", "快手"], ["减脂餐"], ["素食"]]):
+            self.db.add(PremiumRecipe(name=f"食谱{index}", tags=json.dumps(tags, ensure_ascii=False), is_active=index != 2))
+        self.db.commit()
+
+    def test_backfill_is_idempotent_and_exact(self):
+        self.add_legacy_rows()
+        counts = backfill_tags(self.db, batch_size=2)
+        backfill_tags(self.db, batch_size=2)
+
+        self.assertEqual(counts["plans"], 4)
+        self.assertEqual(counts["recipes"], 3)
+        self.assertEqual(self.db.query(DietPlanTag).count(), 6)
+        self.assertEqual(self.db.query(PremiumRecipeTag).count(), 4)
+        # 「减脂」不再误匹配「减脂餐」，按创建时间倒序
+        names = [item["name"] for item in self.list_plans("减脂")["items"]]
+        self.assertEqual(names, ["计划3", "计划0"])
+
+    def test_plan_tag_filter_pages_with_cursor(self):
+        self.add_legacy_rows()
+        backfill_tags(self.db)
+
+        first = self.list_plans("减脂", limit=1)
+        second = self.list_plans("减脂", limit=1, cursor=first["next_cursor"])
+        self.assertEqual([item["name"] for item in first["items"] + second["items"]], ["计划3", "计划0"])
+        self.assertIsNone(second["next_cursor"])
+        self.assertEqual(self.list_plans("不存在的标签")["items"], [])
+
+    def test_saved_plan_is_indexed(self):
+        saved = save_ai_plan(self.db, {"name": "计划", "tags": ["高纤维"], "days": []}, "lose_weight", "减脂", "无", "画像", 3)
+
+        link = self.db.query(DietPlanTag).join(Tag, Tag.id == DietPlanTag.tag_id).filter(Tag.name == "高纤维").one()
+        self.assertEqual(link.plan_id, saved.id)
+        self.assertEqual(link.plan_created_at, saved.created_at)
+        self.assertEqual([item["id"] for item in self.list_plans("高纤维")["items"]], [saved.id])
+
+    def test_premium_recipe_filter_and_tags(self):
+        self.add_legacy_rows()
+        backfill_tags(self.db)
+        service = PremiumRecipeService(self.db)
+
+        recipes, total = service.get_list(tag="减脂")
+        self.assertEqual((total, [recipe.name for recipe in recipes]), (1, ["食谱0"]))
+        self.assertEqual(service.get_list(tag="不存在")[1], 0)
+        # 下架食谱的标签不返回
+        self.assertEqual(service.get_tags(), ["减脂", "减脂餐", "快手"])
+
+    def test_premium_recipe_writes_keep_links_in_sync(self):
+        service = PremiumRecipeService(self.db)
+        recipe = service.create(PremiumRecipeCreate(
+            name="新食谱",
+            tags=["高蛋白", "快手"],
+            ingredients=[{"name": "鸡蛋", "amount": "2个"}],
+            steps=[{"step": 1, "content": "水煮"}],
+        ))
+        self.assertEqual(service.get_list(tag="快手")[1], 1)
+
+        service.update(recipe.id, PremiumRecipeUpdate(tags=["低脂"]))
+        self.assertEqual(service.get_list(tag="快手")[1], 0)
+        self.assertEqual(service.get_list(tag="低脂")[1], 1)
+
+        service.delete(recipe.id)
+        self.assertEqual(self.db.query(PremiumRecipeTag).count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()